@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'messmetapp.middleware.EntitlementMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -143,10 +144,28 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # A file rather than shared-cache memory, so tests that write
+            # from several threads wait on locks instead of failing
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
 
+# Cache
+# The local-memory default is per process: with several workers, point
+# CACHE_BACKEND/CACHE_LOCATION at a shared backend (e.g. FileBasedCache or
+# Redis) so signal-driven invalidation reaches every worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'messmet'),
+    }
+}
+
+# Seconds an anonymous public page stays cached when nothing changes
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '600'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -193,6 +212,15 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded media is served by messmetapp.media, which checks access and then
+# either streams the file itself (supporting Range and ETag) or hands the
+# transfer to the front server: set MEDIA_SENDFILE to 'x-accel-redirect'
+# (nginx, with an internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to
+# MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile / lighttpd).
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', str(7 * 24 * 3600)))
+
 # Custom user model (to be implemented in messmetapp)
 AUTH_USER_MODEL = 'messmetapp.User'
 
@@ -16,9 +16,9 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.contrib.sitemaps.views import sitemap
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+import re
 from messmetapp import views
 from messmetapp.sitemap import StaticViewSitemap
 
@@ -38,4 +38,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     # App URLs
     path('', include('messmetapp.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Uploaded media, access-checked (see messmetapp.media)
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), views.serve_media, name='media'),
+]
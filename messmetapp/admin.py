@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import User, SubscriptionPlan, UserSubscription, PaymentProof, Attendance, MonthlyMenu, Notification, PaymentConfig, Feedback, CarouselImage, FoodImage, PopupNotice, StaffImage, OwnerImage
+from .models import User, SubscriptionPlan, UserSubscription, PaymentProof, Attendance, MonthlyMenu, MenuItem, Notification, PaymentConfig, Feedback, CarouselImage, FoodImage, PopupNotice, StaffImage, OwnerImage, DailyStats, ExportJob, MealFeedbackRollup, ResponsiveImage, ImageJob
 
 
 @admin.register(User)
@@ -76,8 +76,16 @@ class AttendanceAdmin(admin.ModelAdmin):
 
 @admin.register(MonthlyMenu)
 class MonthlyMenuAdmin(admin.ModelAdmin):
-    list_display = ("month", "year", "uploaded_at")
+    list_display = ("month", "year", "page_count", "uploaded_at")
     list_filter = ("year", "month")
+    readonly_fields = ("extracted_text", "previews", "page_count", "artifacts_source")
+
+
+@admin.register(MenuItem)
+class MenuItemAdmin(admin.ModelAdmin):
+    list_display = ("date", "meal_type", "dishes", "source")
+    list_filter = ("meal_type", "source")
+    date_hierarchy = "date"
 
 
 @admin.register(Notification)
@@ -182,4 +190,41 @@ class OwnerImageAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "users", "active_subscribers", "pending_payments", "attendees", "new_users", "updated_at")
+    date_hierarchy = "date"
+    readonly_fields = ("date", "users", "active_subscribers", "pending_payments", "attendees", "new_users", "updated_at")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "processed_rows", "total_rows", "requested_by", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("processed_rows", "total_rows", "file", "error", "created_at", "started_at", "finished_at")
+
+
+@admin.register(MealFeedbackRollup)
+class MealFeedbackRollupAdmin(admin.ModelAdmin):
+    list_display = ("meal_date", "meal_type", "responses", "updated_at")
+    list_filter = ("meal_type",)
+    date_hierarchy = "meal_date"
+    readonly_fields = ("meal_date", "meal_type", "responses", "rating_histogram", "taste_histogram", "quantity_histogram", "hygiene_histogram", "updated_at")
+
+
+@admin.register(ResponsiveImage)
+class ResponsiveImageAdmin(admin.ModelAdmin):
+    list_display = ("source", "width", "height", "updated_at")
+    search_fields = ("source",)
+    readonly_fields = ("source", "width", "height", "variants", "placeholder", "updated_at")
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "source", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("source",)
+    readonly_fields = ("attempts", "error", "created_at", "started_at", "finished_at")
+
 # Register your models here.
@@ -5,3 +5,6 @@ class MessmetappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'messmetapp'
     verbose_name = "Tanya's Kitchen App"
+
+    def ready(self):
+        from . import signals  # noqa: F401
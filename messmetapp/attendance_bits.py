@@ -0,0 +1,141 @@
+"""
+Bit-packed monthly attendance (AttendanceMonth) kept in sync with Attendance
+"""
+import calendar
+import operator
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import Attendance, AttendanceMonth
+
+
+MEAL_FIELDS = AttendanceMonth.MEAL_FIELDS
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def day_mask(day):
+    return 1 << (day.day - 1)
+
+
+def record_attendance(user_id, day, meal_type):
+    """Set the bit for one new Attendance row; a single UPDATE in the common case."""
+    if meal_type not in MEAL_FIELDS:
+        return
+    month = month_start(day)
+    bit = {meal_type: F(meal_type).bitor(day_mask(day))}
+    if AttendanceMonth.objects.filter(user_id=user_id, month=month).update(**bit):
+        return
+    try:
+        with transaction.atomic():
+            AttendanceMonth.objects.create(user_id=user_id, month=month, **{meal_type: day_mask(day)})
+    except IntegrityError:
+        # Another request created the row first
+        AttendanceMonth.objects.filter(user_id=user_id, month=month).update(**bit)
+
+
+def refresh_attendance_month(user_id, day):
+    """Recompute the month containing ``day`` for one user from Attendance."""
+    refresh_attendance_months([user_id], day)
+
+
+def refresh_attendance_months(user_ids, day):
+    """
+    Recompute the month containing ``day`` for several users from Attendance,
+    with a fixed number of queries however many users are given.
+    """
+    month = month_start(day)
+    last_day = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+    bits = {user_id: dict.fromkeys(MEAL_FIELDS, 0) for user_id in user_ids}
+    rows = Attendance.objects.filter(user_id__in=bits, date__range=(month, last_day)).values_list('user_id', 'date', 'meal_type')
+    for user_id, date, meal_type in rows:
+        if meal_type in MEAL_FIELDS:
+            bits[user_id][meal_type] |= day_mask(date)
+
+    existing = {row.user_id: row for row in AttendanceMonth.objects.filter(user_id__in=bits, month=month)}
+    to_update, to_create, empty = [], [], []
+    for user_id, user_bits in bits.items():
+        row = existing.get(user_id)
+        if not any(user_bits.values()):
+            if row:
+                empty.append(row.pk)
+        elif row:
+            for meal, value in user_bits.items():
+                setattr(row, meal, value)
+            to_update.append(row)
+        else:
+            to_create.append(AttendanceMonth(user_id=user_id, month=month, **user_bits))
+
+    if to_update:
+        AttendanceMonth.objects.bulk_update(to_update, MEAL_FIELDS)
+    if to_create:
+        AttendanceMonth.objects.bulk_create(to_create, ignore_conflicts=True)
+    if empty:
+        AttendanceMonth.objects.filter(pk__in=empty).delete()
+
+
+@transaction.atomic
+def rebuild_attendance_months(batch_size=2000):
+    """
+    Drop and rebuild every AttendanceMonth row in one pass over Attendance.
+    Returns the number of rows written.
+    """
+    months = {}
+    rows = Attendance.objects.order_by().values_list('user_id', 'date', 'meal_type').iterator(chunk_size=batch_size)
+    for user_id, date, meal_type in rows:
+        if meal_type not in MEAL_FIELDS:
+            continue
+        bits = months.setdefault((user_id, month_start(date)), dict.fromkeys(MEAL_FIELDS, 0))
+        bits[meal_type] |= day_mask(date)
+
+    AttendanceMonth.objects.all().delete()
+    AttendanceMonth.objects.bulk_create(
+        [AttendanceMonth(user_id=user_id, month=month, **bits) for (user_id, month), bits in months.items()],
+        batch_size=batch_size,
+    )
+    return len(months)
+
+
+# --------- Set-style queries ---------
+
+def attended_on(day, meals=None):
+    """
+    AttendanceMonth rows (one per user) with any of ``meals`` (default: all)
+    on ``day``; the bit tests run in the database.
+    """
+    mask = day_mask(day)
+    hits = {f'_{meal}_hit': F(meal).bitand(mask) for meal in (meals or MEAL_FIELDS)}
+    condition = reduce(operator.or_, (Q(**{f'{name}__gt': 0}) for name in hits))
+    return AttendanceMonth.objects.filter(month=month_start(day)).alias(**hits).filter(condition)
+
+
+def users_who_ate(day, meal):
+    """IDs of users who had ``meal`` on ``day``"""
+    return attended_on(day, [meal]).values_list('user_id', flat=True)
+
+
+def count_who_ate(day, meal):
+    return attended_on(day, [meal]).count()
+
+
+def count_attendees(day):
+    """Distinct users with at least one meal on ``day``"""
+    return attended_on(day).count()
+
+
+def month_calendar(user, day):
+    """
+    Calendar for the month containing ``day``, read from a single
+    AttendanceMonth row: a list of weeks (Monday first), each a list of
+    ``None`` for padding or ``{'day': n, 'meals': [...]}``.
+    """
+    month = month_start(day)
+    row = AttendanceMonth.objects.filter(user=user, month=month).first() or AttendanceMonth(month=month)
+    return [
+        [{'day': n, 'meals': row.meals_on(n)} if n else None for n in week]
+        for week in calendar.monthcalendar(month.year, month.month)
+    ]
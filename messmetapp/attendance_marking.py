@@ -0,0 +1,115 @@
+"""
+Marking attendance for many users at once
+"""
+from django.db import transaction
+
+from .attendance_bits import refresh_attendance_months
+from .models import Attendance, User, UserSubscription
+from .stats import refresh_daily_stats
+
+
+ATTENDANCE_BATCH_LIMIT = 500
+
+RESULT_MARKED = 'marked'
+RESULT_ALREADY_MARKED = 'already_marked'
+RESULT_NOT_ENTITLED = 'not_entitled'
+RESULT_NO_SUBSCRIPTION = 'no_subscription'
+RESULT_NOT_FOUND = 'not_found'
+
+
+def _entitled_meals(user_ids):
+    """user id -> included meals of the newest active subscription"""
+    entitled = {}
+    rows = (
+        UserSubscription.objects.filter(user_id__in=user_ids, active=True)
+        .order_by('user_id', '-created_at')
+        .values_list('user_id', 'plan__included_meals')
+    )
+    for user_id, meals in rows:
+        entitled.setdefault(user_id, list(meals or []))
+    return entitled
+
+
+def _inserted(rows, day):
+    """
+    The ``(user_id, meal_type)`` of ``rows`` that are in the database after
+    an ``ignore_conflicts`` insert. A row another request inserted first has
+    its own ``marked_at``, so it doesn't count as ours.
+    """
+    ours = {(row.user_id, row.meal_type): row.marked_at for row in rows}
+    stored = Attendance.objects.filter(
+        user_id__in={row.user_id for row in rows}, date=day, meal_type__in={row.meal_type for row in rows},
+    ).values_list('user_id', 'meal_type', 'marked_at')
+    return {(user_id, meal) for user_id, meal, marked_at in stored if ours.get((user_id, meal)) == marked_at}
+
+
+def _result(status, marked=(), already_marked=(), not_entitled=()):
+    return {
+        'status': status,
+        'marked': list(marked),
+        'already_marked': list(already_marked),
+        'not_entitled': list(not_entitled),
+    }
+
+
+def mark_attendance_batch(user_ids, day, meals=None):
+    """
+    Mark ``meals`` (default: every meal in each user's plan) on ``day`` for
+    each of ``user_ids``.
+
+    Users, entitlements and existing attendance are looked up with one
+    query each, and every new row is inserted in a single transaction with
+    ``bulk_create(ignore_conflicts=True)``. Rows that already exist, including
+    ones another request inserts concurrently, are left alone and reported
+    as already marked.
+
+    Returns ``{user_id: {'status': ..., 'marked': [...], 'already_marked': [...],
+    'not_entitled': [...]}}``, where ``not_entitled`` lists the requested
+    meals outside the user's plan.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    found = set(User.objects.filter(id__in=user_ids, is_staff=False).values_list('id', flat=True))
+    entitled = _entitled_meals(found)
+    existing = set(
+        Attendance.objects.filter(user_id__in=entitled, date=day).values_list('user_id', 'meal_type')
+    )
+
+    wanted = {}
+    to_create = []
+    for user_id in entitled:
+        allowed = entitled[user_id]
+        wanted[user_id] = [meal for meal in (meals or allowed) if meal in allowed]
+        to_create.extend(
+            Attendance(user_id=user_id, date=day, meal_type=meal)
+            for meal in wanted[user_id] if (user_id, meal) not in existing
+        )
+
+    inserted = set()
+    if to_create:
+        with transaction.atomic():
+            Attendance.objects.bulk_create(to_create, ignore_conflicts=True)
+            inserted = _inserted(to_create, day)
+            if inserted:
+                # bulk_create skips post_save, so update the derived data here
+                refresh_attendance_months({user_id for user_id, _meal in inserted}, day)
+                refresh_daily_stats(day, ['attendees'])
+
+    results = {}
+    for user_id in user_ids:
+        if user_id not in found:
+            results[user_id] = _result(RESULT_NOT_FOUND)
+            continue
+        if user_id not in entitled:
+            results[user_id] = _result(RESULT_NO_SUBSCRIPTION)
+            continue
+        marked = [meal for meal in wanted[user_id] if (user_id, meal) in inserted]
+        already = [meal for meal in wanted[user_id] if (user_id, meal) not in inserted]
+        not_entitled = [meal for meal in (meals or ()) if meal not in entitled[user_id]]
+        if not wanted[user_id]:
+            status = RESULT_NOT_ENTITLED
+        elif marked:
+            status = RESULT_MARKED
+        else:
+            status = RESULT_ALREADY_MARKED
+        results[user_id] = _result(status, marked, already, not_entitled)
+    return results
@@ -0,0 +1,183 @@
+"""
+Lazily loaded, independently cached fragments for the staff dashboard
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .forms import MonthlyMenuForm, MenuItemForm, CarouselImageForm
+from .menu_index import menu_for_week
+from .ledger import visitor_ledger
+from .screenshots import find_duplicate_screenshots
+from .models import (
+    User, SubscriptionPlan, PaymentProof, MonthlyMenu, MenuItem, PaymentConfig, Feedback,
+    CarouselImage, FoodImage, VisitorPayment, VisitorFeedback, ResponsiveImage,
+)
+
+
+# Rendered fragments are shared between staff users, so the CSRF token is
+# cached as a placeholder and swapped for the requesting user's token.
+CSRF_PLACEHOLDER = '__dashboard_csrf_token__'
+
+
+def _payments_context(params):
+    pending_payments = list(
+        PaymentProof.objects.filter(status=PaymentProof.STATUS_PENDING)
+        .select_related('user', 'subscription_plan')
+        .order_by('-submitted_at')[:10]
+    )
+    duplicates = find_duplicate_screenshots(pending_payments)
+    for payment in pending_payments:
+        payment.earlier_submissions = duplicates.get(payment.pk, [])
+    visitor_period = params.get('visitor_period', '')
+    ledger = visitor_ledger(
+        period=visitor_period,
+        date_from=params.get('date_from', ''),
+        date_to=params.get('date_to', ''),
+        page=params.get('vp_page', ''),
+    )
+    return {
+        'pending_payments': pending_payments,
+        'visitor_payments': ledger['payments'],
+        'visitor_ledger': ledger,
+        'visitor_period': visitor_period,
+        'date_from': params.get('date_from', ''),
+        'date_to': params.get('date_to', ''),
+    }
+
+
+def _plans_context(params):
+    return {'plans': SubscriptionPlan.objects.all().order_by('-is_active', 'title')}
+
+
+def _menu_context(params):
+    today = timezone.localdate()
+    return {
+        'menu_form': MonthlyMenuForm(),
+        'current_menu': MonthlyMenu.objects.filter(month=today.month, year=today.year).first(),
+        'menu_item_form': MenuItemForm(initial={'date': today}),
+        'menu_week': menu_for_week(today)['days'],
+    }
+
+
+def _carousel_context(params):
+    return {
+        'carousel_form': CarouselImageForm(),
+        'carousel_images': CarouselImage.objects.filter(is_active=True).order_by('order', '-created_at'),
+    }
+
+
+def _food_gallery_context(params):
+    return {'food_images': FoodImage.objects.filter(is_active=True).order_by('order', '-created_at')}
+
+
+def _payment_config_context(params):
+    return {'paycfg': PaymentConfig.objects.first()}
+
+
+def _feedback_context(params):
+    return {'recent_feedbacks': Feedback.objects.select_related('user').order_by('-created_at')[:5]}
+
+
+def _visitor_feedback_context(params):
+    return {'visitor_feedbacks': VisitorFeedback.objects.all().order_by('-created_at')[:10]}
+
+
+# section key (matches data-fragment in admin_dashboard.html) -> how to build it
+SECTIONS = {
+    'payments': {
+        'template': 'dashboard/payments.html',
+        'context': _payments_context,
+        # ResponsiveImage: screenshot hashes arrive from the image worker
+        'models': (PaymentProof, VisitorPayment, User, SubscriptionPlan, ResponsiveImage),
+        'params': ('visitor_period', 'date_from', 'date_to', 'vp_page'),
+    },
+    'plans': {
+        'template': 'dashboard/plans.html',
+        'context': _plans_context,
+        'models': (SubscriptionPlan,),
+        'params': (),
+    },
+    'menu': {
+        'template': 'dashboard/menu.html',
+        'context': _menu_context,
+        'models': (MonthlyMenu, MenuItem),
+        'params': (),
+    },
+    'carousel': {
+        'template': 'dashboard/carousel.html',
+        'context': _carousel_context,
+        'models': (CarouselImage,),
+        'params': (),
+    },
+    'food-gallery': {
+        'template': 'dashboard/food_gallery.html',
+        'context': _food_gallery_context,
+        'models': (FoodImage,),
+        'params': (),
+    },
+    'payment-config': {
+        'template': 'dashboard/payment_config.html',
+        'context': _payment_config_context,
+        'models': (PaymentConfig,),
+        'params': (),
+    },
+    'feedback': {
+        'template': 'dashboard/feedback.html',
+        'context': _feedback_context,
+        'models': (Feedback, User),
+        'params': (),
+    },
+    'visitor-feedback': {
+        'template': 'dashboard/visitor_feedback.html',
+        'context': _visitor_feedback_context,
+        'models': (VisitorFeedback,),
+        'params': (),
+    },
+}
+
+
+def _generation_key(name):
+    return f'dashboard:section:{name}:generation'
+
+
+def _generation(name):
+    generation = cache.get(_generation_key(name))
+    if generation is None:
+        # A fresh value (never 0) so fragments cached under an evicted
+        # generation can't be picked up again
+        generation = time.time_ns()
+        cache.set(_generation_key(name), generation, None)
+    return generation
+
+
+def invalidate_section(name):
+    cache.set(_generation_key(name), time.time_ns(), None)
+
+
+def sections_for_model(model):
+    return [name for name, section in SECTIONS.items() if model in section['models']]
+
+
+def render_section(request, name):
+    """
+    Render one dashboard section, serving it from the cache when nothing it
+    depends on has changed. Raises KeyError for unknown sections.
+    """
+    section = SECTIONS[name]
+    params = {param: request.GET.get(param, '') for param in section['params']}
+    key = 'dashboard:section:{}:{}:{}:{}'.format(
+        name, _generation(name), timezone.localdate().isoformat(), urlencode(sorted(params.items())),
+    )
+    html = cache.get(key)
+    if html is None:
+        context = section['context'](params)
+        context['csrf_token'] = CSRF_PLACEHOLDER
+        html = render_to_string(section['template'], context)
+        cache.set(key, html, getattr(settings, 'DASHBOARD_SECTION_CACHE_TIMEOUT', 300))
+    return html.replace(CSRF_PLACEHOLDER, get_token(request))
@@ -0,0 +1,114 @@
+"""
+Cached meal entitlements: a user's active subscription and the meals it includes
+
+Resolved once per request through ``request.entitlements`` (see
+EntitlementMiddleware) and shared across requests through the cache.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import UserSubscription
+
+
+_GENERATION_KEY = 'entitlements:generation'
+
+# Cached for users without a subscription, since the cache can't hold None
+_NO_SUBSCRIPTION = 0
+
+# Seconds a subscription past its end_date stays cached. The expiry sweep
+# runs in its own process and can't clear the web workers' caches.
+ENTITLEMENT_LAPSED_TIMEOUT = 60
+
+
+def _generation():
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.set(_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _key(user_id, generation=None):
+    return f'entitlements:{generation or _generation()}:{user_id}'
+
+
+def load_active_subscription(user_id):
+    """The user's newest active subscription (with its plan), straight from the database."""
+    return (
+        UserSubscription.objects.filter(user_id=user_id, active=True)
+        .select_related('plan')
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def _timeout(subscription):
+    """Cache timeout for ``subscription``, cut short where it ends"""
+    timeout = getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 300)
+    if not subscription:
+        return timeout
+    ends = timezone.make_aware(datetime.combine(subscription.end_date + timedelta(days=1), datetime.min.time()))
+    remaining = (ends - timezone.now()).total_seconds()
+    return min(timeout, max(remaining, getattr(settings, 'ENTITLEMENT_LAPSED_TIMEOUT', ENTITLEMENT_LAPSED_TIMEOUT)))
+
+
+def active_subscription(user_id):
+    """
+    The user's newest active subscription, served from the cache. Users
+    without one are cached too, so repeated lookups don't reach the
+    database either. A subscription is cached no later than its end_date,
+    then briefly until the expiry sweep deactivates it.
+    """
+    key = _key(user_id)
+    subscription = cache.get(key)
+    if subscription is None:
+        subscription = load_active_subscription(user_id) or _NO_SUBSCRIPTION
+        cache.set(key, subscription, _timeout(subscription))
+    return subscription or None
+
+
+def invalidate_entitlements(user_id):
+    cache.delete(_key(user_id))
+
+
+def invalidate_entitlements_many(user_ids):
+    generation = _generation()
+    cache.delete_many([_key(user_id, generation) for user_id in user_ids])
+
+
+def invalidate_all_entitlements():
+    """Drop every cached entitlement, e.g. after a plan's meals change."""
+    cache.set(_GENERATION_KEY, time.time_ns(), None)
+
+
+class Entitlements:
+    """
+    One user's entitlements, looked up on first use and memoised for the
+    lifetime of the object (a request, when reached via ``request.entitlements``).
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def subscription(self):
+        if not self.user.is_authenticated:
+            return None
+        return active_subscription(self.user.pk)
+
+    @cached_property
+    def meals(self):
+        subscription = self.subscription
+        return frozenset(subscription.plan.included_meals or ()) if subscription else frozenset()
+
+    @property
+    def has_subscription(self):
+        return self.subscription is not None
+
+    def allows(self, meal):
+        return meal in self.meals
@@ -0,0 +1,308 @@
+"""
+CSV exports for the staff tools, streamed in the request or built by the
+``run_export_jobs`` worker
+"""
+import csv
+import secrets
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.core.files import File
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .job_queue import claim_next_job
+from .models import Attendance, ExportJob, MealFeedback, SubscriptionPlan, User, UserSubscription
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Seconds a job may stay running before it is assumed dead and requeued
+EXPORT_JOB_TIMEOUT = 3600
+# Rows are written out in blocks of roughly this many bytes
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+ATTENDANCE_HEADER = [
+    "User ID", "Username", "Full Name", "Email", "Date",
+    "Meal Type", "Marked At", "Weekday",
+]
+
+USERS_HEADER = [
+    'ID', 'Username', 'Email', 'Full Name', 'Mobile Number',
+    'Is Active', 'Is Staff', 'Date Joined', 'Last Login',
+    'Total Attendance', 'Last Attendance Date', 'Active Subscriptions', 'Current Plan',
+]
+
+MEAL_FEEDBACK_HEADER = [
+    'ID', 'User ID', 'Username', 'Full Name', 'Meal Type', 'Meal Date',
+    'Overall Rating', 'Taste Rating', 'Quantity Rating', 'Hygiene Rating',
+    'Comments', 'Is Anonymous', 'Created At', 'Updated At',
+]
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _gzipped(blocks):
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(filename, header, rows, compress=False):
+    """
+    Stream ``rows`` as a CSV attachment, optionally gzip-compressed.
+
+    ``rows`` should be a lazy iterable (e.g. a queryset ``.iterator()``)
+    so that neither the rows nor the output are held in memory.
+    """
+    blocks = _buffered(csv_lines(header, rows))
+    if compress:
+        response = StreamingHttpResponse(_gzipped(blocks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(blocks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def attendance_export_filters(params):
+    """
+    Validate the export query parameters and return queryset filters.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    filters = {}
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValueError(f"Invalid {param}, expected YYYY-MM-DD")
+            filters[lookup] = day
+
+    meal_type = params.get('meal_type')
+    if meal_type:
+        if meal_type not in dict(SubscriptionPlan.MEAL_CHOICES):
+            raise ValueError("Invalid meal_type")
+        filters['meal_type'] = meal_type
+
+    hostel_status = params.get('hostel_status')
+    if hostel_status:
+        if hostel_status not in (User.HOSTEL_STATUS_HOSTELLER, User.HOSTEL_STATUS_NON_HOSTELLER):
+            raise ValueError("Invalid hostel_status")
+        filters['user__hostel_status'] = hostel_status
+    return filters
+
+
+def attendance_export_queryset(filters):
+    return Attendance.objects.filter(**filters).order_by('-date', '-marked_at')
+
+
+def attendance_export_rows(filters):
+    rows = (
+        attendance_export_queryset(filters)
+        .values_list(
+            'user_id', 'user__username', 'user__full_name', 'user__email',
+            'date', 'meal_type', 'marked_at',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for user_id, username, full_name, email, date, meal_type, marked_at in rows:
+        yield [
+            user_id,
+            username,
+            full_name or 'Not provided',
+            email or 'Not provided',
+            date.strftime('%Y-%m-%d'),
+            meal_type,
+            marked_at.strftime('%Y-%m-%d %H:%M:%S'),
+            date.strftime('%A'),
+        ]
+
+
+def _per_user(queryset, **aggregate):
+    """Correlated subquery returning one aggregate of ``queryset`` for the outer user."""
+    name = next(iter(aggregate))
+    return Subquery(
+        queryset.filter(user=OuterRef('pk')).order_by().values('user').annotate(**aggregate).values(name)
+    )
+
+
+def users_export_queryset():
+    """
+    Users with their export statistics computed by the database in one query.
+
+    Correlated subqueries are used instead of joins so attendance and
+    subscription rows don't multiply each other.
+    """
+    active_subscriptions = UserSubscription.objects.filter(active=True)
+    return User.objects.annotate(
+        # Count distinct dates attended, not total meal records
+        total_attendance_count=Coalesce(
+            _per_user(Attendance.objects.all(), total=Count('date', distinct=True)),
+            Value(0), output_field=IntegerField(),
+        ),
+        last_attendance_date=_per_user(Attendance.objects.all(), last=Max('date')),
+        active_subscription_count=Coalesce(
+            _per_user(active_subscriptions, total=Count('id')),
+            Value(0), output_field=IntegerField(),
+        ),
+        current_plan_title=Subquery(
+            active_subscriptions.filter(user=OuterRef('pk')).order_by('-created_at').values('plan__title')[:1]
+        ),
+    ).order_by('username')
+
+
+def users_export_rows():
+    rows = users_export_queryset().values_list(
+        'id', 'username', 'email', 'full_name', 'mobile_no', 'is_active', 'is_staff',
+        'date_joined', 'last_login', 'total_attendance_count', 'last_attendance_date',
+        'active_subscription_count', 'current_plan_title',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (pk, username, email, full_name, mobile_no, is_active, is_staff, date_joined, last_login,
+         total_attendance, last_attendance, active_subs, plan_title) in rows:
+        yield [
+            pk,
+            username,
+            email or 'Not provided',
+            full_name or 'Not provided',
+            mobile_no or 'Not provided',
+            'Yes' if is_active else 'No',
+            'Yes' if is_staff else 'No',
+            date_joined.strftime('%Y-%m-%d %H:%M:%S'),
+            last_login.strftime('%Y-%m-%d %H:%M:%S') if last_login else 'Never',
+            total_attendance,
+            last_attendance.strftime('%Y-%m-%d') if last_attendance else 'Never',
+            active_subs,
+            plan_title or 'None',
+        ]
+
+
+def meal_feedback_export_rows():
+    meal_labels = dict(MealFeedback.MEAL_CHOICES)
+    rows = MealFeedback.objects.order_by('-created_at').values_list(
+        'id', 'user_id', 'user__username', 'user__full_name', 'meal_type', 'meal_date',
+        'rating', 'taste_rating', 'quantity_rating', 'hygiene_rating',
+        'comments', 'is_anonymous', 'created_at', 'updated_at',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (pk, user_id, username, full_name, meal_type, meal_date, rating, taste, quantity, hygiene,
+         comments, is_anonymous, created_at, updated_at) in rows:
+        yield [
+            pk,
+            user_id,
+            username if not is_anonymous else 'Anonymous',
+            full_name if not is_anonymous else 'Anonymous',
+            meal_labels.get(meal_type, meal_type),
+            meal_date.strftime('%Y-%m-%d'),
+            rating,
+            taste or 'N/A',
+            quantity or 'N/A',
+            hygiene or 'N/A',
+            comments or 'No comments',
+            'Yes' if is_anonymous else 'No',
+            created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        ]
+
+
+# --------- Background export jobs ---------
+
+# ExportJob.kind -> filename, header, and row count / row iterator for the job params
+EXPORTS = {
+    ExportJob.KIND_ATTENDANCE: {
+        'filename': 'attendance_export.csv',
+        'header': ATTENDANCE_HEADER,
+        'count': lambda params: attendance_export_queryset(attendance_export_filters(params)).count(),
+        'rows': lambda params: attendance_export_rows(attendance_export_filters(params)),
+    },
+    ExportJob.KIND_USERS: {
+        'filename': 'users_export.csv',
+        'header': USERS_HEADER,
+        'count': lambda params: User.objects.count(),
+        'rows': lambda params: users_export_rows(),
+    },
+    ExportJob.KIND_MEAL_FEEDBACK: {
+        'filename': 'meal_feedback_export.csv',
+        'header': MEAL_FEEDBACK_HEADER,
+        'count': lambda params: MealFeedback.objects.count(),
+        'rows': lambda params: meal_feedback_export_rows(),
+    },
+}
+
+
+def claim_next_export_job():
+    """
+    Claim the oldest pending export (see job_queue.claim_next_job). Jobs a
+    dead worker left running for EXPORT_JOB_TIMEOUT seconds are retried.
+    """
+    return claim_next_job(ExportJob, getattr(settings, 'EXPORT_JOB_TIMEOUT', EXPORT_JOB_TIMEOUT))
+
+
+def _with_progress(job, rows):
+    processed = 0
+    for processed, row in enumerate(rows, 1):
+        yield row
+        if processed % EXPORT_CHUNK_SIZE == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+    job.processed_rows = processed
+
+
+def run_export_job(job):
+    """
+    Build the CSV for a claimed job into a temporary file, then store it
+    under MEDIA_ROOT/exports/. Progress is saved every EXPORT_CHUNK_SIZE
+    rows; failures are recorded on the job instead of raised.
+    """
+    export = EXPORTS[job.kind]
+    try:
+        job.total_rows = export['count'](job.params)
+        ExportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+
+        with tempfile.TemporaryFile() as output:
+            rows = _with_progress(job, export['rows'](job.params))
+            for block in _buffered(csv_lines(export['header'], rows)):
+                output.write(block.encode('utf-8'))
+            output.seek(0)
+            # Random suffix so finished exports can't be guessed by URL
+            name = export['filename'].replace('.csv', f'_{job.pk}_{secrets.token_hex(8)}.csv')
+            job.file.save(name, File(output), save=False)
+
+        job.status = ExportJob.STATUS_DONE
+    except Exception as e:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
@@ -0,0 +1,110 @@
+"""
+Meal feedback statistics: single-query summaries and the per-meal daily rollup
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from .models import MealFeedback, MealFeedbackRollup
+
+
+RATINGS = [value for value, _label in MealFeedback.RATING_CHOICES]
+HISTOGRAM_FIELDS = MealFeedbackRollup.HISTOGRAM_FIELDS
+LOW_RATING = 2
+
+
+def feedback_summary(queryset, today):
+    """
+    Count, average rating, today's count and low-rating count for
+    ``queryset`` with one conditional-aggregation query.
+    """
+    stats = queryset.order_by().aggregate(
+        total=Count('id'),
+        avg_rating=Avg('rating'),
+        today_feedback=Count('id', filter=Q(created_at__date=today)),
+        low_ratings=Count('id', filter=Q(rating__lte=LOW_RATING)),
+    )
+    stats['avg_rating'] = stats['avg_rating'] or 0.0
+    return stats
+
+
+def _histogram_aggregates():
+    aggregates = {'responses': Count('id')}
+    for field in HISTOGRAM_FIELDS:
+        for value in RATINGS:
+            aggregates[f'{field}_{value}'] = Count('id', filter=Q(**{field: value}))
+    return aggregates
+
+
+def _rollup_values(row):
+    """Model field values from one row of ``_histogram_aggregates`` output"""
+    values = {'responses': row['responses']}
+    for field, histogram in HISTOGRAM_FIELDS.items():
+        values[histogram] = [row[f'{field}_{value}'] for value in RATINGS]
+    return values
+
+
+def refresh_feedback_rollup(meal_date, meal_type):
+    """Recompute one (meal_date, meal_type) rollup row from MealFeedback."""
+    row = MealFeedback.objects.filter(meal_date=meal_date, meal_type=meal_type).aggregate(**_histogram_aggregates())
+    if not row['responses']:
+        MealFeedbackRollup.objects.filter(meal_date=meal_date, meal_type=meal_type).delete()
+        return
+    MealFeedbackRollup.objects.update_or_create(meal_date=meal_date, meal_type=meal_type, defaults=_rollup_values(row))
+
+
+@transaction.atomic
+def rebuild_feedback_rollups(batch_size=2000):
+    """
+    Drop and rebuild every rollup row with one grouped query over
+    MealFeedback. Returns the number of rows written.
+    """
+    rows = (
+        MealFeedback.objects.order_by()
+        .values('meal_date', 'meal_type')
+        .annotate(**_histogram_aggregates())
+    )
+    rollups = [
+        MealFeedbackRollup(meal_date=row['meal_date'], meal_type=row['meal_type'], **_rollup_values(row))
+        for row in rows
+    ]
+    MealFeedbackRollup.objects.all().delete()
+    MealFeedbackRollup.objects.bulk_create(rollups, batch_size=batch_size)
+    return len(rollups)
+
+
+def _average(histogram):
+    responses = sum(histogram)
+    if not responses:
+        return None
+    return round(sum(count * value for count, value in zip(histogram, RATINGS)) / responses, 2)
+
+
+def rating_trends(date_from, date_to, meal_type=None):
+    """
+    Per-day feedback between ``date_from`` and ``date_to`` (inclusive), read
+    from the rollup only: a list of ``{'date', 'responses', 'averages',
+    'histograms'}`` with the meals of each day merged.
+    """
+    rollups = MealFeedbackRollup.objects.filter(meal_date__range=(date_from, date_to)).order_by('meal_date')
+    if meal_type:
+        rollups = rollups.filter(meal_type=meal_type)
+
+    days = {}
+    for rollup in rollups:
+        day = days.setdefault(rollup.meal_date, {
+            'responses': 0,
+            'histograms': {field: [0] * len(RATINGS) for field in HISTOGRAM_FIELDS},
+        })
+        day['responses'] += rollup.responses
+        for field, histogram in HISTOGRAM_FIELDS.items():
+            day['histograms'][field] = [a + b for a, b in zip(day['histograms'][field], getattr(rollup, histogram))]
+
+    return [
+        {
+            'date': date.isoformat(),
+            'responses': day['responses'],
+            'averages': {field: _average(counts) for field, counts in day['histograms'].items()},
+            'histograms': day['histograms'],
+        }
+        for date, day in days.items()
+    ]
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import User, MonthlyMenu, CarouselImage, MealFeedback, VisitorPayment, VisitorFeedback
+from .models import User, MonthlyMenu, MenuItem, CarouselImage, MealFeedback, VisitorPayment, VisitorFeedback
 
 
 class RegisterForm(UserCreationForm):
@@ -71,6 +71,20 @@ class MonthlyMenuForm(forms.ModelForm):
         self.fields["text"].widget.attrs.update({"class": "form-control"})
 
 
+class MenuItemForm(forms.Form):
+    """Staff entry for one meal of the per-day menu; blank dishes clear it"""
+    date = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}))
+    meal_type = forms.ChoiceField(choices=MenuItem._meta.get_field("meal_type").choices, widget=forms.Select(attrs={"class": "form-control"}))
+    dishes = forms.CharField(
+        required=False,
+        help_text="Separate dishes with commas",
+        widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "Rajma, Rice, Salad"}),
+    )
+
+    def clean_dishes(self):
+        return [dish.strip() for dish in self.cleaned_data["dishes"].split(",") if dish.strip()]
+
+
 class CarouselImageForm(forms.ModelForm):
     class Meta:
         model = CarouselImage
@@ -0,0 +1,253 @@
+"""
+Responsive image derivatives: resized WebP/JPEG copies and blurred placeholders
+"""
+import base64
+import logging
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from .job_queue import claim_next_job
+from .models import ImageJob, ResponsiveImage
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+DERIVATIVE_FORMATS = {
+    # format -> (Pillow format, extension, save options)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+PLACEHOLDER_WIDTH = 16
+DERIVATIVES_DIR = 'derivatives'
+IMAGE_JOB_MAX_ATTEMPTS = 3
+# Seconds a "no derivatives yet" lookup is cached
+RESPONSIVE_IMAGE_MISS_TIMEOUT = 30
+# Seconds a job may stay running before it is assumed dead and requeued
+IMAGE_JOB_TIMEOUT = 600
+
+# (app_label.Model, field) pairs whose uploads get derivatives
+IMAGE_FIELDS = (
+    ('messmetapp.CarouselImage', 'image'),
+    ('messmetapp.FoodImage', 'image'),
+    ('messmetapp.StaffImage', 'image'),
+    ('messmetapp.OwnerImage', 'image'),
+    ('messmetapp.User', 'profile_image'),
+    ('messmetapp.PaymentProof', 'screenshot'),
+    ('messmetapp.VisitorPayment', 'screenshot'),
+)
+
+
+def image_fields():
+    """``(model class, field name)`` for every field in IMAGE_FIELDS"""
+    return [(apps.get_model(label), field) for label, field in IMAGE_FIELDS]
+
+
+def derivative_widths(source_width):
+    """Target widths for an image ``source_width`` pixels wide; never upscales."""
+    widths = getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', DERIVATIVE_WIDTHS)
+    targets = [width for width in widths if width < source_width]
+    targets.append(min(source_width, max(widths)))
+    return sorted(set(targets))
+
+
+def _derivative_name(source, width, extension):
+    stem = posixpath.splitext(source)[0]
+    return f'{DERIVATIVES_DIR}/{stem}/w{width}.{extension}'
+
+
+def _flatten(image):
+    """RGB copy for JPEG, with any transparency composited onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, pil_format, options):
+    buffer = BytesIO()
+    if pil_format == 'JPEG':
+        image = _flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _placeholder(image):
+    small = _flatten(image)
+    small.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    data = _encode(small, 'JPEG', {'quality': 40})
+    return 'data:image/jpeg;base64,' + base64.b64encode(data).decode()
+
+
+def perceptual_hash(image):
+    """
+    64-bit difference hash as 16 hex digits: each bit says whether a pixel
+    of a 9x8 greyscale thumbnail is brighter than its right-hand neighbour.
+    Re-encoded, resized or lightly edited copies land within a few bits.
+    """
+    grey = image.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(grey.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+def hash_distance(a, b):
+    """Number of differing bits between two perceptual hashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def _save(storage, name, data):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def generate_derivatives(source, storage=None):
+    """
+    Build every derivative of the stored file ``source`` and record them
+    on its ResponsiveImage row, replacing any earlier set.
+
+    Returns the ResponsiveImage, or None when the file is missing or isn't
+    an image Pillow can read.
+    """
+    storage = storage or default_storage
+    try:
+        with storage.open(source, 'rb') as handle:
+            image = Image.open(handle)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+        logger.warning("Skipping derivatives for %s: %s", source, e)
+        return None
+
+    image = ImageOps.exif_transpose(image)
+    variants = {name: [] for name in DERIVATIVE_FORMATS}
+    for width in derivative_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for name, (pil_format, extension, options) in DERIVATIVE_FORMATS.items():
+            stored = _save(storage, _derivative_name(source, width, extension), _encode(resized, pil_format, options))
+            variants[name].append([width, stored])
+
+    responsive, _created = ResponsiveImage.objects.update_or_create(
+        source=source,
+        defaults={
+            'width': image.width,
+            'height': image.height,
+            'variants': variants,
+            'placeholder': _placeholder(image),
+            'phash': perceptual_hash(image),
+        },
+    )
+    cache.delete(_cache_key(source))
+    return responsive
+
+
+def _cache_key(source):
+    return f'responsive_image:{source}'
+
+
+def responsive_image(source):
+    """The ResponsiveImage for ``source`` (or None), served from the cache."""
+    key = _cache_key(source)
+    responsive = cache.get(key)
+    if responsive is None:
+        # 0 marks "no derivatives yet", since the cache can't hold None. It is
+        # kept briefly: the worker that makes them can only clear its own
+        # process's cache (e.g. LocMemCache).
+        responsive = ResponsiveImage.objects.filter(source=source).first() or 0
+        if responsive:
+            timeout = getattr(settings, 'RESPONSIVE_IMAGE_CACHE_TIMEOUT', 3600)
+        else:
+            timeout = getattr(settings, 'RESPONSIVE_IMAGE_MISS_TIMEOUT', RESPONSIVE_IMAGE_MISS_TIMEOUT)
+        cache.set(key, responsive, timeout)
+    return responsive or None
+
+
+def backfill_derivatives(force=False):
+    """
+    Generate derivatives for every stored file in IMAGE_FIELDS that lacks
+    them (all of them with ``force``). Returns ``(generated, skipped)``.
+    """
+    sources = set()
+    for model, field in image_fields():
+        sources.update(
+            model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+        )
+    if not force:
+        sources -= set(ResponsiveImage.objects.filter(source__in=sources).values_list('source', flat=True))
+
+    generated = skipped = 0
+    for source in sorted(sources):
+        if generate_derivatives(source):
+            generated += 1
+        else:
+            skipped += 1
+    return generated, skipped
+
+
+# --------- Processing queue ---------
+
+def enqueue_derivatives(source):
+    """
+    Queue derivative generation for ``source`` unless a job for it is
+    already waiting. Returns the pending ImageJob.
+    """
+    job = ImageJob.objects.filter(source=source, status=ImageJob.STATUS_PENDING).first()
+    return job or ImageJob.objects.create(source=source)
+
+
+def claim_next_image_job():
+    """
+    Claim the oldest pending job (see job_queue.claim_next_job), counting
+    an attempt. Jobs a dead worker left running for IMAGE_JOB_TIMEOUT
+    seconds are retried until they run out of attempts.
+    """
+    return claim_next_job(
+        ImageJob, getattr(settings, 'IMAGE_JOB_TIMEOUT', IMAGE_JOB_TIMEOUT), IMAGE_JOB_MAX_ATTEMPTS,
+    )
+
+
+def run_image_job(job):
+    """
+    Generate the derivatives for a claimed job, or the previews and text
+    when the source is a monthly menu upload (see menu_artifacts.py).
+    Unreadable files fail at once; other errors put the job back in the
+    queue until it has been tried IMAGE_JOB_MAX_ATTEMPTS times (claiming
+    counts the attempt).
+    """
+    # menu_artifacts imports this module
+    from .menu_artifacts import build_artifacts_for_upload, is_menu_upload
+
+    try:
+        if is_menu_upload(job.source):
+            readable = build_artifacts_for_upload(job.source)
+        else:
+            readable = generate_derivatives(job.source) is not None
+        if not readable:
+            job.status = ImageJob.STATUS_FAILED
+            job.error = "Missing or unreadable file"
+        else:
+            job.status = ImageJob.STATUS_DONE
+            job.error = ''
+    except Exception as e:
+        job.status = ImageJob.STATUS_PENDING if job.attempts < IMAGE_JOB_MAX_ATTEMPTS else ImageJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
@@ -0,0 +1,50 @@
+"""
+Claiming work from the database-backed job tables (ExportJob, ImageJob)
+"""
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+
+STALE_JOB_ERROR = "Worker stopped while running the job"
+
+
+def requeue_stale_jobs(model, timeout, max_attempts=None):
+    """
+    Put jobs left running for more than ``timeout`` seconds, e.g. by a
+    killed worker, back in the queue. With ``max_attempts``, jobs that have
+    used them all are failed instead. Returns the number requeued.
+    """
+    stale = model.objects.filter(
+        status=model.STATUS_RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    )
+    if max_attempts is not None:
+        stale.filter(attempts__gte=max_attempts).update(
+            status=model.STATUS_FAILED, error=STALE_JOB_ERROR, finished_at=timezone.now(),
+        )
+    return stale.update(status=model.STATUS_PENDING, started_at=None)
+
+
+def claim_next_job(model, timeout, max_attempts=None):
+    """
+    Mark the oldest pending job of ``model`` as running and return it, or
+    None when the queue is empty. Stale running jobs are requeued first
+    (see requeue_stale_jobs). The conditional update makes claiming safe
+    with several workers polling the same table. With ``max_attempts``,
+    the claim also counts an attempt, so a job whose worker dies still
+    uses one up.
+    """
+    requeue_stale_jobs(model, timeout, max_attempts)
+    while True:
+        pk = (
+            model.objects.filter(status=model.STATUS_PENDING)
+            .order_by('created_at', 'id').values_list('id', flat=True).first()
+        )
+        if pk is None:
+            return None
+        updates = {'status': model.STATUS_RUNNING, 'started_at': timezone.now()}
+        if max_attempts is not None:
+            updates['attempts'] = F('attempts') + 1
+        if model.objects.filter(pk=pk, status=model.STATUS_PENDING).update(**updates):
+            return model.objects.get(pk=pk)
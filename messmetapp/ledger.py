@@ -0,0 +1,123 @@
+"""
+Visitor payments ledger for the staff dashboard
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import SubscriptionPlan, VisitorPayment
+
+
+LEDGER_PAGE_SIZE = 25
+LEDGER_MAX_PAGE_SIZE = 100
+
+# Preset periods -> number of days back from today (inclusive of today)
+LEDGER_PERIODS = {
+    VisitorPayment.PERIOD_TODAY: 0,
+    VisitorPayment.PERIOD_WEEK: 7,
+    VisitorPayment.PERIOD_MONTH: 30,
+}
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def ledger_range(period='', date_from='', date_to='', today=None):
+    """
+    Resolve the requested range to ``(date_from, date_to)`` dates, either of
+    which may be None for an open end. Explicit dates win over a preset
+    period; malformed dates are ignored and a reversed range is swapped.
+    """
+    today = today or timezone.localdate()
+    start, end = _parse_day(date_from), _parse_day(date_to)
+    if not start and not end and period in LEDGER_PERIODS:
+        start, end = today - timedelta(days=LEDGER_PERIODS[period]), today
+    if start and end and start > end:
+        start, end = end, start
+    return start, end
+
+
+def ledger_queryset(date_from=None, date_to=None):
+    # Compare created_at against datetime bounds rather than __date so the
+    # filter stays a plain range scan
+    qs = VisitorPayment.objects.all()
+    if date_from:
+        qs = qs.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        qs = qs.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+    return qs
+
+
+def ledger_totals(qs):
+    """
+    Sum and count for the whole range plus per-meal-type totals, computed
+    in a single aggregate query.
+    """
+    aggregates = {'total_amount': Sum('amount'), 'total_count': Count('id')}
+    for meal, _label in SubscriptionPlan.MEAL_CHOICES:
+        aggregates[f'{meal}_amount'] = Sum('amount', filter=Q(meal_type=meal))
+        aggregates[f'{meal}_count'] = Count('id', filter=Q(meal_type=meal))
+    row = qs.aggregate(**aggregates)
+    return {
+        'amount': row['total_amount'] or 0,
+        'count': row['total_count'],
+        'meals': [
+            {
+                'meal_type': meal,
+                'label': label,
+                'amount': row[f'{meal}_amount'] or 0,
+                'count': row[f'{meal}_count'],
+            }
+            for meal, label in SubscriptionPlan.MEAL_CHOICES
+        ],
+    }
+
+
+def _positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def visitor_ledger(period='', date_from='', date_to='', page=1, per_page=LEDGER_PAGE_SIZE, today=None):
+    """
+    One page of the visitor payments ledger, newest first.
+
+    The page size is capped at LEDGER_MAX_PAGE_SIZE and the page number is
+    clamped to the available range. The row count comes from the totals
+    aggregate, so a page costs two queries: the aggregate and the rows.
+    """
+    start, end = ledger_range(period, date_from, date_to, today=today)
+    per_page = min(_positive_int(per_page, LEDGER_PAGE_SIZE), LEDGER_MAX_PAGE_SIZE)
+    qs = ledger_queryset(start, end)
+    totals = ledger_totals(qs)
+
+    num_pages = max(1, -(-totals['count'] // per_page))
+    page = min(_positive_int(page, 1), num_pages)
+    offset = (page - 1) * per_page
+    rows = list(qs.order_by('-created_at', '-id')[offset:offset + per_page]) if totals['count'] else []
+
+    return {
+        'payments': rows,
+        'totals': totals,
+        'date_from': start,
+        'date_to': end,
+        'page': page,
+        'per_page': per_page,
+        'num_pages': num_pages,
+        'has_previous': page > 1,
+        'has_next': page < num_pages,
+        'previous_page': page - 1,
+        'next_page': page + 1,
+    }
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.images import backfill_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate responsive WebP/JPEG derivatives for uploaded images that don't have them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate derivatives that already exist")
+
+    def handle(self, *args, **options):
+        generated, skipped = backfill_derivatives(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {generated} image(s); skipped {skipped} unreadable."))
@@ -0,0 +1,32 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.template import Context, RequestContext, Template
+from django.test import RequestFactory
+from django.urls import resolve
+
+from messmetapp.context_processors import seo_context
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the per-render cost of the SEO context processor"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000, help="Calls per measurement")
+
+    def handle(self, *args, **options):
+        number = options['number']
+        factory = RequestFactory()
+        template = Template("{{ site_name }}")
+
+        for path in ['/', '/about/', '/plans/', '/meal-feedback/', '/api/plans/']:
+            request = factory.get(path)
+            request.resolver_match = resolve(path)
+            processor = timeit.timeit(lambda: seo_context(request), number=number)
+            # Same trivial template rendered with and without context processors
+            with_processors = timeit.timeit(lambda: template.render(RequestContext(request, {})), number=number)
+            plain = timeit.timeit(lambda: template.render(Context({})), number=number)
+            self.stdout.write(
+                f"{path:<16} seo_context {processor / number * 1e6:6.2f} us/call   "
+                f"render overhead {(with_processors - plain) / number * 1e6:6.2f} us/render"
+            )
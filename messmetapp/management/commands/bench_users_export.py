@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from messmetapp.exports import csv_lines, users_export_rows, USERS_HEADER
+from messmetapp.models import User, SubscriptionPlan, UserSubscription, Attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users inside a rolled-back transaction and time the users CSV "
+        "export at each size, to check it stays linear"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 25000, 50000],
+                            help="Cumulative user counts to measure at")
+        parser.add_argument('--meals', type=int, default=3, help="Attendance rows seeded per user")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(sorted(options['sizes']), options['meals'])
+            transaction.set_rollback(True)
+        self.stdout.write("Seed data rolled back.")
+
+    def _seed(self, start, stop, plan, meals):
+        today = timezone.localdate()
+        meal_types = [meal for meal, _label in SubscriptionPlan.MEAL_CHOICES]
+        users = User.objects.bulk_create(
+            [User(username=f'bench_user_{i:06d}', password='!', full_name=f'Bench {i}') for i in range(start, stop)],
+            batch_size=2000,
+        )
+        UserSubscription.objects.bulk_create(
+            [UserSubscription(user=user, plan=plan, start_date=today, end_date=today, active=True)
+             for user in users[::2]],
+            batch_size=2000,
+        )
+        Attendance.objects.bulk_create(
+            [Attendance(user=user, date=today - timedelta(days=n // len(meal_types)), meal_type=meal_types[n % len(meal_types)])
+             for user in users for n in range(meals)],
+            batch_size=2000,
+        )
+
+    def _run(self, sizes, meals):
+        plan = SubscriptionPlan.objects.create(title='Bench Plan', price=1, included_meals=['lunch'])
+        seeded = User.objects.count()
+        for size in sizes:
+            if size > seeded:
+                self._seed(seeded, size, plan, meals)
+                seeded = size
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                rows = sum(1 for _line in csv_lines(USERS_HEADER, users_export_rows())) - 1
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{rows:>7} users  {elapsed:7.2f}s  {elapsed / rows * 1e6:6.1f} us/row  "
+                f"{len(ctx.captured_queries)} queries"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.menu_artifacts import backfill_menu_artifacts
+
+
+class Command(BaseCommand):
+    help = "Build page previews and extracted text for monthly menus whose uploads changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild every menu's artifacts")
+
+    def handle(self, *args, **options):
+        built, unreadable = backfill_menu_artifacts(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"Built artifacts for {built} menu(s); {unreadable} had unreadable uploads."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.dashboard_sections import invalidate_section, sections_for_model
+from messmetapp.models import PaymentProof
+from messmetapp.screenshots import dedupe_stored_screenshots
+
+
+class Command(BaseCommand):
+    help = "Move payment screenshots to content-addressed names, merging identical files"
+
+    def handle(self, *args, **options):
+        moved, unique = dedupe_stored_screenshots()
+        for section in sections_for_model(PaymentProof):
+            invalidate_section(section)
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} screenshot(s); {unique} unique file(s) remain."))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from messmetapp.subscription_expiry import EXPIRY_BATCH_SIZE, expire_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Deactivate subscriptions past their end date and notify their users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE, help="Subscriptions updated per statement")
+        parser.add_argument('--interval', type=float, help="Keep running, sweeping every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_subscriptions(batch_size=options['batch_size'])
+            if expired or options['interval'] is None:
+                self.stdout.write(self.style.SUCCESS(f"Expired {expired} subscription(s)."))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.attendance_bits import rebuild_attendance_months
+
+
+class Command(BaseCommand):
+    help = "Rebuild the AttendanceMonth bitmaps from Attendance"
+
+    def handle(self, *args, **options):
+        rows = rebuild_attendance_months()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} attendance month row(s)."))
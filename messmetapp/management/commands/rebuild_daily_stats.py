@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyStats rollup from attendance, subscriptions, payments and users"
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily stats row(s)."))
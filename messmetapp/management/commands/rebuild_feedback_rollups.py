@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from messmetapp.feedback_stats import rebuild_feedback_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MealFeedbackRollup rating histograms from MealFeedback"
+
+    def handle(self, *args, **options):
+        rows = rebuild_feedback_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} meal feedback rollup row(s)."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from messmetapp.exports import claim_next_export_job, run_export_job
+from messmetapp.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Build queued CSV exports into MEDIA_ROOT/exports/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls of an empty queue")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_export_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f"Running {job}...")
+            job = run_export_job(job)
+            if job.status == ExportJob.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"Export #{job.pk}: {job.processed_rows} row(s) written to {job.file.name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Export #{job.pk} failed: {job.error}"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from messmetapp.images import claim_next_image_job, run_image_job
+from messmetapp.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = "Generate responsive derivatives and menu previews for queued uploads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls of an empty queue")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_image_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            job = run_image_job(job)
+            if job.status == ImageJob.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"Processed {job.source}"))
+            elif job.status == ImageJob.STATUS_PENDING:
+                self.stdout.write(self.style.WARNING(f"Retrying {job.source}: {job.error}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Failed {job.source}: {job.error}"))
@@ -2,12 +2,19 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Avg
 from django.utils import timezone
+from datetime import date, timedelta
 from .models import MealFeedback
+from .feedback_stats import rating_trends, feedback_summary
+from .pagination import keyset_page
 from .forms import MealFeedbackForm
 
 
+MAX_TREND_DAYS = 731
+FEEDBACK_PAGE_SIZE = 20
+FEEDBACK_ORDERING = ('-created_at', '-id')
+
+
 @login_required
 def meal_feedback_view(request):
     """Display meal feedback form and handle submissions"""
@@ -64,7 +71,7 @@ def api_meal_feedback_list(request):
         rating_min = request.GET.get('rating_min', '')
         
         # Build query
-        feedbacks = MealFeedback.objects.select_related('user').order_by('-created_at')
+        feedbacks = MealFeedback.objects.select_related('user')
         
         if meal_type:
             feedbacks = feedbacks.filter(meal_type=meal_type)
@@ -75,19 +82,16 @@ def api_meal_feedback_list(request):
         if rating_min:
             feedbacks = feedbacks.filter(rating__gte=int(rating_min))
         
-        # Pagination
-        page = int(request.GET.get('page', 1))
-        per_page = 20
-        start = (page - 1) * per_page
-        end = start + per_page
+        # Keyset pagination: ?cursor= is the previous page's next_cursor
+        cursor = request.GET.get('cursor') or None
+        try:
+            feedbacks_page, next_cursor = keyset_page(feedbacks, FEEDBACK_ORDERING, cursor=cursor, limit=FEEDBACK_PAGE_SIZE)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
         
-        feedbacks_page = feedbacks[start:end]
-        
-        # Calculate statistics
-        total_feedbacks = feedbacks.count()
-        avg_rating = feedbacks.aggregate(Avg('rating'))['rating__avg'] or 0.0
-        today_feedback = feedbacks.filter(created_at__date=timezone.localdate()).count()
-        low_ratings = feedbacks.filter(rating__lte=2).count()
+        # Calculate statistics in one query
+        stats = feedback_summary(feedbacks, timezone.localdate())
+        total_feedbacks = stats['total']
         
         # Prepare response data
         feedback_data = []
@@ -115,14 +119,43 @@ def api_meal_feedback_list(request):
             'success': True,
             'feedbacks': feedback_data,
             'total': total_feedbacks,
-            'avg_rating': round(avg_rating, 1),
-            'today_feedback': today_feedback,
-            'low_ratings': low_ratings,
-            'page': page,
-            'per_page': per_page,
-            'has_next': end < total_feedbacks,
-            'has_prev': page > 1
+            'avg_rating': round(stats['avg_rating'], 1),
+            'today_feedback': stats['today_feedback'],
+            'low_ratings': stats['low_ratings'],
+            'per_page': FEEDBACK_PAGE_SIZE,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'has_prev': cursor is not None
         })
         
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Error: {str(e)}'}, status=500)
+
+
+@login_required
+def api_meal_feedback_trends(request):
+    """Daily rating averages and histograms from the feedback rollup"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+
+    today = timezone.localdate()
+    try:
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else today
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else date_to - timedelta(days=89)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Dates must be YYYY-MM-DD'}, status=400)
+    if date_from > date_to:
+        return JsonResponse({'success': False, 'message': 'date_from must not be after date_to'}, status=400)
+    if (date_to - date_from).days > MAX_TREND_DAYS:
+        return JsonResponse({'success': False, 'message': f'At most {MAX_TREND_DAYS} days per request'}, status=400)
+
+    meal_type = request.GET.get('meal_type', '')
+    if meal_type and meal_type not in dict(MealFeedback.MEAL_CHOICES):
+        return JsonResponse({'success': False, 'message': 'Unknown meal type'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'days': rating_trends(date_from, date_to, meal_type or None),
+    })
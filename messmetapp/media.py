@@ -0,0 +1,201 @@
+"""
+Serving uploaded media: access rules, front-server hand-off and HTTP caching
+"""
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_http_methods
+
+from .images import DERIVATIVES_DIR
+from .models import PaymentProof, ResponsiveImage
+
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+# Content-addressed names (see storage.py) never change, so cache them for a year
+HASHED_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# --------- Access rules ---------
+
+def _public(user, name):
+    return True
+
+
+def _staff_only(user, name):
+    return user.is_staff
+
+
+def _payment_screenshot(user, name):
+    # Staff, or a user who submitted this screenshot with one of their proofs
+    if user.is_staff:
+        return True
+    return user.is_authenticated and PaymentProof.objects.filter(user=user, screenshot=name).exists()
+
+
+def _profile_image(user, name):
+    return user.is_staff or (user.is_authenticated and user.profile_image.name == name)
+
+
+# First matching prefix wins; anything unlisted is public
+MEDIA_RULES = (
+    ('payments/qr/', _public),
+    ('payments/', _payment_screenshot),
+    ('profiles/', _profile_image),
+    ('exports/', _staff_only),
+)
+
+
+def _rule_for(name):
+    for prefix, rule in MEDIA_RULES:
+        if name.startswith(prefix):
+            return rule
+    return _public
+
+
+def media_rule(name):
+    """
+    ``(rule, source name)`` for a stored file. A derivative
+    (``derivatives/<source stem>/w320.webp``) follows its original's rule;
+    the original's full name is only looked up when that rule is private.
+    """
+    if not name.startswith(DERIVATIVES_DIR + '/'):
+        return _rule_for(name), name
+    stem = posixpath.dirname(name[len(DERIVATIVES_DIR) + 1:])
+    rule = _rule_for(stem)
+    if rule is _public:
+        return rule, stem
+    source = ResponsiveImage.objects.filter(source__startswith=f'{stem}.').values_list('source', flat=True).first()
+    return rule, source or stem
+
+
+# --------- Responses ---------
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single ``bytes=`` range, or None to
+    send the whole file (no header, several ranges, or a malformed one).
+    Raises ValueError when the range can't be satisfied.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+        if start >= size:
+            raise ValueError("Range starts past the end of the file")
+        return start, min(end, size - 1)
+    length = int(last)
+    if not length or not size:
+        raise ValueError("Empty suffix range")
+    return max(0, size - length), size - 1
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(MEDIA_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, size, etag, content_type):
+    """The file itself: 206 for a satisfiable Range, 416 for an unsatisfiable one, else 200."""
+    header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        header = None
+    try:
+        byte_range = parse_range(header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _sendfile_response(name, path, content_type):
+    """Empty response telling the front server which file to send"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = str(path)
+    return response
+
+
+def _cache_headers(response, name, public):
+    max_age = IMMUTABLE_MAX_AGE if HASHED_NAME.search(name) else settings.MEDIA_CACHE_MAX_AGE
+    options = {'max_age': max_age}
+    if max_age == IMMUTABLE_MAX_AGE:
+        options['immutable'] = True
+    if public:
+        patch_cache_control(response, public=True, **options)
+    else:
+        patch_cache_control(response, private=True, **options)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT if the requester may see it: payment
+    screenshots only to staff and the user who submitted them, profile
+    images to their owner and staff, exports to staff, the rest to anyone.
+    Files that are missing or off limits both get a 404.
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, name))
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if name.startswith('.') or not full_path.is_file():
+        raise Http404("Not found")
+
+    rule, source = media_rule(name)
+    if not rule(request.user, source):
+        raise Http404("Not found")
+    public = rule is _public
+
+    stat = full_path.stat()
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return _cache_headers(not_modified, name, public)
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE in ('x-accel-redirect', 'x-sendfile'):
+        response = _sendfile_response(name, full_path, content_type)
+    else:
+        response = _file_response(request, full_path, stat.st_size, etag, content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['X-Content-Type-Options'] = 'nosniff'
+    return _cache_headers(response, name, public)
@@ -0,0 +1,172 @@
+"""
+Page previews and extracted text for uploaded monthly menus, so reading the
+menu doesn't mean downloading the full PDF
+"""
+import hashlib
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+
+from .images import _encode, enqueue_derivatives
+from .models import MonthlyMenu
+
+
+logger = logging.getLogger(__name__)
+
+MENU_PREVIEW_DIR = 'menus/previews'
+MENU_PREVIEW_WIDTH = 1280
+MENU_PREVIEW_MAX_PAGES = 12
+MENU_PREVIEW_OPTIONS = {'quality': 80, 'optimize': True, 'progressive': True}
+# Smaller embedded images are logos and icons, not scanned pages
+MIN_PAGE_IMAGE_WIDTH = 300
+
+_READ_ERRORS = (FileNotFoundError, UnidentifiedImageError, PyPdfError, OSError, ValueError)
+
+
+def menu_sources(menu):
+    """Storage names the artifacts are built from, as stored in ``artifacts_source``"""
+    names = [field.name for field in (menu.file, menu.image) if field]
+    return '|'.join(names)
+
+
+def _page_image(page):
+    # Pure-Python tools can't rasterise vector pages, but a scanned menu is
+    # one large image per page, which is the preview
+    best = None
+    for embedded in page.images:
+        try:
+            image = embedded.image
+        except (PyPdfError, OSError, ValueError, NotImplementedError):
+            continue
+        if image is None or image.width < MIN_PAGE_IMAGE_WIDTH:
+            continue
+        if best is None or image.width * image.height > best.width * best.height:
+            best = image
+    return best
+
+
+def _read_upload(storage, name):
+    """
+    ``(pages, text, images)`` for a stored PDF or image, or None when it
+    is missing or unreadable.
+    """
+    try:
+        with storage.open(name, 'rb') as handle:
+            if handle.read(5) == b'%PDF-':
+                handle.seek(0)
+                reader = PdfReader(handle)
+                texts, images = [], []
+                for number, page in enumerate(reader.pages):
+                    texts.append((page.extract_text() or '').strip())
+                    if number < MENU_PREVIEW_MAX_PAGES:
+                        images.append(_page_image(page))
+                return len(reader.pages), '\n\n'.join(text for text in texts if text), [i for i in images if i]
+            handle.seek(0)
+            image = Image.open(handle)
+            image.load()
+            return 1, '', [image]
+    except _READ_ERRORS as e:
+        logger.warning("Skipping menu artifacts for %s: %s", name, e)
+        return None
+
+
+def _save_preview(storage, menu, number, image):
+    image = ImageOps.exif_transpose(image)
+    if image.width > MENU_PREVIEW_WIDTH:
+        height = max(1, round(image.height * MENU_PREVIEW_WIDTH / image.width))
+        image = image.resize((MENU_PREVIEW_WIDTH, height), Image.Resampling.LANCZOS)
+    data = _encode(image, 'JPEG', MENU_PREVIEW_OPTIONS)
+    # Content in the name, so a re-upload never hits a cached old preview
+    name = f'{MENU_PREVIEW_DIR}/{menu.pk}/page-{number}-{hashlib.sha256(data).hexdigest()[:12]}.jpg'
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+    return {'name': name, 'width': image.width, 'height': image.height}
+
+
+def build_menu_artifacts(menu, storage=None):
+    """
+    Store the text and page previews of ``menu``'s uploads on the row. A
+    PDF gives its text and a preview of every scanned page; the menu image
+    is the preview when the PDF has none. Previews of an earlier upload
+    are deleted.
+
+    Returns False when an upload was missing or unreadable, else True.
+    """
+    storage = storage or default_storage
+    pages, text, images, readable = 0, '', [], True
+    if menu.file:
+        result = _read_upload(storage, menu.file.name)
+        if result is None:
+            readable = False
+        else:
+            pages, text, images = result
+    if not images and menu.image:
+        result = _read_upload(storage, menu.image.name)
+        if result is None:
+            readable = False
+        else:
+            images = result[2]
+
+    previews = [_save_preview(storage, menu, number, image) for number, image in enumerate(images, 1)]
+    kept = {preview['name'] for preview in previews}
+    for preview in menu.previews:
+        if preview['name'] not in kept:
+            storage.delete(preview['name'])
+
+    menu.extracted_text = text
+    menu.previews = previews
+    menu.page_count = pages or len(previews)
+    menu.artifacts_source = menu_sources(menu)
+    menu.save(update_fields=['extracted_text', 'previews', 'page_count', 'artifacts_source'])
+    return readable
+
+
+def queue_menu_artifacts(menu):
+    """
+    Queue building ``menu``'s artifacts on the image worker (see
+    run_image_job), keyed by its first upload. A menu without uploads is
+    cleared at once, since there is nothing to read.
+    """
+    names = menu_sources(menu)
+    if not names:
+        build_menu_artifacts(menu)
+        return None
+    return enqueue_derivatives(names.split('|')[0])
+
+
+def is_menu_upload(source):
+    """Whether the storage name ``source`` is a MonthlyMenu upload"""
+    return source.startswith(MonthlyMenu._meta.get_field('file').upload_to) and not source.startswith(MENU_PREVIEW_DIR)
+
+
+def build_artifacts_for_upload(source):
+    """
+    Build the artifacts of the menu ``source`` was uploaded to, unless
+    they are already current or a newer upload replaced it. Returns False
+    when an upload was unreadable.
+    """
+    menu = MonthlyMenu.objects.filter(Q(file=source) | Q(image=source)).first()
+    if menu is None or menu.artifacts_source == menu_sources(menu):
+        return True
+    return build_menu_artifacts(menu)
+
+
+def backfill_menu_artifacts(force=False):
+    """
+    Build artifacts for every menu whose uploads changed since they were
+    last built (every menu with ``force``). Returns ``(built, unreadable)``.
+    """
+    built = unreadable = 0
+    for menu in MonthlyMenu.objects.order_by('year', 'month'):
+        if not force and menu.artifacts_source == menu_sources(menu):
+            continue
+        if build_menu_artifacts(menu):
+            built += 1
+        else:
+            unreadable += 1
+    return built, unreadable
@@ -0,0 +1,183 @@
+"""
+Structured per-day menu: parsing the monthly menu's text into MenuItem rows
+and the cached today/week lookups
+"""
+import calendar
+import re
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import MenuItem, SubscriptionPlan
+from .page_cache import invalidate_page, pages_for_model
+
+
+MEALS = [meal for meal, _label in SubscriptionPlan.MEAL_CHOICES]
+# api/menu/week/ start dates are limited to this many days either side of today
+MENU_WEEK_MAX_OFFSET = 366
+# Seconds a lookup is cached. invalidate_menu_index() only reaches other
+# workers through a shared cache, so this bounds how stale they can be.
+MENU_INDEX_CACHE_TIMEOUT = 30
+WEEKDAYS = {
+    name: number
+    for number, names in enumerate((
+        ('monday', 'mon'), ('tuesday', 'tue', 'tues'), ('wednesday', 'wed'), ('thursday', 'thu', 'thur', 'thurs'),
+        ('friday', 'fri'), ('saturday', 'sat'), ('sunday', 'sun'),
+    ))
+    for name in names
+}
+
+# A line opening with a day: "Monday", "Tue:", "2025-10-03", "03/10/2025 -", "Day 3", "3rd)"
+_DAY = re.compile(
+    r'^\s*(?:(?P<iso>\d{4}-\d{1,2}-\d{1,2})'
+    r'|(?P<weekday>' + '|'.join(sorted(WEEKDAYS, key=len, reverse=True)) + r')\b\.?'
+    r'|(?:day\s*)?(?P<day>\d{1,2})(?:st|nd|rd|th)?(?:[/.-](?P<month>\d{1,2})(?:[/.-](?P<year>\d{2,4}))?)?(?!\d))'
+    r'\s*[:\-–.)]?\s*',
+    re.IGNORECASE,
+)
+_MEAL = re.compile(r'\b(' + '|'.join(MEALS) + r')\b\s*[:\-–=]?\s*', re.IGNORECASE)
+_DISH_SEPARATORS = re.compile(r'\s*[,;+|•]\s*')
+
+
+def _split_dishes(text):
+    return [dish.strip(' .-–') for dish in _DISH_SEPARATORS.split(text) if dish.strip(' .-–')]
+
+
+def _line_day(match, year, month):
+    """Key for a day heading: a date, a weekday number, or the string 'invalid'"""
+    if match.group('weekday'):
+        return WEEKDAYS[match.group('weekday').lower()]
+    try:
+        if match.group('iso'):
+            return date(*map(int, match.group('iso').split('-')))
+        day_year = int(match.group('year') or year)
+        return date(day_year + 2000 if day_year < 100 else day_year, int(match.group('month') or month), int(match.group('day')))
+    except ValueError:
+        return 'invalid'  # matches no day, so its meals are dropped
+
+
+def parse_menu_text(text, year, month):
+    """
+    ``{(date, meal_type): [dishes]}`` for ``month`` from a free-text menu.
+
+    Day headings are dates or weekday names, on their own line or leading
+    a meal line; meals are ``Lunch: Rajma, Rice``, with dishes separated by
+    commas, semicolons, ``+`` or ``|`` and continuing on following lines.
+    Weekday sections repeat through the month, meals given before any
+    heading apply to every day, and a dated entry beats both.
+    """
+    entries = {}  # (day key, meal) -> dishes; day key is a date, a weekday number or None
+    day_key, meal = None, None
+    for raw in (text or '').splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        day_match = _DAY.match(line)
+        if day_match and (day_match.group('weekday') or _MEAL.search(line, day_match.end()) or day_match.end() == len(line)):
+            day_key, meal = _line_day(day_match, year, month), None
+            line = line[day_match.end():]
+        meals = list(_MEAL.finditer(line))
+        if not meals:
+            if meal is not None and line:
+                entries.setdefault((day_key, meal), []).extend(_split_dishes(line))
+            continue
+        for index, match in enumerate(meals):
+            meal = match.group(1).lower()
+            end = meals[index + 1].start() if index + 1 < len(meals) else len(line)
+            entries[(day_key, meal)] = _split_dishes(line[match.end():end])
+
+    parsed = {}
+    days = [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+    for day in days:
+        for meal in MEALS:
+            for key in (day, day.weekday(), None):
+                dishes = entries.get((key, meal))
+                if dishes:
+                    parsed[(day, meal)] = dishes
+                    break
+    return parsed
+
+
+def index_menu(menu):
+    """
+    Rebuild the parsed MenuItem rows for ``menu``'s month from its text,
+    falling back to the text extracted from its PDF. Entries made by staff
+    are kept. Returns the number of rows written.
+    """
+    parsed = parse_menu_text(menu.text, menu.year, menu.month) or parse_menu_text(menu.extracted_text, menu.year, menu.month)
+    first = date(menu.year, menu.month, 1)
+    last = date(menu.year, menu.month, calendar.monthrange(menu.year, menu.month)[1])
+    with transaction.atomic():
+        manual = set(
+            MenuItem.objects.filter(date__range=(first, last), source=MenuItem.SOURCE_MANUAL).values_list('date', 'meal_type')
+        )
+        MenuItem.objects.filter(date__range=(first, last), source=MenuItem.SOURCE_PARSED).delete()
+        items = MenuItem.objects.bulk_create([
+            MenuItem(menu=menu, date=day, meal_type=meal, dishes=dishes)
+            for (day, meal), dishes in sorted(parsed.items())
+            if (day, meal) not in manual
+        ])
+    # bulk_create skips the signals that expire the cached lookups and pages
+    invalidate_menu_index()
+    for name in pages_for_model(MenuItem):
+        invalidate_page(name)
+    return len(items)
+
+
+def save_menu_item(day, meal_type, dishes):
+    """
+    Staff entry for one meal, overriding the parsed menu. An empty
+    ``dishes`` removes the meal. Returns the MenuItem or None.
+    """
+    if not dishes:
+        MenuItem.objects.filter(date=day, meal_type=meal_type).delete()
+        return None
+    item, _created = MenuItem.objects.update_or_create(
+        date=day, meal_type=meal_type,
+        defaults={'dishes': dishes, 'source': MenuItem.SOURCE_MANUAL},
+    )
+    return item
+
+
+# --------- Cached lookups ---------
+
+def _generation():
+    generation = cache.get('menu_index:generation')
+    if generation is None:
+        generation = time.time_ns()
+        cache.set('menu_index:generation', generation, None)
+    return generation
+
+
+def invalidate_menu_index():
+    cache.set('menu_index:generation', time.time_ns(), None)
+
+
+def _day(day, meals):
+    return {'date': day.isoformat(), 'meals': {meal: meals.get(meal, []) for meal in MEALS}}
+
+
+def menu_for_days(first, days):
+    """``[{'date', 'meals': {meal: [dishes]}}, ...]`` for ``days`` days from ``first``, cached"""
+    key = f'menu_index:{_generation()}:{first.isoformat()}:{days}'
+    result = cache.get(key)
+    if result is None:
+        last = first + timedelta(days=days - 1)
+        by_day = {}
+        for day, meal, dishes in MenuItem.objects.filter(date__range=(first, last)).values_list('date', 'meal_type', 'dishes'):
+            by_day.setdefault(day, {})[meal] = dishes
+        result = [_day(first + timedelta(days=offset), by_day.get(first + timedelta(days=offset), {})) for offset in range(days)]
+        cache.set(key, result, getattr(settings, 'MENU_INDEX_CACHE_TIMEOUT', MENU_INDEX_CACHE_TIMEOUT))
+    return result
+
+
+def menu_for_day(day):
+    return menu_for_days(day, 1)[0]
+
+
+def menu_for_week(start):
+    days = menu_for_days(start, 7)
+    return {'start': days[0]['date'], 'end': days[-1]['date'], 'days': days}
@@ -0,0 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+
+from .entitlements import Entitlements
+
+
+class EntitlementMiddleware:
+    """
+    Attach ``request.entitlements``. The user is read on first access, so
+    DRF views see the user their own authentication resolved.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.entitlements = SimpleLazyObject(lambda: Entitlements(request.user))
+        return self.get_response(request)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0011_ownerimage_staffimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('users', models.PositiveIntegerField(default=0, help_text='Non-staff users')),
+                ('active_subscribers', models.PositiveIntegerField(default=0, help_text='Non-staff users with an active subscription')),
+                ('pending_payments', models.PositiveIntegerField(default=0)),
+                ('attendees', models.PositiveIntegerField(default=0, help_text='Distinct non-staff users who attended on this date')),
+                ('new_users', models.PositiveIntegerField(default=0, help_text='Users who joined on this date')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Stats',
+                'verbose_name_plural': 'Daily Stats',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
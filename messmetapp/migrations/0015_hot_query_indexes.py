@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0014_attendancemonth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'user'], name='attendance_date_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealfeedback',
+            index=models.Index(fields=['meal_date', 'meal_type', 'rating'], name='mealfeedback_date_meal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentproof',
+            index=models.Index(fields=['status', '-submitted_at'], name='paymentproof_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='popupnotice',
+            index=models.Index(fields=['end_datetime', 'is_active', 'start_datetime'], name='popupnotice_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(fields=['user', 'active', '-created_at'], name='usersub_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(fields=['end_date', 'active'], name='usersub_end_active_idx'),
+        ),
+    ]
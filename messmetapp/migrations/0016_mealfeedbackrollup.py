@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:42
+
+import messmetapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0015_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealFeedbackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('meal_date', models.DateField()),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Breakfast'), ('lunch', 'Lunch'), ('dinner', 'Dinner')], max_length=20)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('rating_histogram', models.JSONField(default=messmetapp.models._empty_histogram)),
+                ('taste_histogram', models.JSONField(default=messmetapp.models._empty_histogram)),
+                ('quantity_histogram', models.JSONField(default=messmetapp.models._empty_histogram)),
+                ('hygiene_histogram', models.JSONField(default=messmetapp.models._empty_histogram)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-meal_date', 'meal_type'],
+                'unique_together': {('meal_date', 'meal_type')},
+            },
+        ),
+    ]
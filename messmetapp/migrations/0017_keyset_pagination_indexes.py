@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0016_mealfeedbackrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['user', 'date', 'marked_at', 'id'], name='attendance_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealfeedback',
+            index=models.Index(fields=['created_at', 'id'], name='mealfeedback_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:52
+
+import messmetapp.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0019_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsiveimage',
+            name='phash',
+            field=models.CharField(blank=True, db_index=True, help_text='64-bit difference hash, hex', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='paymentproof',
+            name='screenshot',
+            field=models.ImageField(storage=messmetapp.storage.payment_storage, upload_to='payments/'),
+        ),
+        migrations.AlterField(
+            model_name='visitorpayment',
+            name='screenshot',
+            field=models.ImageField(storage=messmetapp.storage.payment_storage, upload_to='payments/'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0020_payment_screenshot_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlymenu',
+            name='artifacts_source',
+            field=models.CharField(blank=True, help_text='Upload the previews and text were built from', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='monthlymenu',
+            name='extracted_text',
+            field=models.TextField(blank=True, help_text='Text pulled from the uploaded PDF'),
+        ),
+        migrations.AddField(
+            model_name='monthlymenu',
+            name='page_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthlymenu',
+            name='previews',
+            field=models.JSONField(blank=True, default=list, help_text='Page preview JPEGs: [{name, width, height}, ...]'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messmetapp', '0021_menu_artifacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Breakfast'), ('lunch', 'Lunch'), ('dinner', 'Dinner')], max_length=20)),
+                ('dishes', models.JSONField(default=list)),
+                ('source', models.CharField(choices=[('parsed', 'Parsed from menu'), ('manual', 'Entered by staff')], default='parsed', max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('menu', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='messmetapp.monthlymenu')),
+            ],
+            options={
+                'ordering': ['date', 'meal_type'],
+                'unique_together': {('date', 'meal_type')},
+            },
+        ),
+    ]
@@ -2,9 +2,12 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.utils import timezone
+from django.core.files.storage import default_storage
 from django.core.validators import RegexValidator
 from datetime import date, timedelta
 
+from .storage import payment_storage
+
 
 class User(AbstractUser):
     full_name = models.CharField(max_length=150, blank=True, null=True)
@@ -78,6 +81,13 @@ class UserSubscription(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # A user's newest active subscription
+            models.Index(fields=["user", "active", "-created_at"], name="usersub_user_active_idx"),
+            # The expiry sweep. end_date leads because Django filters booleans
+            # as a bare column (WHERE active), which can't seek an index
+            models.Index(fields=["end_date", "active"], name="usersub_end_active_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user.username} -> {self.plan.title}"
@@ -95,7 +105,7 @@ class PaymentProof(models.Model):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="payment_proofs")
     subscription_plan = models.ForeignKey(SubscriptionPlan, on_delete=models.CASCADE, related_name="payment_proofs")
-    screenshot = models.ImageField(upload_to="payments/")
+    screenshot = models.ImageField(upload_to="payments/", storage=payment_storage)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     txn_id = models.CharField(max_length=100, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
@@ -105,6 +115,9 @@ class PaymentProof(models.Model):
 
     class Meta:
         ordering = ["-submitted_at"]
+        indexes = [
+            models.Index(fields=["status", "-submitted_at"], name="paymentproof_status_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"PaymentProof #{self.pk} - {self.user.username}"
@@ -121,11 +134,49 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ("user", "date", "meal_type")
         ordering = ["-date", "-marked_at"]
+        indexes = [
+            # Per-day lookups; the unique index above serves per-user ones
+            models.Index(fields=["date", "user"], name="attendance_date_user_idx"),
+            # A user's history, newest first, in keyset pages
+            models.Index(fields=["user", "date", "marked_at", "id"], name="attendance_user_recent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.date} - {self.meal_type}"
 
 
+class AttendanceMonth(models.Model):
+    """
+    One user's attendance for one month packed into a bitmap per meal:
+    bit ``day - 1`` of ``lunch`` is set when the user had lunch that day.
+    Kept in sync from Attendance writes (see attendance_bits.py).
+    """
+    MEAL_FIELDS = [meal for meal, _label in SubscriptionPlan.MEAL_CHOICES]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="attendance_months")
+    month = models.DateField(help_text="First day of the month")
+    breakfast = models.PositiveIntegerField(default=0)
+    lunch = models.PositiveIntegerField(default=0)
+    dinner = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "month")
+        ordering = ["-month"]
+
+    def __str__(self) -> str:
+        return f"{self.user.username} - {self.month:%Y-%m}"
+
+    def meals_on(self, day: int):
+        """Meal types attended on day-of-month ``day``"""
+        mask = 1 << (day - 1)
+        return [meal for meal in self.MEAL_FIELDS if getattr(self, meal) & mask]
+
+    @property
+    def days_attended(self) -> int:
+        """Distinct days with at least one meal"""
+        return bin(self.breakfast | self.lunch | self.dinner).count("1")
+
+
 class MonthlyMenu(models.Model):
     month = models.PositiveSmallIntegerField()  # 1-12
     year = models.PositiveSmallIntegerField()
@@ -133,6 +184,11 @@ class MonthlyMenu(models.Model):
     image = models.ImageField(upload_to="menus/", blank=True, null=True)
     text = models.TextField(blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Lightweight copies of the upload, built by menu_artifacts.py
+    extracted_text = models.TextField(blank=True, help_text="Text pulled from the uploaded PDF")
+    previews = models.JSONField(default=list, blank=True, help_text="Page preview JPEGs: [{name, width, height}, ...]")
+    page_count = models.PositiveSmallIntegerField(default=0)
+    artifacts_source = models.CharField(max_length=255, blank=True, help_text="Upload the previews and text were built from")
 
     class Meta:
         unique_together = ("month", "year")
@@ -141,6 +197,38 @@ class MonthlyMenu(models.Model):
     def __str__(self) -> str:
         return f"Menu {self.month}/{self.year}"
 
+    def preview_images(self):
+        """``previews`` with each image's URL added"""
+        return [{**preview, "url": default_storage.url(preview["name"])} for preview in self.previews]
+
+
+class MenuItem(models.Model):
+    """
+    Dishes for one meal on one day: the structured index behind the
+    today/week menu lookups. Parsed from the monthly menu's text (see
+    menu_index.py) or entered by staff; staff entries survive re-parsing.
+    """
+    SOURCE_PARSED = "parsed"
+    SOURCE_MANUAL = "manual"
+    SOURCE_CHOICES = [
+        (SOURCE_PARSED, "Parsed from menu"),
+        (SOURCE_MANUAL, "Entered by staff"),
+    ]
+
+    menu = models.ForeignKey(MonthlyMenu, on_delete=models.CASCADE, null=True, blank=True, related_name="items")
+    date = models.DateField()
+    meal_type = models.CharField(max_length=20, choices=SubscriptionPlan.MEAL_CHOICES)
+    dishes = models.JSONField(default=list)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_PARSED)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("date", "meal_type")
+        ordering = ["date", "meal_type"]
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.meal_type}: {', '.join(self.dishes)}"
+
 
 class Notification(models.Model):
     target = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
@@ -207,6 +295,11 @@ class MealFeedback(models.Model):
     class Meta:
         ordering = ["-created_at"]
         unique_together = ['user', 'meal_type', 'meal_date']
+        indexes = [
+            models.Index(fields=['meal_date', 'meal_type', 'rating'], name='mealfeedback_date_meal_idx'),
+            # Keyset pages of the staff feedback list
+            models.Index(fields=['created_at', 'id'], name='mealfeedback_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.get_meal_type_display()} ({self.meal_date}) - {self.get_rating_display()}"
@@ -250,7 +343,7 @@ class VisitorPayment(models.Model):
     mobile_no = models.CharField(max_length=20, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     meal_type = models.CharField(max_length=20, choices=SubscriptionPlan.MEAL_CHOICES)
-    screenshot = models.ImageField(upload_to='payments/')
+    screenshot = models.ImageField(upload_to='payments/', storage=payment_storage)
     note = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -322,6 +415,10 @@ class PopupNotice(models.Model):
     
     class Meta:
         ordering = ['-priority', '-created_at']
+        indexes = [
+            # The notice index loads live and upcoming notices by end time
+            models.Index(fields=['end_datetime', 'is_active', 'start_datetime'], name='popupnotice_live_idx'),
+        ]
         verbose_name = "Popup Notice"
         verbose_name_plural = "Popup Notices"
     
@@ -374,4 +471,170 @@ class OwnerImage(models.Model):
         verbose_name_plural = "Owner Images"
 
     def __str__(self) -> str:
-        return f"{self.name} - {self.title}"
\ No newline at end of file
+        return f"{self.name} - {self.title}"
+
+class DailyStats(models.Model):
+    """
+    Dashboard counters rolled up per day and kept current by signals
+    (see stats.py). ``attendees`` and ``new_users`` belong to the row's
+    date; ``users``, ``active_subscribers`` and ``pending_payments`` are
+    snapshots that are maintained on the current day's row.
+    """
+    date = models.DateField(unique=True)
+    users = models.PositiveIntegerField(default=0, help_text="Non-staff users")
+    active_subscribers = models.PositiveIntegerField(default=0, help_text="Non-staff users with an active subscription")
+    pending_payments = models.PositiveIntegerField(default=0)
+    attendees = models.PositiveIntegerField(default=0, help_text="Distinct non-staff users who attended on this date")
+    new_users = models.PositiveIntegerField(default=0, help_text="Users who joined on this date")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = "Daily Stats"
+        verbose_name_plural = "Daily Stats"
+
+    def __str__(self) -> str:
+        return f"Stats {self.date}"
+
+
+class ExportJob(models.Model):
+    """
+    A CSV export built off the request path by the ``run_export_jobs``
+    worker; the finished file is stored under MEDIA_ROOT/exports/.
+    """
+    KIND_ATTENDANCE = 'attendance'
+    KIND_USERS = 'users'
+    KIND_MEAL_FEEDBACK = 'meal_feedback'
+
+    KIND_CHOICES = [
+        (KIND_ATTENDANCE, 'Attendance'),
+        (KIND_USERS, 'Users'),
+        (KIND_MEAL_FEEDBACK, 'Meal Feedback'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True, help_text="Export filters")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="export_jobs")
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports/", blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} export #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        """Percent complete, 0-100"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
+
+
+def _empty_histogram():
+    return [0] * len(MealFeedback.RATING_CHOICES)
+
+
+class MealFeedbackRollup(models.Model):
+    """
+    Meal feedback for one meal on one day, kept current by signals (see
+    feedback_stats.py). Each histogram holds the number of responses per
+    rating, index 0 being a rating of 1.
+    """
+    HISTOGRAM_FIELDS = {
+        'rating': 'rating_histogram',
+        'taste_rating': 'taste_histogram',
+        'quantity_rating': 'quantity_histogram',
+        'hygiene_rating': 'hygiene_histogram',
+    }
+
+    meal_date = models.DateField()
+    meal_type = models.CharField(max_length=20, choices=MealFeedback.MEAL_CHOICES)
+    responses = models.PositiveIntegerField(default=0)
+    rating_histogram = models.JSONField(default=_empty_histogram)
+    taste_histogram = models.JSONField(default=_empty_histogram)
+    quantity_histogram = models.JSONField(default=_empty_histogram)
+    hygiene_histogram = models.JSONField(default=_empty_histogram)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('meal_date', 'meal_type')
+        ordering = ['-meal_date', 'meal_type']
+
+    def __str__(self) -> str:
+        return f"{self.get_meal_type_display()} feedback {self.meal_date}"
+
+
+class ResponsiveImage(models.Model):
+    """
+    Resized WebP/JPEG copies of an uploaded image plus a blurred
+    placeholder, built by images.py and used by the ``responsive_img`` tag.
+    ``variants`` maps a format to ``[[width, storage name], ...]``, narrowest first.
+    """
+    source = models.CharField(max_length=255, unique=True, help_text="Storage name of the original upload")
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True)
+    placeholder = models.TextField(blank=True, help_text="Tiny blurred JPEG as a data: URI")
+    phash = models.CharField(max_length=16, blank=True, db_index=True, help_text="64-bit difference hash, hex")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.source
+
+
+class ImageJob(models.Model):
+    """
+    Queued derivative generation for one uploaded image, or the previews
+    and text of a monthly menu upload, run off the request path by the
+    ``run_image_jobs`` worker (see images.py).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    source = models.CharField(max_length=255, help_text="Storage name of the original upload")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='imagejob_queue_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Image job #{self.pk} {self.source} ({self.status})"
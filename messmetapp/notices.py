@@ -0,0 +1,118 @@
+"""
+Process-local index of the popup notices currently on air
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .entitlements import Entitlements
+from .models import User, PopupNotice
+
+
+_VERSION_KEY = 'notices:index:version'
+# Seconds an index is kept at most. The version key is only seen by every
+# worker with a shared cache, so this bounds how late the others catch up.
+NOTICE_INDEX_MAX_AGE = 60
+_lock = threading.Lock()
+_index = None
+
+
+class NoticeIndex:
+    """
+    Notices live at ``built_at``, bucketed by target audience and sorted by
+    priority (then newest first, matching PopupNotice.Meta.ordering).
+
+    The index is only valid until ``expires_at``: the next moment a notice
+    starts or ends, or NOTICE_INDEX_MAX_AGE seconds after ``now`` if that
+    comes first. ``version`` ties it to the shared invalidation counter.
+    """
+
+    def __init__(self, notices, now, version):
+        self.version = version
+        self.buckets = {}
+        boundaries = [now + timedelta(seconds=getattr(settings, 'NOTICE_INDEX_MAX_AGE', NOTICE_INDEX_MAX_AGE))]
+        for notice in notices:
+            if notice.start_datetime > now:
+                boundaries.append(notice.start_datetime)
+                continue
+            # end_datetime is inclusive, so the notice drops off just after it
+            boundaries.append(notice.end_datetime + timedelta(microseconds=1))
+            self.buckets.setdefault(notice.target_audience, []).append(notice)
+        for bucket in self.buckets.values():
+            bucket.sort(key=_sort_key)
+        self.expires_at = min(boundaries)
+
+    def is_valid(self, now, version):
+        return self.version == version and now < self.expires_at
+
+    def bucket(self, audience):
+        return self.buckets.get(audience, [])
+
+
+def _sort_key(notice):
+    return (-notice.priority, -notice.created_at.timestamp())
+
+
+def _current_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.set(_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_notice_index():
+    """
+    Drop the index in this process and, through a shared cache, in every
+    other. Without one, the others rebuild within NOTICE_INDEX_MAX_AGE.
+    """
+    global _index
+    cache.set(_VERSION_KEY, time.time_ns(), None)
+    _index = None
+
+
+def get_notice_index():
+    """Return the current index, rebuilding it with one query when stale."""
+    global _index
+    now = timezone.now()
+    version = _current_version()
+    index = _index
+    if index is not None and index.is_valid(now, version):
+        return index
+    with _lock:
+        if _index is not None and _index.is_valid(now, version):
+            return _index
+        notices = PopupNotice.objects.filter(is_active=True, end_datetime__gte=now)
+        _index = NoticeIndex(list(notices), now, version)
+        return _index
+
+
+def get_active_notices_for_user(user, entitlements=None):
+    """
+    Get all currently active popup notices for a given user
+    based on datetime and target audience.
+
+    Served from the notice index; the user's subscription is only looked
+    up (through ``entitlements``, usually ``request.entitlements``) when
+    subscriber-only notices are live.
+    """
+    index = get_notice_index()
+    buckets = [index.bucket(PopupNotice.TARGET_ALL_USERS)]
+    if not user.is_authenticated:
+        return list(buckets[0])
+
+    if user.hostel_status == User.HOSTEL_STATUS_HOSTELLER:
+        buckets.append(index.bucket(PopupNotice.TARGET_HOSTELLERS))
+    elif user.hostel_status == User.HOSTEL_STATUS_NON_HOSTELLER:
+        buckets.append(index.bucket(PopupNotice.TARGET_NON_HOSTELLERS))
+    subscriber_notices = index.bucket(PopupNotice.TARGET_ACTIVE_SUBSCRIBERS)
+    if subscriber_notices and (entitlements or Entitlements(user)).has_subscription:
+        buckets.append(subscriber_notices)
+
+    if len(buckets) == 1:
+        return list(buckets[0])
+    return sorted((notice for bucket in buckets for notice in bucket), key=_sort_key)
@@ -0,0 +1,114 @@
+"""
+Full-page cache for the public pages served to anonymous visitors
+"""
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+from .models import (
+    CarouselImage, FoodImage, SubscriptionPlan, MonthlyMenu, StaffImage, OwnerImage,
+    PaymentConfig, PopupNotice, MenuItem,
+)
+
+
+# page name -> models whose writes invalidate it
+PAGES = {
+    'home': (CarouselImage, FoodImage, SubscriptionPlan, PaymentConfig, PopupNotice, MenuItem),
+    'about': (StaffImage, OwnerImage),
+    'menu': (MonthlyMenu,),
+    'plans': (SubscriptionPlan,),
+}
+
+# Cached pages are shared between visitors, so CSRF tokens are stored as a
+# placeholder and swapped for the requesting visitor's token
+CSRF_PLACEHOLDER = '__page_csrf_token__'
+_CSRF_INPUT = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _generation_key(name):
+    return f'page:{name}:generation'
+
+
+def _generation(name):
+    generation = cache.get(_generation_key(name))
+    if generation is None:
+        generation = time.time_ns()
+        cache.set(_generation_key(name), generation, None)
+    return generation
+
+
+def invalidate_page(name):
+    cache.set(_generation_key(name), time.time_ns(), None)
+
+
+def pages_for_model(model):
+    return [name for name, models in PAGES.items() if model in models]
+
+
+def _timeout(name):
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+    if PopupNotice not in PAGES[name]:
+        return timeout
+    # Anonymous visitors see "all users" notices, which switch on and off
+    # by time rather than by a write; don't cache past the next switch
+    now = timezone.now()
+    boundaries = PopupNotice.objects.filter(
+        is_active=True, target_audience=PopupNotice.TARGET_ALL_USERS, end_datetime__gte=now,
+    ).aggregate(
+        next_start=Min('start_datetime', filter=Q(start_datetime__gt=now)),
+        next_end=Min('end_datetime'),
+    )
+    for boundary in boundaries.values():
+        if boundary is not None:
+            timeout = min(timeout, max(1, int((boundary - now).total_seconds()) + 1))
+    return timeout
+
+
+def _cacheable(request):
+    return (
+        request.method == 'GET'
+        and not request.GET
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def cache_public_page(name):
+    """
+    Serve the decorated view from the cache for anonymous GET requests.
+
+    Authenticated users, query strings and requests with pending flash
+    messages always reach the view. Entries are dropped when any model in
+    PAGES[name] is saved or deleted (see signals.py) and keyed by the local
+    date, so date-dependent content rolls over at midnight.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = 'page:{}:{}:{}:{}'.format(
+                name, _generation(name), timezone.localdate().isoformat(), request.path,
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                content = _CSRF_INPUT.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', response.content.decode(response.charset))
+                cache.set(key, (content, response['Content-Type']), _timeout(name))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,117 @@
+"""
+Keyset (cursor) pagination for list APIs
+"""
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Return the row values an opaque cursor points at; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(ordering):
+            raise ValueError
+        values = [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, raw)
+        ]
+    except (TypeError, ValueError, ValidationError):
+        raise ValueError("Invalid cursor")
+    if any(value is None for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _after(ordering, values):
+    """
+    Rows strictly after ``values`` in ``ordering`` (every field ascending or
+    every field descending). The leading ``<=``/``>=`` on the first field
+    keeps the condition an index range rather than a bare OR.
+    """
+    descending = ordering[0].startswith('-')
+    op = 'lt' if descending else 'gt'
+    fields = [name.lstrip('-') for name in ordering]
+    branches = []
+    for i, field in enumerate(fields):
+        ties = {fields[j]: values[j] for j in range(i)}
+        branches.append(Q(**ties, **{f'{field}__{op}': values[i]}))
+    return Q(**{f'{fields[0]}__{op}e': values[0]}) & reduce(operator.or_, branches)
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=25):
+    """
+    One page of ``queryset`` in ``ordering``, which must end with a unique
+    field (usually ``id``/``-id``) so every row has a distinct position.
+    The cursor holds the last row's ordering values, so a page is a range
+    read on an index however deep it is.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    if len({name.startswith('-') for name in ordering}) != 1:
+        raise ValueError("Keyset ordering fields must share one direction")
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, queryset.model, ordering)))
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
+    return rows, next_cursor
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    DRF pagination over ``keyset_page``. Subclasses set ``ordering``;
+    clients pass ``?cursor=`` (the previous ``next_cursor``) and ``?limit=``.
+    """
+    ordering = ('-id',)
+    page_size = 25
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            rows, self.next_cursor = keyset_page(
+                queryset, self.ordering,
+                cursor=request.query_params.get(self.cursor_query_param) or None,
+                limit=self.get_page_size(request),
+            )
+        except ValueError as e:
+            raise DRFValidationError({self.cursor_query_param: str(e)})
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': self.next_cursor,
+            'has_next': self.next_cursor is not None,
+        })
+
+
+class AttendanceCursorPagination(KeysetCursorPagination):
+    ordering = ('-date', '-marked_at', '-id')
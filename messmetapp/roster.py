@@ -0,0 +1,145 @@
+"""
+Roster snapshot used by the staff dashboard
+"""
+import base64
+import json
+
+from django.db.models import Count, Max, Prefetch, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import User, UserSubscription, Attendance
+
+
+ROSTER_PAGE_SIZE = 25
+ROSTER_MAX_PAGE_SIZE = 100
+
+# Public sort keys -> (annotated/model field, cursor value parser)
+ROSTER_SORT_FIELDS = {
+    'username': ('username', str),
+    'full_name': ('sort_full_name', str),
+    'date_joined': ('date_joined', parse_datetime),
+}
+
+
+def roster_queryset(hostel_status=None, today=None, search=None):
+    """
+    Non-staff users annotated with attendance totals and prefetched with
+    today's attendance and their active subscriptions (plan included).
+
+    Evaluating the queryset costs a fixed number of queries regardless of
+    how many users are returned: one for the users, one for today's
+    attendance and one for the active subscriptions.
+    """
+    today = today or timezone.localdate()
+    qs = User.objects.filter(is_staff=False)
+    if hostel_status in [User.HOSTEL_STATUS_HOSTELLER, User.HOSTEL_STATUS_NON_HOSTELLER]:
+        qs = qs.filter(hostel_status=hostel_status)
+    if search:
+        qs = qs.filter(
+            Q(username__istartswith=search)
+            | Q(full_name__istartswith=search)
+            | Q(mobile_no__startswith=search)
+        )
+
+    return qs.annotate(
+        sort_full_name=Coalesce('full_name', Value('')),
+        # Count distinct dates attended, not total meal records
+        total_attendance_count=Count('attendances__date', distinct=True),
+        last_attendance=Max('attendances__marked_at'),
+    ).prefetch_related(
+        Prefetch(
+            'attendances',
+            queryset=Attendance.objects.filter(date=today).order_by('marked_at'),
+            to_attr='today_attendances',
+        ),
+        Prefetch(
+            'subscriptions',
+            queryset=UserSubscription.objects.filter(active=True).select_related('plan').order_by('-created_at'),
+            to_attr='active_subscriptions',
+        ),
+    ).order_by('username')
+
+
+def _attach_snapshot_fields(users):
+    for user in users:
+        user.today_attendance = user.today_attendances[0] if user.today_attendances else None
+        user.today_meals = [att.meal_type for att in user.today_attendances]
+        user.active_subscription = user.active_subscriptions[0] if user.active_subscriptions else None
+    return users
+
+
+def build_roster_snapshot(hostel_status=None, today=None):
+    """
+    Evaluate the roster and attach the per-user fields the dashboard
+    templates expect:
+
+    - ``today_attendance``: first meal marked today, or None
+    - ``today_meals``: list of meal types marked today
+    - ``active_subscriptions``: active subscriptions, newest first
+    - ``active_subscription``: newest active subscription, or None
+    - ``total_attendance_count`` / ``last_attendance``: annotations
+    """
+    users = list(roster_queryset(hostel_status=hostel_status, today=today))
+    return _attach_snapshot_fields(users)
+
+
+def encode_roster_cursor(value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_roster_cursor(cursor, sort_key):
+    """Return ``(value, pk)`` from an opaque cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = ROSTER_SORT_FIELDS[sort_key][1](value)
+        pk = int(pk)
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("Invalid cursor")
+    if value is None:
+        raise ValueError("Invalid cursor")
+    return value, pk
+
+
+def roster_page(hostel_status=None, search=None, sort='username', cursor=None, limit=ROSTER_PAGE_SIZE, today=None):
+    """
+    One keyset-paginated page of the roster.
+
+    ``sort`` is a key of ROSTER_SORT_FIELDS, optionally prefixed with
+    ``-`` for descending order. Pages are ordered by ``(sort field, id)``
+    so the cursor (the last row's sort value and id) always resumes at
+    the right place, and deep pages cost the same as the first one.
+
+    Returns ``(users, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    descending = sort.startswith('-')
+    sort_key = sort.lstrip('-')
+    if sort_key not in ROSTER_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort: {sort}")
+    field = ROSTER_SORT_FIELDS[sort_key][0]
+    limit = max(1, min(int(limit), ROSTER_MAX_PAGE_SIZE))
+
+    qs = roster_queryset(hostel_status=hostel_status, today=today, search=search)
+    if cursor:
+        value, pk = decode_roster_cursor(cursor, sort_key)
+        op = 'lt' if descending else 'gt'
+        qs = qs.filter(
+            Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+        )
+    if descending:
+        qs = qs.order_by(f'-{field}', '-id')
+    else:
+        qs = qs.order_by(field, 'id')
+
+    users = list(qs[:limit + 1])
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        last = users[-1]
+        next_cursor = encode_roster_cursor(getattr(last, field), last.pk)
+    return _attach_snapshot_fields(users), next_cursor
@@ -0,0 +1,100 @@
+"""
+Spotting payment screenshots that were submitted before
+"""
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from .images import enqueue_derivatives, hash_distance
+from .models import PaymentProof, ResponsiveImage, VisitorPayment
+from .storage import content_addressed_name, content_hash, payment_storage
+
+
+# Perceptual hashes this close are treated as the same screenshot
+PHASH_MAX_DISTANCE = 6
+
+
+def _screenshots():
+    """(kind, id, storage name) for every stored payment screenshot"""
+    for kind, model in (('proof', PaymentProof), ('visitor payment', VisitorPayment)):
+        for pk, name in model.objects.exclude(screenshot='').values_list('id', 'screenshot'):
+            yield kind, pk, name
+
+
+def find_duplicate_screenshots(proofs, max_distance=PHASH_MAX_DISTANCE):
+    """
+    Earlier submissions of each proof's screenshot, for the review list:
+    ``{proof id: [{'kind', 'id', 'exact'}, ...]}``. Identical bytes share a
+    storage name (see storage.py); near-identical images are matched on
+    perceptual hash once the image worker has computed it.
+
+    Uses three queries however many proofs are given. Only screenshots
+    sharing a name with, or hashing close to, one of ``proofs`` are loaded;
+    the near-match scan covers hashed screenshots, not every payment row.
+    """
+    proofs = [proof for proof in proofs if proof.screenshot]
+    if not proofs:
+        return {}
+    names = {proof.screenshot.name for proof in proofs}
+    hashes = dict(
+        ResponsiveImage.objects.filter(source__startswith='payments/')
+        .exclude(source__startswith='payments/qr/').exclude(phash='')
+        .values_list('source', 'phash')
+    )
+    similar = {}  # proof's screenshot name -> names of other screenshots close to it
+    for name in names:
+        if name in hashes:
+            similar[name] = {
+                other for other, phash in hashes.items()
+                if other != name and hash_distance(hashes[name], phash) <= max_distance
+            }
+    candidates = names.union(*similar.values())
+    others = [
+        (kind, pk, other)
+        for kind, model in (('proof', PaymentProof), ('visitor payment', VisitorPayment))
+        for pk, other in model.objects.filter(screenshot__in=candidates).values_list('id', 'screenshot')
+    ]
+
+    duplicates = {}
+    for proof in proofs:
+        name = proof.screenshot.name
+        close = similar.get(name, set())
+        matches = []
+        for kind, pk, other in others:
+            if kind == 'proof' and pk == proof.pk:
+                continue
+            if other == name:
+                matches.append({'kind': kind, 'id': pk, 'exact': True})
+            elif other in close:
+                matches.append({'kind': kind, 'id': pk, 'exact': False})
+        if matches:
+            duplicates[proof.pk] = sorted(matches, key=lambda match: (not match['exact'], match['id']))
+    return duplicates
+
+
+def dedupe_stored_screenshots():
+    """
+    Move screenshots saved before content addressing to their hashed
+    names, pointing every row at the shared copy and deleting the old
+    files. Rows are updated with update(), so callers must expire the
+    cached payments section. Returns ``(files_moved, unique_files)``.
+    """
+    storage = payment_storage()
+    names = {name for _kind, _pk, name in _screenshots()}
+    moved, kept = 0, set()
+    for name in sorted(names):
+        if not storage.exists(name):
+            continue
+        with storage.open(name, 'rb') as handle:
+            data = ContentFile(handle.read(), name=name)
+        if content_addressed_name(name, content_hash(data)) == name:
+            kept.add(name)
+            continue
+        stored = storage.save(name, data)
+        with transaction.atomic():
+            PaymentProof.objects.filter(screenshot=name).update(screenshot=stored)
+            VisitorPayment.objects.filter(screenshot=name).update(screenshot=stored)
+        storage.delete(name)
+        enqueue_derivatives(stored)
+        kept.add(stored)
+        moved += 1
+    return moved, len(kept)
@@ -77,9 +77,23 @@ class AttendanceSerializer(serializers.ModelSerializer):
 
 
 class MonthlyMenuSerializer(serializers.ModelSerializer):
+    previews = serializers.SerializerMethodField()
+
     class Meta:
         model = MonthlyMenu
-        fields = ["id", "month", "year", "file", "image", "text", "uploaded_at"]
+        # Previews and extracted text come first; the original file is the fallback
+        fields = ["id", "month", "year", "previews", "extracted_text", "page_count", "text", "image", "file", "uploaded_at"]
+
+    def get_previews(self, obj):
+        request = self.context.get("request")
+        return [
+            {
+                "url": request.build_absolute_uri(preview["url"]) if request else preview["url"],
+                "width": preview["width"],
+                "height": preview["height"],
+            }
+            for preview in obj.preview_images()
+        ]
 
 
 class PaymentConfigSerializer(serializers.ModelSerializer):
@@ -0,0 +1,222 @@
+"""
+Signal handlers keeping derived data in sync with model writes
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .dashboard_sections import SECTIONS as DASHBOARD_SECTIONS, invalidate_section, sections_for_model
+from .page_cache import PAGES, invalidate_page, pages_for_model
+from .models import User, SubscriptionPlan, UserSubscription, PaymentProof, Attendance, PopupNotice, MealFeedback, MonthlyMenu, MenuItem
+from .entitlements import invalidate_all_entitlements, invalidate_entitlements
+from .notices import invalidate_notice_index
+from .attendance_bits import record_attendance, refresh_attendance_month
+from .stats import adjust_daily_stats, refresh_daily_stats
+from .feedback_stats import refresh_feedback_rollup
+from .images import enqueue_derivatives, image_fields, responsive_image
+from .menu_artifacts import menu_sources, queue_menu_artifacts
+from .menu_index import index_menu, invalidate_menu_index
+
+
+# --------- Daily stats rollup ---------
+
+def _only_meal_of_day(attendance):
+    """Whether ``attendance`` is the only row putting its user among the day's attendees"""
+    return not (
+        Attendance.objects.filter(user_id=attendance.user_id, date=attendance.date)
+        .exclude(pk=attendance.pk).exists()
+    )
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        # Edits can move a row between users or days; recount (admin only)
+        refresh_daily_stats(instance.date, ['attendees'])
+    elif not instance.user.is_staff and _only_meal_of_day(instance):
+        adjust_daily_stats(instance.date, attendees=1)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_removed(sender, instance, origin=None, **kwargs):
+    # Queryset and cascade deletes remove several rows before any signal,
+    # so per-row deltas would double count; recount the day instead
+    if origin is not instance:
+        refresh_daily_stats(instance.date, ['attendees'])
+    elif not instance.user.is_staff and _only_meal_of_day(instance):
+        adjust_daily_stats(instance.date, attendees=-1)
+
+
+@receiver(pre_save, sender=UserSubscription)
+def subscription_saving(sender, instance, **kwargs):
+    # Remember whether the row was active, for the subscriber count delta
+    instance._was_active = bool(
+        instance.pk and UserSubscription.objects.filter(pk=instance.pk, active=True).exists()
+    )
+
+
+def _subscriber_delta(subscription, was_active, is_active):
+    """+1, -1 or 0: how one row changing from ``was_active`` to ``is_active`` moves the count"""
+    if was_active == is_active or subscription.user.is_staff:
+        return 0
+    others = (
+        UserSubscription.objects.filter(user_id=subscription.user_id, active=True)
+        .exclude(pk=subscription.pk).exists()
+    )
+    if others:
+        return 0
+    return 1 if is_active else -1
+
+
+@receiver(post_save, sender=UserSubscription)
+def subscription_changed(sender, instance, **kwargs):
+    delta = _subscriber_delta(instance, getattr(instance, '_was_active', False), instance.active)
+    adjust_daily_stats(active_subscribers=delta)
+
+
+@receiver(post_delete, sender=UserSubscription)
+def subscription_removed(sender, instance, origin=None, **kwargs):
+    if origin is not instance:
+        refresh_daily_stats(fields=['active_subscribers'])
+    else:
+        adjust_daily_stats(active_subscribers=_subscriber_delta(instance, instance.active, False))
+
+
+@receiver([post_save, post_delete], sender=PaymentProof)
+def payment_proof_changed(sender, instance, **kwargs):
+    refresh_daily_stats(fields=['pending_payments'])
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Logins save last_login only and don't affect any counter
+    if update_fields is not None and not ({'is_staff', 'date_joined'} & set(update_fields)):
+        return
+    refresh_daily_stats(fields=['users', 'active_subscribers'])
+    if created or kwargs.get('signal') is post_delete:
+        refresh_daily_stats(timezone.localdate(instance.date_joined), ['new_users'])
+
+
+# --------- Monthly attendance bitmaps ---------
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, created=False, **kwargs):
+    if created:
+        record_attendance(instance.user_id, instance.date, instance.meal_type)
+    else:
+        refresh_attendance_month(instance.user_id, instance.date)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    refresh_attendance_month(instance.user_id, instance.date)
+
+
+# --------- Meal feedback rollup ---------
+
+@receiver(pre_save, sender=MealFeedback)
+def meal_feedback_saving(sender, instance, **kwargs):
+    # Remember the row's previous meal so an edit that moves it refreshes both
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = (
+            MealFeedback.objects.filter(pk=instance.pk).values_list('meal_date', 'meal_type').first()
+        )
+
+
+@receiver(post_save, sender=MealFeedback)
+def meal_feedback_saved(sender, instance, **kwargs):
+    current = (instance.meal_date, instance.meal_type)
+    refresh_feedback_rollup(*current)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and previous != current:
+        refresh_feedback_rollup(*previous)
+
+
+@receiver(post_delete, sender=MealFeedback)
+def meal_feedback_deleted(sender, instance, **kwargs):
+    refresh_feedback_rollup(instance.meal_date, instance.meal_type)
+
+
+# --------- Meal entitlements ---------
+
+# Dropped once the write commits, so a request racing the transaction
+# can't cache the old subscription again
+
+@receiver([post_save, post_delete], sender=UserSubscription)
+def subscription_entitlements_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_entitlements, instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=SubscriptionPlan)
+def plan_entitlements_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_all_entitlements)
+
+
+# --------- Dashboard section fragments ---------
+
+def invalidate_dashboard_sections(sender, **kwargs):
+    for name in sections_for_model(sender):
+        invalidate_section(name)
+
+
+for _model in {model for section in DASHBOARD_SECTIONS.values() for model in section['models']}:
+    post_save.connect(invalidate_dashboard_sections, sender=_model, dispatch_uid=f'dashboard_sections_save_{_model.__name__}')
+    post_delete.connect(invalidate_dashboard_sections, sender=_model, dispatch_uid=f'dashboard_sections_delete_{_model.__name__}')
+
+
+# --------- Public page cache ---------
+
+def invalidate_public_pages(sender, **kwargs):
+    for name in pages_for_model(sender):
+        invalidate_page(name)
+
+
+for _model in {model for models in PAGES.values() for model in models}:
+    post_save.connect(invalidate_public_pages, sender=_model, dispatch_uid=f'public_pages_save_{_model.__name__}')
+    post_delete.connect(invalidate_public_pages, sender=_model, dispatch_uid=f'public_pages_delete_{_model.__name__}')
+
+
+# --------- Popup notice index ---------
+
+@receiver([post_save, post_delete], sender=PopupNotice)
+def popup_notice_changed(sender, instance, **kwargs):
+    invalidate_notice_index()
+
+
+# --------- Responsive image derivatives ---------
+
+def queue_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    # Processing happens in the run_image_jobs worker, not the request
+    for model, field in image_fields():
+        if model is not sender or (update_fields is not None and field not in update_fields):
+            continue
+        name = getattr(instance, field).name
+        if name and responsive_image(name) is None:
+            enqueue_derivatives(name)
+
+
+for _model in {model for model, _field in image_fields()}:
+    post_save.connect(queue_image_derivatives, sender=_model, dispatch_uid=f'image_derivatives_{_model.__name__}')
+
+
+# --------- Monthly menu previews ---------
+
+@receiver(post_save, sender=MonthlyMenu)
+def monthly_menu_saved(sender, instance, update_fields=None, **kwargs):
+    # Built by the image worker rather than the upload request. Saving the
+    # artifacts re-enters here and indexes the extracted text.
+    if instance.artifacts_source != menu_sources(instance):
+        queue_menu_artifacts(instance)
+    if update_fields is None or {'text', 'extracted_text'} & set(update_fields):
+        index_menu(instance)
+
+
+# --------- Per-day menu index ---------
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def menu_item_changed(sender, instance, **kwargs):
+    invalidate_menu_index()
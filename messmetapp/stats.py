@@ -0,0 +1,133 @@
+"""
+Daily statistics rollup for the dashboard counters
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import DailyStats, User, UserSubscription, PaymentProof, Attendance
+
+
+def _count_users(day):
+    return User.objects.filter(is_staff=False).count()
+
+
+def _count_active_subscribers(day):
+    return (
+        UserSubscription.objects.filter(active=True, user__is_staff=False)
+        .values('user').distinct().count()
+    )
+
+
+def _count_pending_payments(day):
+    return PaymentProof.objects.filter(status=PaymentProof.STATUS_PENDING).count()
+
+
+def _count_attendees(day):
+    # Count distinct users who attended, not total meal records
+    return Attendance.objects.filter(date=day, user__is_staff=False).values('user').distinct().count()
+
+
+def _count_new_users(day):
+    return User.objects.filter(date_joined__date=day).count()
+
+
+COUNTERS = {
+    'users': _count_users,
+    'active_subscribers': _count_active_subscribers,
+    'pending_payments': _count_pending_payments,
+    'attendees': _count_attendees,
+    'new_users': _count_new_users,
+}
+
+
+def refresh_daily_stats(day=None, fields=None):
+    """
+    Recompute ``fields`` (default: all counters) on the row for ``day``.
+    Used for bulk writes and repairs; single-row changes go through
+    adjust_daily_stats.
+
+    Only the named counters are queried when the row already exists; a
+    missing row is created with every counter filled in.
+    """
+    day = day or timezone.localdate()
+    fields = list(fields or COUNTERS)
+    values = {name: COUNTERS[name](day) for name in fields}
+    if DailyStats.objects.filter(date=day).update(updated_at=timezone.now(), **values):
+        return
+    for name in COUNTERS:
+        if name not in values:
+            values[name] = COUNTERS[name](day)
+    DailyStats.objects.update_or_create(date=day, defaults=values)
+
+
+def adjust_daily_stats(day=None, **deltas):
+    """
+    Add ``deltas`` (e.g. ``attendees=1``) to the counters on ``day``'s row
+    with a single UPDATE. A missing row is built from the source tables
+    instead, which already counts the change.
+    """
+    day = day or timezone.localdate()
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {name: Greatest(F(name) + delta, Value(0)) for name, delta in deltas.items()}
+    if not DailyStats.objects.filter(date=day).update(updated_at=timezone.now(), **values):
+        refresh_daily_stats(day)
+
+
+def get_daily_stats(day=None):
+    """Return the DailyStats row for ``day``, building it on first access."""
+    day = day or timezone.localdate()
+    stats = DailyStats.objects.filter(date=day).first()
+    if stats is None:
+        refresh_daily_stats(day)
+        stats = DailyStats.objects.get(date=day)
+    return stats
+
+
+def new_users_in_month(year, month):
+    total = DailyStats.objects.filter(date__year=year, date__month=month).aggregate(total=Sum('new_users'))['total']
+    return total or 0
+
+
+@transaction.atomic
+def rebuild_daily_stats():
+    """
+    Drop and rebuild the whole rollup from the source tables.
+
+    Per-day counters are computed with one grouped query each; the
+    snapshot counters are only known for today and are written there.
+    Returns the number of rows written.
+    """
+    today = timezone.localdate()
+    rows = {}
+
+    attendees = (
+        Attendance.objects.filter(user__is_staff=False)
+        .values('date')
+        .annotate(total=Count('user', distinct=True))
+    )
+    for row in attendees:
+        rows.setdefault(row['date'], {})['attendees'] = row['total']
+
+    joined = (
+        User.objects.annotate(day=TruncDate('date_joined'))
+        .values('day')
+        .annotate(total=Count('id'))
+    )
+    for row in joined:
+        rows.setdefault(row['day'], {})['new_users'] = row['total']
+
+    rows.setdefault(today, {}).update({
+        'users': _count_users(today),
+        'active_subscribers': _count_active_subscribers(today),
+        'pending_payments': _count_pending_payments(today),
+    })
+
+    DailyStats.objects.all().delete()
+    DailyStats.objects.bulk_create([
+        DailyStats(date=day, **values) for day, values in rows.items()
+    ])
+    return len(rows)
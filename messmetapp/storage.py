@@ -0,0 +1,52 @@
+"""
+Content-addressed file storage for payment screenshots
+"""
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+
+
+def content_hash(content):
+    """SHA-256 hex digest of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(name, digest):
+    """``payments/jnmk.jpg`` -> ``payments/ab/ab12...ef.jpg``"""
+    directory, filename = posixpath.split(name)
+    extension = posixpath.splitext(filename)[1].lower()
+    return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each file under the SHA-256 of its bytes, keeping the upload's
+    directory and extension. Saving bytes that are already stored writes
+    nothing and returns the existing name, so identical uploads share one
+    file. Files may therefore be referenced by several rows; delete them
+    only once nothing points at them.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        hashed = content_addressed_name(name, content_hash(content))
+        if self.exists(hashed):
+            return hashed
+        return super().save(hashed, content, max_length=max_length)
+
+
+def payment_storage():
+    """Storage for PaymentProof and VisitorPayment screenshots"""
+    return ContentAddressedStorage()
@@ -0,0 +1,64 @@
+"""
+Deactivating subscriptions whose end date has passed
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .entitlements import invalidate_entitlements_many
+from .models import Notification, SubscriptionPlan, UserSubscription
+from .stats import refresh_daily_stats
+
+
+EXPIRY_BATCH_SIZE = 500
+
+
+def _expire_batch(today, batch_size):
+    """Deactivate up to ``batch_size`` lapsed subscriptions; returns their (user_id, plan_id, end_date) rows."""
+    with transaction.atomic():
+        # skip_locked lets concurrent sweepers take different rows; backends
+        # without row locks ignore it
+        rows = list(
+            UserSubscription.objects.select_for_update(skip_locked=True)
+            .filter(active=True, end_date__lt=today)
+            .order_by('pk')
+            .values_list('pk', 'user_id', 'plan_id', 'end_date')[:batch_size]
+        )
+        if not rows:
+            return []
+        UserSubscription.objects.filter(pk__in=[row[0] for row in rows]).update(active=False)
+
+        titles = dict(SubscriptionPlan.objects.filter(pk__in={row[2] for row in rows}).values_list('pk', 'title'))
+        Notification.objects.bulk_create([
+            Notification(
+                target_id=user_id,
+                message=f"Your {titles.get(plan_id, 'meal')} plan expired on {end_date:%d %b %Y}. Renew it to keep marking meals.",
+            )
+            for _pk, user_id, plan_id, end_date in rows
+        ])
+    return rows
+
+
+def expire_subscriptions(today=None, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Deactivate every active subscription that ended before ``today`` and
+    notify its user, one UPDATE and one bulk insert per batch. Subscriptions
+    already deactivated are never touched again, so repeated runs are no-ops.
+
+    Returns the number of subscriptions expired.
+    """
+    today = today or timezone.localdate()
+    user_ids = set()
+    expired = 0
+    while True:
+        rows = _expire_batch(today, batch_size)
+        if not rows:
+            break
+        expired += len(rows)
+        user_ids.update(row[1] for row in rows)
+
+    if expired:
+        # update() and bulk_create() skip the model signals, so refresh
+        # what they would have kept in sync
+        refresh_daily_stats(fields=['active_subscribers'])
+        invalidate_entitlements_many(user_ids)
+    return expired
@@ -0,0 +1,51 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from messmetapp.images import responsive_image
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in variants)
+
+
+@register.simple_tag
+def responsive_img(image, alt='', sizes='100vw', **attrs):
+    """
+    ``<picture>`` with WebP and JPEG ``srcset``s for an uploaded image, e.g.
+    ``{% responsive_img image.image alt=image.title sizes="(max-width: 768px) 100vw, 50vw" class="w-100" %}``.
+
+    Falls back to a plain ``<img>`` of the original until its derivatives
+    exist. Extra keyword arguments become ``<img>`` attributes
+    (``data_id`` -> ``data-id``).
+    """
+    if not image:
+        return ''
+    attrs = {key.replace('_', '-'): value for key, value in attrs.items()}
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    responsive = responsive_image(image.name)
+    if responsive is None or not responsive.variants.get('jpeg'):
+        return format_html('<img src="{}" alt="{}"{}>', image.url, alt, flatatt(attrs))
+
+    jpeg = responsive.variants['jpeg']
+    attrs.update({
+        'srcset': _srcset(jpeg),
+        'sizes': sizes,
+        'width': responsive.width,
+        'height': responsive.height,
+    })
+    if responsive.placeholder:
+        style = attrs.get('style', '')
+        attrs['style'] = f"{style}{'; ' if style and not style.rstrip().endswith(';') else ''}background: center / cover no-repeat url('{responsive.placeholder}');"
+
+    webp = responsive.variants.get('webp')
+    source = format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes) if webp else ''
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}"{}></picture>',
+        source, default_storage.url(jpeg[-1][1]), alt, flatatt(attrs),
+    )
@@ -1,6 +1,45 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from io import BytesIO, StringIO
+from PIL import Image
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from django.db import connection, connections
+from django.contrib.auth.models import AnonymousUser
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django.utils import timezone
-from .models import User, SubscriptionPlan, UserSubscription, Attendance
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from datetime import date, timedelta
+from decimal import Decimal
+from .models import User, SubscriptionPlan, UserSubscription, Attendance, PaymentProof, DailyStats, VisitorPayment, PopupNotice, ExportJob, AttendanceMonth, Notification, MealFeedback, MealFeedbackRollup, ResponsiveImage, CarouselImage, OwnerImage, StaffImage, FoodImage, ImageJob, MonthlyMenu, MenuItem
+from . import views
+from .stats import get_daily_stats
+from .roster import build_roster_snapshot
+from .page_cache import CSRF_PLACEHOLDER as PAGE_CSRF_PLACEHOLDER, _timeout as page_cache_timeout
+from .notices import get_active_notices_for_user, get_notice_index, invalidate_notice_index
+from .context_processors import seo_context, SEO_DATA
+from .attendance_bits import count_attendees, count_who_ate, month_calendar, users_who_ate
+from .ledger import visitor_ledger, LEDGER_MAX_PAGE_SIZE
+from .dashboard_sections import CSRF_PLACEHOLDER, SECTIONS as DASHBOARD_SECTIONS
+from .entitlements import Entitlements
+from .subscription_expiry import expire_subscriptions
+from .pagination import _after as _after_cursor, decode_cursor, encode_cursor
+from .screenshots import find_duplicate_screenshots
+from .menu_index import parse_menu_text
 
 
 class ModelSmokeTests(TestCase):
@@ -17,4 +56,1484 @@ class ModelSmokeTests(TestCase):
         with self.assertRaises(Exception):
             Attendance.objects.create(user=user, date=date, meal_type="lunch")
 
-# Create your tests here.
+
+class DashboardRosterTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.plan = SubscriptionPlan.objects.create(title="All Meals", price=3000, included_meals=["breakfast", "lunch", "dinner"])
+        self.today = timezone.localdate()
+
+    def _add_students(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f"student{i}", mobile_no=f"90000{i:05d}")
+            UserSubscription.objects.create(user=user, plan=self.plan, start_date=self.today, end_date=self.today, active=True)
+            Attendance.objects.create(user=user, date=self.today, meal_type="lunch")
+
+    def _dashboard_queries(self):
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_snapshot_fields(self):
+        self._add_students(2)
+        users = build_roster_snapshot(today=self.today)
+        self.assertEqual(len(users), 2)
+        for user in users:
+            self.assertEqual(user.today_meals, ["lunch"])
+            self.assertEqual(user.active_subscription.plan, self.plan)
+            self.assertEqual(user.total_attendance_count, 1)
+            self.assertIsNotNone(user.last_attendance)
+
+    def test_snapshot_query_count_is_constant(self):
+        self._add_students(3)
+        with self.assertNumQueries(3):
+            build_roster_snapshot(today=self.today)
+
+    def test_dashboard_queries_do_not_scale_with_users(self):
+        self._add_students(2)
+        small = self._dashboard_queries()
+        self._add_students(20)
+        large = self._dashboard_queries()
+        self.assertEqual(small, large)
+
+
+class RosterApiTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        for i in range(7):
+            User.objects.create_user(
+                username=f"user{i}",
+                full_name=f"Name {i}",
+                mobile_no=f"98765{i:05d}",
+                hostel_status=User.HOSTEL_STATUS_HOSTELLER if i % 2 else User.HOSTEL_STATUS_NON_HOSTELLER,
+            )
+        self.client.force_login(self.staff)
+
+    def _get(self, **params):
+        response = self.client.get(reverse("api_admin_roster"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _walk(self, **params):
+        names, cursor = [], None
+        while True:
+            if cursor:
+                params["cursor"] = cursor
+            data = self._get(**params)
+            names.extend(row["username"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                return names
+
+    def test_keyset_pages_cover_roster_once(self):
+        names = self._walk(limit=3)
+        self.assertEqual(names, [f"user{i}" for i in range(7)])
+
+    def test_descending_sort(self):
+        names = self._walk(limit=2, sort="-date_joined")
+        self.assertEqual(names, [f"user{i}" for i in reversed(range(7))])
+
+    def test_filters_and_prefix_search(self):
+        self.assertEqual(len(self._get(hostel_status=User.HOSTEL_STATUS_HOSTELLER)["results"]), 3)
+        self.assertEqual([r["username"] for r in self._get(q="user3")["results"]], ["user3"])
+        self.assertEqual([r["username"] for r in self._get(q="9876500004")["results"]], ["user4"])
+        self.assertEqual(self._get(q="ame")["results"], [])
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get(reverse("api_admin_roster"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_staff(self):
+        self.client.force_login(User.objects.get(username="user1"))
+        response = self.client.get(reverse("api_admin_roster"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_dashboard_does_not_render_roster_rows(self):
+        response = self.client.get(reverse("dashboard"))
+        self.assertNotContains(response, "user5")
+
+
+class DailyStatsTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.plan = SubscriptionPlan.objects.create(title="Lunch", price=1000, included_meals=["lunch"])
+        self.alice = User.objects.create_user(username="alice", mobile_no="9000000001")
+        self.bob = User.objects.create_user(username="bob", mobile_no="9000000002")
+        User.objects.create_user(username="admin", is_staff=True)
+
+    def _assert_matches_rebuild(self):
+        live = DailyStats.objects.get(date=self.today)
+        call_command("rebuild_daily_stats", stdout=StringIO())
+        rebuilt = DailyStats.objects.get(date=self.today)
+        for field in ("users", "active_subscribers", "pending_payments", "attendees", "new_users"):
+            self.assertEqual(getattr(live, field), getattr(rebuilt, field), field)
+
+    def test_signals_keep_counters_current(self):
+        self.assertEqual(get_daily_stats(self.today).users, 2)
+        sub = UserSubscription.objects.create(user=self.alice, plan=self.plan, start_date=self.today, end_date=self.today)
+        Attendance.objects.create(user=self.alice, date=self.today, meal_type="lunch")
+        Attendance.objects.create(user=self.alice, date=self.today, meal_type="dinner")
+        proof = PaymentProof.objects.create(user=self.bob, subscription_plan=self.plan, screenshot="payments/x.png")
+
+        stats = get_daily_stats(self.today)
+        self.assertEqual((stats.active_subscribers, stats.attendees, stats.pending_payments, stats.new_users), (1, 1, 1, 3))
+        self._assert_matches_rebuild()
+
+        proof.status = PaymentProof.STATUS_APPROVED
+        proof.save()
+        sub.delete()
+        self.bob.delete()
+        stats = get_daily_stats(self.today)
+        self.assertEqual((stats.users, stats.active_subscribers, stats.pending_payments), (1, 0, 0))
+        self._assert_matches_rebuild()
+
+    def test_single_writes_apply_deltas_without_recounting(self):
+        get_daily_stats(self.today)
+        with CaptureQueriesContext(connection) as queries:
+            Attendance.objects.create(user=self.alice, date=self.today, meal_type="lunch")
+            sub = UserSubscription.objects.create(user=self.alice, plan=self.plan, start_date=self.today, end_date=self.today)
+        self.assertFalse([q["sql"] for q in queries if "COUNT(" in q["sql"].upper()])
+        stats = get_daily_stats(self.today)
+        self.assertEqual((stats.attendees, stats.active_subscribers), (1, 1))
+
+        # Replacing a subscription keeps the user counted once
+        sub.active = False
+        sub.save()
+        second = UserSubscription.objects.create(user=self.alice, plan=self.plan, start_date=self.today, end_date=self.today)
+        UserSubscription.objects.create(user=self.alice, plan=self.plan, start_date=self.today, end_date=self.today)
+        second.delete()
+        Attendance.objects.create(user=self.alice, date=self.today, meal_type="dinner")
+        Attendance.objects.create(user=self.bob, date=self.today, meal_type="dinner")
+        self.assertEqual((get_daily_stats(self.today).attendees, get_daily_stats(self.today).active_subscribers), (2, 1))
+        self._assert_matches_rebuild()
+
+        Attendance.objects.filter(user=self.alice).delete()
+        Attendance.objects.get(user=self.bob).delete()
+        self.assertEqual(get_daily_stats(self.today).attendees, 0)
+        self._assert_matches_rebuild()
+
+    def test_login_does_not_touch_stats(self):
+        get_daily_stats(self.today)
+        with self.assertNumQueries(1):
+            self.alice.save(update_fields=["last_login"])
+
+    def test_lms_dashboard_counts_students_like_the_dashboard(self):
+        # Both read the rollup, so staff accounts are left out of the counts
+        # (the LMS page used to count them in "Users" and "Active Subscriptions")
+        staff = User.objects.get(username="admin")
+        UserSubscription.objects.create(user=staff, plan=self.plan, start_date=self.today, end_date=self.today)
+        UserSubscription.objects.create(user=self.alice, plan=self.plan, start_date=self.today, end_date=self.today)
+        request = RequestFactory().get("/lms/")
+        request.user = staff
+        html = views.lms_dashboard(request).content.decode()
+        self.assertIn('Users</div><div class="h4 mb-0">2<', html)
+        self.assertIn('Active Subscriptions</div><div class="h4 mb-0">1<', html)
+
+
+class DashboardSectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="admin", is_staff=True)
+        self.client.force_login(self.staff)
+        SubscriptionPlan.objects.create(title="Breakfast Only", price=900, included_meals=["breakfast"])
+
+    def _section(self, name, **params):
+        return self.client.get(reverse("dashboard_section", args=[name]), params)
+
+    def test_dashboard_leaves_sections_to_fragments(self):
+        response = self.client.get(reverse("dashboard"))
+        self.assertNotContains(response, "Breakfast Only")
+        self.assertContains(response, 'data-fragment="plans"')
+
+    def test_section_is_cached_until_its_models_change(self):
+        self.assertContains(self._section("plans"), "Breakfast Only")
+        with CaptureQueriesContext(connection) as ctx:
+            self._section("plans")
+        self.assertFalse(any("subscriptionplan" in q["sql"] for q in ctx.captured_queries))
+
+        SubscriptionPlan.objects.create(title="Dinner Only", price=900, included_meals=["dinner"])
+        self.assertContains(self._section("plans"), "Dinner Only")
+
+    def test_cached_fragment_gets_per_request_csrf_token(self):
+        self._section("plans")
+        response = self._section("plans")
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+
+    def test_unknown_section_and_non_staff(self):
+        self.assertEqual(self._section("nope").status_code, 404)
+        self.client.force_login(User.objects.create_user(username="student"))
+        self.assertEqual(self._section("plans").status_code, 302)
+
+    def test_every_section_renders(self):
+        for name in DASHBOARD_SECTIONS:
+            self.assertEqual(self._section(name, visitor_period="week").status_code, 200, name)
+
+
+class VisitorLedgerTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.now = timezone.now()
+
+    def _pay(self, meal_type, amount, days_ago=0):
+        vp = VisitorPayment.objects.create(name="Walk-in", meal_type=meal_type, amount=amount, screenshot="payments/x.png")
+        VisitorPayment.objects.filter(pk=vp.pk).update(created_at=self.now - timedelta(days=days_ago))
+        return vp
+
+    def test_totals_for_date_range(self):
+        self._pay("lunch", 60)
+        self._pay("lunch", 60, days_ago=1)
+        self._pay("dinner", 80, days_ago=1)
+        self._pay("breakfast", 40, days_ago=10)
+
+        ledger = visitor_ledger(date_from=str(self.today - timedelta(days=1)), date_to=str(self.today))
+        self.assertEqual(ledger["totals"]["count"], 3)
+        self.assertEqual(ledger["totals"]["amount"], Decimal("200"))
+        meals = {m["meal_type"]: (m["count"], m["amount"]) for m in ledger["totals"]["meals"]}
+        self.assertEqual(meals, {"breakfast": (0, 0), "lunch": (2, Decimal("120")), "dinner": (1, Decimal("80"))})
+
+        self.assertEqual(visitor_ledger(period="week")["totals"]["count"], 3)
+        self.assertEqual(visitor_ledger(period="today")["totals"]["count"], 1)
+        # Reversed and malformed ranges don't error
+        self.assertEqual(visitor_ledger(date_from=str(self.today), date_to=str(self.today - timedelta(days=1)))["totals"]["count"], 3)
+        self.assertEqual(visitor_ledger(date_from="not-a-date")["totals"]["count"], 4)
+
+    def test_pages_are_limited_and_cost_two_queries(self):
+        for i in range(7):
+            self._pay("lunch", 50, days_ago=i)
+        with CaptureQueriesContext(connection) as ctx:
+            ledger = visitor_ledger(page=2, per_page=3)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(len(ledger["payments"]), 3)
+        self.assertEqual(ledger["num_pages"], 3)
+        self.assertTrue(ledger["has_previous"] and ledger["has_next"])
+
+        self.assertEqual(len(visitor_ledger(page=99, per_page=3)["payments"]), 1)
+        self.assertEqual(visitor_ledger(per_page=10_000)["per_page"], LEDGER_MAX_PAGE_SIZE)
+
+    def test_payments_section_renders_page_and_totals(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        for i in range(30):
+            self._pay("dinner", 10)
+        response = self.client.get(reverse("dashboard_section", args=["payments"]), {"vp_page": "2"})
+        self.assertContains(response, "Page 2 of 2")
+        self.assertContains(response, "₹300")
+        self.assertEqual(response.content.decode().count("delete_visitor_payment"), 5)
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SubscriptionPlan.objects.create(title="Lunch Only", price=1200, included_meals=["lunch"])
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for name in ("home", "about", "menu", "plans_list"):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200, name)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            self.assertEqual(len(ctx.captured_queries), 0, name)
+
+    def test_model_write_purges_only_dependent_pages(self):
+        self.client.get(reverse("plans_list"))
+        self.client.get(reverse("about"))
+        SubscriptionPlan.objects.create(title="Dinner Only", price=900, included_meals=["dinner"])
+        self.assertContains(self.client.get(reverse("plans_list")), "Dinner Only")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("about"))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_cached_home_gets_fresh_csrf_token(self):
+        self.client.get(reverse("home"))
+        response = self.client.get(reverse("home"))
+        self.assertNotContains(response, PAGE_CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+
+    def test_notice_window_caps_home_timeout(self):
+        now = timezone.now()
+        PopupNotice.objects.create(title="Holiday", message="Closed", start_datetime=now + timedelta(seconds=30), end_datetime=now + timedelta(days=1))
+        self.assertLessEqual(page_cache_timeout("home"), 31)
+        self.assertEqual(page_cache_timeout("about"), 600)
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.get(reverse("home"))
+        user = User.objects.create_user(username="eve", password="pass12345")
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse("home")).status_code, 200)
+        self.assertTrue(any("attendance" in q["sql"] for q in ctx.captured_queries))
+
+
+class NoticeIndexTests(TestCase):
+    def setUp(self):
+        invalidate_notice_index()
+        self.now = timezone.now()
+        self.staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.student = User.objects.create_user(username="hosteller", hostel_status=User.HOSTEL_STATUS_HOSTELLER)
+
+    def _notice(self, title, audience=PopupNotice.TARGET_ALL_USERS, priority=0, starts_in=-60, ends_in=3600):
+        return PopupNotice.objects.create(
+            title=title, message=title, target_audience=audience, priority=priority,
+            start_datetime=self.now + timedelta(seconds=starts_in),
+            end_datetime=self.now + timedelta(seconds=ends_in),
+        )
+
+    def test_resolves_by_audience_and_priority_without_queries(self):
+        self._notice("General", priority=1)
+        self._notice("Hostel", PopupNotice.TARGET_HOSTELLERS, priority=5)
+        self._notice("Day scholars", PopupNotice.TARGET_NON_HOSTELLERS)
+        self._notice("Disabled", priority=9).delete()
+        get_notice_index()
+
+        with CaptureQueriesContext(connection) as ctx:
+            titles = [n.title for n in get_active_notices_for_user(self.student)]
+            anonymous = [n.title for n in get_active_notices_for_user(AnonymousUser())]
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(titles, ["Hostel", "General"])
+        self.assertEqual(anonymous, ["General"])
+
+    def test_subscriber_notices_need_active_subscription(self):
+        self._notice("Subscribers", PopupNotice.TARGET_ACTIVE_SUBSCRIBERS)
+        self.assertEqual(get_active_notices_for_user(self.student), [])
+        plan = SubscriptionPlan.objects.create(title="All Meals", price=3000, included_meals=["lunch"])
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSubscription.objects.create(user=self.student, plan=plan, start_date=today, end_date=today, active=True)
+        self.assertEqual([n.title for n in get_active_notices_for_user(self.student)], ["Subscribers"])
+
+    def test_index_expires_at_next_boundary(self):
+        upcoming = self._notice("Upcoming", starts_in=30)
+        self._notice("Current", ends_in=600)
+        index = get_notice_index()
+        self.assertEqual(index.expires_at, upcoming.start_datetime)
+        self.assertFalse(index.is_valid(upcoming.start_datetime, index.version))
+
+    def test_index_is_rebuilt_after_max_age(self):
+        # Another worker's invalidation may never reach this process's cache
+        with override_settings(NOTICE_INDEX_MAX_AGE=0):
+            self.assertEqual(get_active_notices_for_user(self.student), [])
+            PopupNotice.objects.bulk_create([PopupNotice(
+                title="Late", message="Late", start_datetime=self.now - timedelta(minutes=1), end_datetime=self.now + timedelta(hours=1),
+            )])
+            self.assertEqual([n.title for n in get_active_notices_for_user(self.student)], ["Late"])
+        invalidate_notice_index()
+        self.assertLessEqual(get_notice_index().expires_at, timezone.now() + timedelta(seconds=60))
+
+    def test_notice_api_writes_invalidate_index(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(get_active_notices_for_user(self.student), [])
+        response = self.client.post(reverse("api_notice_create"), {
+            "title": "Menu change", "message": "Paneer tonight",
+            "start_datetime": (self.now - timedelta(minutes=1)).isoformat(),
+            "end_datetime": (self.now + timedelta(hours=1)).isoformat(),
+        })
+        self.assertTrue(response.json()["success"])
+        self.assertEqual([n.title for n in get_active_notices_for_user(self.student)], ["Menu change"])
+
+        self.client.post(reverse("api_notice_delete", args=[response.json()["id"]]))
+        self.assertEqual(get_active_notices_for_user(self.student), [])
+
+
+class SeoContextTests(TestCase):
+    def _context(self, path):
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        return seo_context(request)
+
+    def test_metadata_is_looked_up_by_url_name(self):
+        self.assertEqual(self._context("/meal-feedback/")["seo_title"], SEO_DATA["meal_feedback"]["title"])
+        self.assertEqual(self._context("/plans/1/buy/")["seo_title"], SEO_DATA["plans"]["title"])
+        self.assertEqual(self._context("/api/menu/current/")["seo_title"], SEO_DATA["home"]["title"])
+        self.assertEqual(str(self._context("/about/")["canonical_url"]), "https://www.tanya-kitchen.casa/about/")
+
+    def test_unresolved_request_gets_defaults(self):
+        context = seo_context(RequestFactory().get("/missing/"))
+        self.assertEqual(context["seo_title"], SEO_DATA["home"]["title"])
+
+    def test_rendered_page_uses_route_metadata(self):
+        cache.clear()
+        self.assertContains(self.client.get(reverse("about")), "<title>About Tanya&#x27;s Kitchen")
+
+
+class AttendanceExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        self.today = timezone.localdate()
+        hosteller = User.objects.create_user(username="h1", full_name="Hostel One", hostel_status=User.HOSTEL_STATUS_HOSTELLER)
+        day_scholar = User.objects.create_user(username="d1", hostel_status=User.HOSTEL_STATUS_NON_HOSTELLER)
+        Attendance.objects.create(user=hosteller, date=self.today, meal_type="lunch")
+        Attendance.objects.create(user=hosteller, date=self.today - timedelta(days=3), meal_type="dinner")
+        Attendance.objects.create(user=day_scholar, date=self.today, meal_type="dinner")
+
+    def _rows(self, response, compressed=False):
+        content = b"".join(response.streaming_content)
+        if compressed:
+            content = gzip.decompress(content)
+        return list(csv.reader(content.decode().splitlines()))
+
+    def test_streams_all_rows(self):
+        response = self.client.get("/admin/export/attendance.csv")
+        self.assertTrue(response.streaming)
+        rows = self._rows(response)
+        self.assertEqual(rows[0][:3], ["User ID", "Username", "Full Name"])
+        self.assertEqual(len(rows), 4)
+        self.assertIn(["Hostel One", "Not provided"], [r[2:4] for r in rows[1:]])
+
+    def test_filters_and_gzip(self):
+        response = self.client.get("/admin/export/attendance.csv", {
+            "date_from": str(self.today - timedelta(days=1)),
+            "meal_type": "dinner",
+            "hostel_status": User.HOSTEL_STATUS_NON_HOSTELLER,
+            "gzip": "1",
+        })
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn("attendance_export.csv.gz", response["Content-Disposition"])
+        rows = self._rows(response, compressed=True)
+        self.assertEqual([r[1] for r in rows[1:]], ["d1"])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get("/admin/export/attendance.csv", {"date_to": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["success"])
+
+
+class UsersExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        self.today = timezone.localdate()
+        self.plan = SubscriptionPlan.objects.create(title="All Meals", price=3000, included_meals=["lunch", "dinner"])
+
+    def _add_user(self, username, subscribed=True):
+        user = User.objects.create_user(username=username)
+        if subscribed:
+            UserSubscription.objects.create(user=user, plan=self.plan, start_date=self.today, end_date=self.today, active=True)
+        Attendance.objects.create(user=user, date=self.today, meal_type="lunch")
+        Attendance.objects.create(user=user, date=self.today, meal_type="dinner")
+        Attendance.objects.create(user=user, date=self.today - timedelta(days=1), meal_type="lunch")
+        return user
+
+    def _export(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/admin/export/users.csv")
+            rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        return rows, len(ctx.captured_queries)
+
+    def test_single_query_regardless_of_user_count(self):
+        self._add_user("alice")
+        _rows, small = self._export()
+        for i in range(10):
+            self._add_user(f"user{i}", subscribed=i % 2 == 0)
+        rows, large = self._export()
+        self.assertEqual(small, large)
+        self.assertEqual(len(rows), 13)
+
+    def test_row_values(self):
+        self._add_user("alice")
+        self._add_user("bob", subscribed=False)
+        rows, _queries = self._export()
+        by_name = {row[1]: row for row in rows[1:]}
+        header = rows[0]
+        alice = dict(zip(header, by_name["alice"]))
+        self.assertEqual(alice["Total Attendance"], "2")
+        self.assertEqual(alice["Last Attendance Date"], self.today.strftime("%Y-%m-%d"))
+        self.assertEqual(alice["Active Subscriptions"], "1")
+        self.assertEqual(alice["Current Plan"], "All Meals")
+        bob = dict(zip(header, by_name["bob"]))
+        self.assertEqual((bob["Active Subscriptions"], bob["Current Plan"]), ("0", "None"))
+        self.assertEqual(dict(zip(header, by_name["admin"]))["Last Attendance Date"], "Never")
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.client.force_login(self.staff)
+        student = User.objects.create_user(username="student")
+        Attendance.objects.create(user=student, date=timezone.localdate(), meal_type="lunch")
+
+    def _queue(self, kind, params=None):
+        return self.client.post(reverse("api_export_jobs"), {"kind": kind, "params": params or {}}, content_type="application/json")
+
+    def test_worker_builds_export_and_reports_progress(self):
+        response = self._queue("attendance", {"meal_type": "lunch"})
+        self.assertEqual(response.status_code, 201)
+        job_id = response.json()["id"]
+        self.assertEqual(response.json()["status"], "pending")
+        self.assertIsNone(response.json()["download_url"])
+
+        call_command("run_export_jobs", "--once", stdout=StringIO())
+
+        status = self.client.get(reverse("api_export_job_status", args=[job_id])).json()
+        self.assertEqual((status["status"], status["progress"], status["processed_rows"]), ("done", 100, 1))
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertTrue(job.file.name.startswith("exports/attendance_export_"))
+
+        download = self.client.get(status["download_url"])
+        rows = list(csv.reader(b"".join(download.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[1][1], "student")
+        self.assertIn('filename="attendance_export.csv"', download["Content-Disposition"])
+
+    def test_every_kind_runs(self):
+        for kind in ("users", "meal_feedback"):
+            self._queue(kind)
+        call_command("run_export_jobs", "--once", stdout=StringIO())
+        self.assertEqual(set(ExportJob.objects.values_list("status", flat=True)), {ExportJob.STATUS_DONE})
+
+    def test_failures_are_recorded(self):
+        ExportJob.objects.create(kind=ExportJob.KIND_ATTENDANCE, params={"date_from": "bad"})
+        call_command("run_export_jobs", "--once", stdout=StringIO())
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertIn("date_from", job.error)
+        self.assertEqual(self.client.get(reverse("export_job_download", args=[job.pk])).status_code, 404)
+
+    def test_jobs_of_a_dead_worker_are_retried(self):
+        stuck = ExportJob.objects.create(kind=ExportJob.KIND_USERS, status=ExportJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=2))
+        busy = ExportJob.objects.create(kind=ExportJob.KIND_USERS, status=ExportJob.STATUS_RUNNING, started_at=timezone.now())
+        call_command("run_export_jobs", "--once", stdout=StringIO())
+        stuck.refresh_from_db()
+        busy.refresh_from_db()
+        self.assertEqual((stuck.status, busy.status), (ExportJob.STATUS_DONE, ExportJob.STATUS_RUNNING))
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self._queue("payments").status_code, 400)
+        self.assertEqual(self._queue("attendance", {"date_to": "never"}).status_code, 400)
+        self.client.force_login(User.objects.create_user(username="eve"))
+        self.assertEqual(self._queue("users").status_code, 403)
+
+
+class AttendanceMonthTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate().replace(day=10)
+        self.alice = User.objects.create_user(username="alice")
+        self.bob = User.objects.create_user(username="bob")
+
+    def _mark(self, user, day, meal):
+        return Attendance.objects.create(user=user, date=self.day.replace(day=day), meal_type=meal)
+
+    def test_bits_follow_attendance_writes(self):
+        self._mark(self.alice, 1, "lunch")
+        self._mark(self.alice, 3, "lunch")
+        dinner = self._mark(self.alice, 3, "dinner")
+        row = AttendanceMonth.objects.get(user=self.alice)
+        self.assertEqual(row.month, self.day.replace(day=1))
+        self.assertEqual(row.lunch, 0b101)
+        self.assertEqual(row.meals_on(3), ["lunch", "dinner"])
+        self.assertEqual(row.days_attended, 2)
+
+        dinner.delete()
+        self.assertEqual(AttendanceMonth.objects.get(user=self.alice).dinner, 0)
+        Attendance.objects.filter(user=self.alice).delete()
+        self.assertFalse(AttendanceMonth.objects.filter(user=self.alice).exists())
+
+    def test_set_queries(self):
+        self._mark(self.alice, 10, "lunch")
+        self._mark(self.bob, 10, "lunch")
+        self._mark(self.bob, 10, "breakfast")
+        self._mark(self.alice, 11, "dinner")
+        self.assertEqual(count_who_ate(self.day, "lunch"), 2)
+        self.assertEqual(count_who_ate(self.day, "breakfast"), 1)
+        self.assertEqual(list(users_who_ate(self.day, "breakfast")), [self.bob.pk])
+        self.assertEqual(count_attendees(self.day.replace(day=11)), 1)
+        self.assertEqual(count_attendees(self.day.replace(day=12)), 0)
+
+    def test_rebuild_matches_signals(self):
+        for day, meal in [(1, "breakfast"), (2, "lunch"), (28, "dinner")]:
+            self._mark(self.alice, day, meal)
+        self._mark(self.bob, 5, "lunch")
+        expected = sorted(AttendanceMonth.objects.values_list("user_id", "month", "breakfast", "lunch", "dinner"))
+        AttendanceMonth.objects.update(lunch=0)
+        call_command("rebuild_attendance_months", stdout=StringIO())
+        self.assertEqual(sorted(AttendanceMonth.objects.values_list("user_id", "month", "breakfast", "lunch", "dinner")), expected)
+
+    def test_calendar_reads_one_row(self):
+        self._mark(self.alice, 10, "lunch")
+        with CaptureQueriesContext(connection) as ctx:
+            weeks = month_calendar(self.alice, self.day)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        cells = {cell["day"]: cell["meals"] for week in weeks for cell in week if cell}
+        self.assertEqual(cells[10], ["lunch"])
+        self.assertEqual(cells[1], [])
+
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        data = self.client.get(reverse("student_details", args=[self.alice.pk])).json()
+        self.assertEqual(data["attendance_calendar"]["month"], timezone.localdate().strftime("%Y-%m"))
+
+
+class BatchAttendanceTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        self.today = timezone.localdate()
+        self.plan = SubscriptionPlan.objects.create(title="Lunch & Dinner", price=2000, included_meals=["lunch", "dinner"])
+
+    def _student(self, username, subscribed=True):
+        user = User.objects.create_user(username=username)
+        if subscribed:
+            UserSubscription.objects.create(user=user, plan=self.plan, start_date=self.today, end_date=self.today, active=True)
+        return user
+
+    def _post(self, payload):
+        return self.client.post(reverse("admin_mark_attendance_batch"), payload, content_type="application/json")
+
+    def test_per_user_results(self):
+        fresh = self._student("fresh")
+        partial = self._student("partial")
+        Attendance.objects.create(user=partial, date=self.today, meal_type="lunch")
+        unsubscribed = self._student("nosub", subscribed=False)
+
+        data = self._post({"user_ids": [fresh.pk, partial.pk, unsubscribed.pk, 999999]}).json()
+        results = data["results"]
+        self.assertEqual(results[str(fresh.pk)], {"status": "marked", "marked": ["lunch", "dinner"], "already_marked": [], "not_entitled": []})
+        self.assertEqual(results[str(partial.pk)], {"status": "marked", "marked": ["dinner"], "already_marked": ["lunch"], "not_entitled": []})
+        self.assertEqual(results[str(unsubscribed.pk)]["status"], "no_subscription")
+        self.assertEqual(results["999999"]["status"], "not_found")
+        self.assertEqual(data["marked_count"], 3)
+
+        again = self._post({"user_ids": [fresh.pk], "meals": ["breakfast"]}).json()
+        self.assertEqual(again["results"][str(fresh.pk)], {"status": "not_entitled", "marked": [], "already_marked": [], "not_entitled": ["breakfast"]})
+        again = self._post({"user_ids": [fresh.pk], "meals": ["breakfast", "lunch"]}).json()
+        self.assertEqual(again["results"][str(fresh.pk)], {"status": "already_marked", "marked": [], "already_marked": ["lunch"], "not_entitled": ["breakfast"]})
+
+    def test_rows_lost_to_a_concurrent_insert_are_not_reported_as_marked(self):
+        student = self._student("racer")
+        raced = []
+
+        def concurrent_insert(execute, sql, params, many, context):
+            # Another request marks lunch between our lookup and our insert
+            if not raced and sql.startswith("INSERT") and "messmetapp_attendance" in sql:
+                raced.append(True)
+                Attendance.objects.create(user=student, date=self.today, meal_type="lunch")
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(concurrent_insert):
+            data = self._post({"user_ids": [student.pk]}).json()
+        self.assertEqual(data["results"][str(student.pk)], {"status": "marked", "marked": ["dinner"], "already_marked": ["lunch"], "not_entitled": []})
+        self.assertEqual(data["marked_count"], 1)
+
+    def test_derived_data_is_updated(self):
+        users = [self._student(f"s{i}") for i in range(3)]
+        yesterday = self.today - timedelta(days=1)
+        self._post({"user_ids": [u.pk for u in users], "meals": ["lunch"], "date": yesterday.isoformat()})
+        self.assertEqual(Attendance.objects.filter(date=yesterday, meal_type="lunch").count(), 3)
+        self.assertEqual(count_who_ate(yesterday, "lunch"), 3)
+        self.assertEqual(get_daily_stats(yesterday).attendees, 3)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        small = [self._student(f"a{i}").pk for i in range(2)]
+        large = [self._student(f"b{i}").pk for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx_small:
+            self._post({"user_ids": small})
+        with CaptureQueriesContext(connection) as ctx_large:
+            self._post({"user_ids": large})
+        self.assertEqual(len(ctx_small.captured_queries), len(ctx_large.captured_queries))
+
+    def test_validation(self):
+        self.assertEqual(self._post({"user_ids": []}).status_code, 400)
+        self.assertEqual(self._post({"user_ids": ["x"]}).status_code, 400)
+        self.assertEqual(self._post({"user_ids": [1], "meals": ["snack"]}).status_code, 400)
+        self.assertEqual(self._post({"user_ids": [1], "meals": [{}]}).status_code, 400)
+        self.assertEqual(self._post({"user_ids": [1], "meals": "lunch"}).status_code, 400)
+        self.assertEqual(self._post([1, 2]).status_code, 400)
+        self.assertEqual(self._post("x").status_code, 400)
+        tomorrow = (self.today + timedelta(days=1)).isoformat()
+        self.assertEqual(self._post({"user_ids": [1], "date": tomorrow}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("admin_mark_attendance_batch")).status_code, 405)
+
+
+class MarkAttendanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plan = SubscriptionPlan.objects.create(title="Lunch Only", price=1200, included_meals=["lunch"])
+        self.user = User.objects.create_user(username="student", password="pass12345")
+        self.today = timezone.localdate()
+        UserSubscription.objects.create(user=self.user, plan=self.plan, start_date=self.today, end_date=self.today, active=True)
+        self.client.force_login(self.user)
+
+    def _mark(self, meal="lunch"):
+        return self.client.post(reverse("api_mark_attendance"), {"meal_type": meal}, content_type="application/json")
+
+    def test_entitlements_are_cached_until_subscription_changes(self):
+        self.assertEqual(self._mark("dinner").status_code, 403)
+        with CaptureQueriesContext(connection) as ctx:
+            self._mark("dinner")
+        self.assertFalse(any("usersubscription" in q["sql"] for q in ctx.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.included_meals = ["lunch", "dinner"]
+            self.plan.save()
+        self.assertEqual(self._mark("dinner").status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSubscription.objects.filter(user=self.user).delete()
+        self.assertEqual(self._mark("lunch").status_code, 403)
+
+    def test_mark_is_an_insert_plus_counter_increments(self):
+        # Warm the entitlement cache, today's stats row and this month's bitmap row
+        self._mark("dinner")
+        get_daily_stats(self.today)
+        AttendanceMonth.objects.create(user=self.user, month=self.today.replace(day=1))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._mark().status_code, 201)
+        writes = [q["sql"].split()[0].upper() for q in ctx.captured_queries if not q["sql"].upper().startswith(("SAVEPOINT", "RELEASE", "SELECT"))]
+        self.assertEqual(writes, ["INSERT", "UPDATE", "UPDATE"])
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()])
+
+    def test_second_mark_conflicts(self):
+        self.assertEqual(self._mark().status_code, 201)
+        response = self._mark()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 1)
+
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plan = SubscriptionPlan.objects.create(title="Full", price=3000, included_meals=["breakfast", "lunch", "dinner"])
+        self.user = User.objects.create_user(username="student", password="pass12345")
+        today = timezone.localdate()
+        UserSubscription.objects.create(user=self.user, plan=self.plan, start_date=today, end_date=today, active=True)
+        PopupNotice.objects.create(
+            title="Subscribers", message="Menu change", target_audience=PopupNotice.TARGET_ACTIVE_SUBSCRIBERS,
+            start_datetime=timezone.now() - timedelta(hours=1), end_datetime=timezone.now() + timedelta(hours=1),
+        )
+        self.client.force_login(self.user)
+
+    def _subscription_queries(self, path):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [q for q in ctx.captured_queries if "usersubscription" in q["sql"]]
+
+    def test_page_resolves_plan_at_most_once(self):
+        self.assertEqual(len(self._subscription_queries(reverse("home"))), 1)
+        self.assertEqual(len(self._subscription_queries(reverse("attendance"))), 0)
+
+    def test_subscription_change_invalidates(self):
+        entitlements = Entitlements(self.user)
+        self.assertTrue(entitlements.allows("dinner"))
+        UserSubscription.objects.filter(user=self.user).update(active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSubscription.objects.get(user=self.user).save()
+        fresh = Entitlements(self.user)
+        self.assertFalse(fresh.has_subscription)
+        self.assertEqual(fresh.meals, frozenset())
+        # The first object keeps what it resolved for the rest of its request
+        self.assertTrue(entitlements.allows("dinner"))
+
+    def test_anonymous_user_has_none(self):
+        entitlements = Entitlements(AnonymousUser())
+        self.assertFalse(entitlements.has_subscription)
+        self.assertFalse(entitlements.allows("lunch"))
+
+
+class SubscriptionExpiryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.plan = SubscriptionPlan.objects.create(title="Lunch Only", price=1200, included_meals=["lunch"])
+
+    def _subscribe(self, username, end_date):
+        user = User.objects.create_user(username=username, password="pass12345")
+        UserSubscription.objects.create(user=user, plan=self.plan, start_date=end_date - timedelta(days=30), end_date=end_date, active=True)
+        return user
+
+    def test_expires_lapsed_subscriptions_once(self):
+        lapsed = [self._subscribe(f"old{i}", self.today - timedelta(days=1)) for i in range(5)]
+        current = self._subscribe("current", self.today)
+        self.assertTrue(Entitlements(lapsed[0]).has_subscription)
+        self.assertEqual(get_daily_stats().active_subscribers, 6)
+
+        self.assertEqual(expire_subscriptions(batch_size=2), 5)
+        self.assertEqual(
+            set(UserSubscription.objects.filter(active=True).values_list("user", flat=True)), {current.pk},
+        )
+        self.assertEqual(Notification.objects.filter(target__in=lapsed).count(), 5)
+        self.assertFalse(Notification.objects.filter(target=current).exists())
+        self.assertEqual(get_daily_stats().active_subscribers, 1)
+        self.assertFalse(Entitlements(lapsed[0]).has_subscription)
+
+        self.assertEqual(expire_subscriptions(), 0)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    @override_settings(ENTITLEMENT_LAPSED_TIMEOUT=0)
+    def test_web_workers_see_a_sweep_from_another_process(self):
+        # The sweeper can only clear its own cache, so lapsed subscriptions
+        # are cached briefly rather than for ENTITLEMENT_CACHE_TIMEOUT
+        lapsed = self._subscribe("old", self.today - timedelta(days=1))
+        self.assertTrue(Entitlements(lapsed).has_subscription)
+        UserSubscription.objects.filter(user=lapsed).update(active=False)
+        self.assertFalse(Entitlements(lapsed).has_subscription)
+
+    def test_batches_are_fixed_query_count(self):
+        for i in range(4):
+            self._subscribe(f"old{i}", self.today - timedelta(days=3))
+        with CaptureQueriesContext(connection) as ctx:
+            expire_subscriptions(batch_size=10)
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE") and "usersubscription" in q["sql"]]
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT") and "notification" in q["sql"]]
+        self.assertEqual((len(updates), len(inserts)), (1, 1))
+
+    def test_command(self):
+        self._subscribe("old", self.today - timedelta(days=1))
+        out = StringIO()
+        call_command("expire_subscriptions", stdout=out)
+        self.assertIn("Expired 1 subscription(s).", out.getvalue())
+
+
+class MealFeedbackStatsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.today = timezone.localdate()
+        self.client.force_login(self.staff)
+
+    def _feedback(self, username, rating, meal_date=None, meal_type="lunch", **ratings):
+        user = User.objects.create_user(username=username, password="pass12345")
+        return MealFeedback.objects.create(user=user, meal_type=meal_type, meal_date=meal_date or self.today, rating=rating, **ratings)
+
+    def test_list_statistics_use_one_query(self):
+        self._feedback("a", 5)
+        self._feedback("b", 2)
+        self._feedback("c", 1, meal_type="dinner")
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse("api_meal_feedback_list"), {"meal_type": "lunch"}).json()
+        self.assertEqual((data["total"], data["avg_rating"], data["today_feedback"], data["low_ratings"]), (2, 3.5, 2, 1))
+        aggregates = [q for q in ctx.captured_queries if "mealfeedback" in q["sql"] and "COUNT" in q["sql"]]
+        self.assertEqual(len(aggregates), 1)
+
+    def test_rollup_follows_feedback_changes(self):
+        first = self._feedback("a", 5, taste_rating=4)
+        self._feedback("b", 3)
+        rollup = MealFeedbackRollup.objects.get(meal_date=self.today, meal_type="lunch")
+        self.assertEqual(rollup.responses, 2)
+        self.assertEqual(rollup.rating_histogram, [0, 0, 1, 0, 1])
+        self.assertEqual(rollup.taste_histogram, [0, 0, 0, 1, 0])
+
+        yesterday = self.today - timedelta(days=1)
+        first.meal_date = yesterday
+        first.save()
+        self.assertEqual(MealFeedbackRollup.objects.get(meal_date=self.today).rating_histogram, [0, 0, 1, 0, 0])
+        self.assertEqual(MealFeedbackRollup.objects.get(meal_date=yesterday).rating_histogram, [0, 0, 0, 0, 1])
+
+        first.delete()
+        self.assertFalse(MealFeedbackRollup.objects.filter(meal_date=yesterday).exists())
+
+    def test_rebuild_matches_signals(self):
+        self._feedback("a", 4, hygiene_rating=2)
+        self._feedback("b", 1, meal_type="breakfast")
+        self._feedback("c", 5, meal_date=self.today - timedelta(days=3))
+        expected = list(MealFeedbackRollup.objects.order_by("meal_date", "meal_type").values_list(
+            "meal_date", "meal_type", "responses", "rating_histogram", "hygiene_histogram"))
+        out = StringIO()
+        call_command("rebuild_feedback_rollups", stdout=out)
+        self.assertIn("Rebuilt 3", out.getvalue())
+        rebuilt = list(MealFeedbackRollup.objects.order_by("meal_date", "meal_type").values_list(
+            "meal_date", "meal_type", "responses", "rating_histogram", "hygiene_histogram"))
+        self.assertEqual(rebuilt, expected)
+
+    def test_trends_read_only_the_rollup(self):
+        self._feedback("a", 4, taste_rating=2)
+        self._feedback("b", 2, meal_type="dinner", taste_rating=4)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse("api_meal_feedback_trends"), {"date_from": self.today.isoformat()}).json()
+        self.assertFalse(any('"messmetapp_mealfeedback"' in q["sql"] for q in ctx.captured_queries))
+        self.assertEqual(len(data["days"]), 1)
+        day = data["days"][0]
+        self.assertEqual(day["responses"], 2)
+        self.assertEqual(day["averages"]["rating"], 3.0)
+        self.assertEqual(day["averages"]["taste_rating"], 3.0)
+        self.assertIsNone(day["averages"]["hygiene_rating"])
+
+        dinner = self.client.get(reverse("api_meal_feedback_trends"), {"meal_type": "dinner"}).json()
+        self.assertEqual(dinner["days"][0]["histograms"]["rating"], [0, 1, 0, 0, 0])
+        self.assertEqual(self.client.get(reverse("api_meal_feedback_trends"), {"date_from": "bad"}).status_code, 400)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="pass12345")
+        self.today = timezone.localdate()
+
+    def test_attendance_pages_cover_history_once(self):
+        for offset in range(7):
+            day = self.today - timedelta(days=offset)
+            for meal in ("breakfast", "dinner"):
+                Attendance.objects.create(user=self.user, date=day, meal_type=meal)
+        self.client.force_login(self.user)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(reverse("api_attendance_list"), params).json()
+            seen.extend(row["id"] for row in data["results"])
+            pages += 1
+            cursor = data["next_cursor"]
+            if not data["has_next"]:
+                break
+        self.assertEqual(pages, 3)
+        expected = list(Attendance.objects.filter(user=self.user).order_by("-date", "-marked_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+        bad = self.client.get(reverse("api_attendance_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(bad.status_code, 400)
+
+        # Clients that don't page still get the whole history as a list
+        unpaged = self.client.get(reverse("api_attendance_list")).json()
+        self.assertEqual([row["id"] for row in unpaged], expected)
+
+    def test_feedback_pages_with_tied_timestamps(self):
+        staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        for i in range(45):
+            author = User.objects.create_user(username=f"u{i}", password="pass12345")
+            MealFeedback.objects.create(user=author, meal_type="lunch", meal_date=self.today, rating=1 + i % 5)
+        # Equal timestamps must still page by id without gaps or repeats
+        MealFeedback.objects.update(created_at=timezone.now())
+        self.client.force_login(staff)
+
+        first = self.client.get(reverse("api_meal_feedback_list")).json()
+        self.assertEqual(len(first["feedbacks"]), 20)
+        self.assertFalse(first["has_prev"])
+        second = self.client.get(reverse("api_meal_feedback_list"), {"cursor": first["next_cursor"]}).json()
+        third = self.client.get(reverse("api_meal_feedback_list"), {"cursor": second["next_cursor"]}).json()
+        self.assertTrue(second["has_prev"])
+        self.assertFalse(third["has_next"])
+        ids = [row["id"] for page in (first, second, third) for row in page["feedbacks"]]
+        self.assertEqual(ids, sorted(MealFeedback.objects.values_list("id", flat=True), reverse=True))
+        self.assertEqual(third["total"], 45)
+
+    def test_deep_page_is_an_index_range(self):
+        cursor = encode_cursor([timezone.now(), 10])
+        page = MealFeedback.objects.filter(_after_cursor(("-created_at", "-id"), decode_cursor(cursor, MealFeedback, ("-created_at", "-id"))))
+        self.assertEqual(full_table_scans(page.order_by("-created_at", "-id")[:20]), [])
+
+
+def image_upload(name="photo.png", size=(1400, 700), mode="RGBA", image_format="PNG"):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 80, 40, 255) if mode == "RGBA" else (200, 80, 40)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{image_format.lower()}")
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _run_worker(self):
+        call_command("run_image_jobs", "--once", stdout=StringIO())
+
+    def test_upload_queues_processing_for_the_worker(self):
+        carousel = CarouselImage.objects.create(title="Thali", image=image_upload())
+        carousel.save()
+        job = ImageJob.objects.get()
+        self.assertEqual((job.source, job.status), (carousel.image.name, ImageJob.STATUS_PENDING))
+        self.assertFalse(ResponsiveImage.objects.exists())
+
+        self._run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ImageJob.STATUS_DONE, 1))
+        responsive = ResponsiveImage.objects.get(source=carousel.image.name)
+        self.assertEqual((responsive.width, responsive.height), (1400, 700))
+        self.assertEqual([width for width, _name in responsive.variants["webp"]], [320, 640, 960, 1280, 1400])
+        self.assertTrue(responsive.placeholder.startswith("data:image/jpeg;base64,"))
+        with default_storage.open(responsive.variants["jpeg"][0][1]) as handle:
+            derived = Image.open(handle)
+            self.assertEqual((derived.format, derived.size), ("JPEG", (320, 160)))
+        with default_storage.open(responsive.variants["webp"][1][1]) as handle:
+            self.assertEqual(Image.open(handle).format, "WEBP")
+
+    def test_tag_emits_srcset_and_falls_back(self):
+        owner = OwnerImage.objects.create(name="Tanya", image=image_upload("owner.jpg", (500, 500), "RGB", "JPEG"))
+        pending = Template('{% load responsive_images %}{% responsive_img owner.image alt="x" %}').render(Context({"owner": owner}))
+        self.assertIn(f'src="{owner.image.url}"', pending)
+        self._run_worker()
+        html = Template('{% load responsive_images %}{% responsive_img owner.image alt=owner.name sizes="200px" class="rounded-circle" %}').render(Context({"owner": owner}))
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn(" 320w, ", html)
+        self.assertIn('sizes="200px"', html)
+        self.assertIn('class="rounded-circle"', html)
+        self.assertIn('width="500"', html)
+
+        ResponsiveImage.objects.all().delete()
+        cache.clear()
+        html = Template('{% load responsive_images %}{% responsive_img owner.image alt="x" %}').render(Context({"owner": owner}))
+        self.assertIn(f'src="{owner.image.url}"', html)
+        self.assertNotIn("srcset", html)
+
+    @override_settings(RESPONSIVE_IMAGE_MISS_TIMEOUT=0)
+    def test_missing_derivatives_are_not_cached_for_long(self):
+        # A worker in another process can't clear this process's cache
+        owner = OwnerImage.objects.create(name="Tanya", image=image_upload("owner.jpg", (500, 500), "RGB", "JPEG"))
+        tag = Template('{% load responsive_images %}{% responsive_img owner.image alt="x" %}')
+        self.assertNotIn("srcset", tag.render(Context({"owner": owner})))
+        ResponsiveImage.objects.bulk_create([ResponsiveImage(source=owner.image.name, width=500, height=500, variants={"jpeg": [[320, "derivatives/a.jpg"]]})])
+        self.assertIn("srcset", tag.render(Context({"owner": owner})))
+
+    def test_unreadable_upload_fails_without_retry(self):
+        FoodImage.objects.create(title="Broken", image=SimpleUploadedFile("broken.png", b"not an image"))
+        with self.assertLogs("messmetapp.images", "WARNING"):
+            self._run_worker()
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.STATUS_FAILED, 1))
+
+    def test_jobs_of_a_dead_worker_are_retried_until_out_of_attempts(self):
+        name = default_storage.save("food/thali.png", image_upload())
+        stale = timezone.now() - timedelta(hours=1)
+        stuck = ImageJob.objects.create(source=name, status=ImageJob.STATUS_RUNNING, started_at=stale, attempts=1)
+        spent = ImageJob.objects.create(source=name, status=ImageJob.STATUS_RUNNING, started_at=stale, attempts=3)
+        self._run_worker()
+        stuck.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual((stuck.status, stuck.attempts), (ImageJob.STATUS_DONE, 2))
+        self.assertEqual((spent.status, spent.attempts), (ImageJob.STATUS_FAILED, 3))
+
+    def test_backfill_command(self):
+        name = default_storage.save("staff/cook.png", image_upload())
+        StaffImage.objects.bulk_create([StaffImage(name="Cook", image=name)])
+        FoodImage.objects.bulk_create([FoodImage(title="Broken", image=default_storage.save("food/broken.png", StringIO("not an image")))])
+        out = StringIO()
+        with self.assertLogs("messmetapp.images", "WARNING"):
+            call_command("backfill_image_derivatives", stdout=out)
+        self.assertIn("Generated derivatives for 1 image(s); skipped 1 unreadable.", out.getvalue())
+        self.assertTrue(ResponsiveImage.objects.filter(source=name).exists())
+
+
+class PaymentScreenshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.plan = SubscriptionPlan.objects.create(title="Monthly", price=3000)
+
+    def _screenshot(self, quality=90, name="jnmk.jpg"):
+        buffer = BytesIO()
+        image = Image.new("RGB", (300, 600), (255, 255, 255))
+        for y in range(0, 600, 40):
+            image.paste((20, 120, 60), (0, y, 150 + y // 4, y + 20))
+        image.save(buffer, "JPEG", quality=quality)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def _proof(self, username, screenshot):
+        user = User.objects.create_user(username=username, password="pass12345")
+        return PaymentProof.objects.create(user=user, subscription_plan=self.plan, screenshot=screenshot)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self._proof("a", self._screenshot())
+        second = self._proof("b", self._screenshot(name="jnmk.jpg"))
+        visitor = VisitorPayment.objects.create(name="Guest", amount=80, meal_type="lunch", screenshot=self._screenshot(name="other.jpg"))
+        self.assertEqual(first.screenshot.name, second.screenshot.name)
+        self.assertEqual(first.screenshot.name, visitor.screenshot.name)
+        self.assertRegex(first.screenshot.name, r"^payments/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        stored = [path for path in Path(self.media_root, "payments").rglob("*") if path.is_file()]
+        self.assertEqual(len(stored), 1)
+
+    def test_reviewers_see_earlier_submissions(self):
+        original = self._proof("a", self._screenshot())
+        exact = self._proof("b", self._screenshot())
+        similar = self._proof("c", self._screenshot(quality=60))
+        unrelated = self._proof("d", image_upload("other.png", (300, 600)))
+        call_command("run_image_jobs", "--once", stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as ctx:
+            duplicates = find_duplicate_screenshots([exact, similar, unrelated])
+        self.assertEqual(len(ctx.captured_queries), 3)
+        # Payment rows are looked up by name, never scanned in full
+        self.assertTrue(all(" IN (" in q["sql"] for q in ctx.captured_queries[1:]))
+        self.assertEqual(duplicates[exact.pk][0], {"kind": "proof", "id": original.pk, "exact": True})
+        self.assertIn({"kind": "proof", "id": original.pk, "exact": False}, duplicates[similar.pk])
+        self.assertNotIn(unrelated.pk, duplicates)
+
+        staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.client.force_login(staff)
+        html = self.client.get(reverse("dashboard_section", args=["payments"])).content.decode()
+        self.assertIn(f"Already submitted for proof #{original.pk}", html)
+        self.assertIn(f"Looks like proof #{original.pk}", html)
+
+    def test_dedupe_command_merges_existing_copies(self):
+        data = self._screenshot().read()
+        names = [FileSystemStorage().save(f"payments/jnmk{suffix}.jpg", ContentFile(data)) for suffix in ("", "_UJxuIEh")]
+        user = User.objects.create_user(username="a", password="pass12345")
+        PaymentProof.objects.bulk_create([PaymentProof(user=user, subscription_plan=self.plan, screenshot=name) for name in names])
+
+        out = StringIO()
+        call_command("dedupe_payment_screenshots", stdout=out)
+        self.assertIn("Moved 2 screenshot(s); 1 unique file(s) remain.", out.getvalue())
+        self.assertEqual(len(set(PaymentProof.objects.values_list("screenshot", flat=True))), 1)
+        stored = [path for path in Path(self.media_root, "payments").rglob("*") if path.is_file()]
+        self.assertEqual(len(stored), 1)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.gallery = default_storage.save("food_gallery/thali.txt", ContentFile(b"0123456789" * 10))
+        self.owner = User.objects.create_user(username="owner", password="pass12345")
+        plan = SubscriptionPlan.objects.create(title="Monthly", price=3000)
+        self.proof = PaymentProof.objects.create(user=self.owner, subscription_plan=plan, screenshot=image_upload("pay.png", (40, 40)))
+        self.screenshot_url = f"/media/{self.proof.screenshot.name}"
+
+    def test_public_file_is_cached_and_supports_ranges(self):
+        url = f"/media/{self.gallery}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789" * 10)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=", response["Cache-Control"])
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        partial = self.client.get(url, HTTP_RANGE="bytes=10-14")
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial["Content-Range"], "bytes 10-14/100")
+        self.assertEqual(b"".join(partial.streaming_content), b"01234")
+        suffix = self.client.get(url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(suffix.streaming_content), b"789")
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=-3", HTTP_IF_RANGE='"stale"').status_code, 200)
+
+        unsatisfiable = self.client.get(url, HTTP_RANGE="bytes=500-")
+        self.assertEqual((unsatisfiable.status_code, unsatisfiable["Content-Range"]), (416, "bytes */100"))
+
+    def test_payment_screenshots_are_private(self):
+        self.assertEqual(self.client.get(self.screenshot_url).status_code, 404)
+        User.objects.create_user(username="other", password="pass12345")
+        self.client.login(username="other", password="pass12345")
+        self.assertEqual(self.client.get(self.screenshot_url).status_code, 404)
+
+        self.client.force_login(self.owner)
+        response = self.client.get(self.screenshot_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+        self.client.force_login(User.objects.create_user(username="admin", password="pass12345", is_staff=True))
+        self.assertEqual(self.client.get(self.screenshot_url).status_code, 200)
+
+    def test_derivatives_follow_their_source(self):
+        call_command("run_image_jobs", "--once", stdout=StringIO())
+        derivative = ResponsiveImage.objects.get(source=self.proof.screenshot.name).variants["jpeg"][0][1]
+        self.assertEqual(self.client.get(f"/media/{derivative}").status_code, 404)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(f"/media/{derivative}").status_code, 200)
+
+    def test_traversal_and_missing_files_404(self):
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/food_gallery/missing.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/food_gallery").status_code, 404)
+
+    def test_hands_transfer_to_front_server(self):
+        self.client.force_login(self.owner)
+        with override_settings(MEDIA_SENDFILE="x-accel-redirect", MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/"):
+            response = self.client.get(self.screenshot_url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.proof.screenshot.name}")
+        self.assertEqual(response.content, b"")
+        self.assertIn("ETag", response)
+        with override_settings(MEDIA_SENDFILE="x-sendfile"):
+            response = self.client.get(self.screenshot_url)
+        self.assertEqual(response["X-Sendfile"], str(Path(self.media_root, self.proof.screenshot.name)))
+
+
+def text_pdf(*lines):
+    """One-page PDF with ``lines`` as real (extractable) text"""
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=595, height=842)
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)}),
+    })
+    content = DecodedStreamObject()
+    content.set_data(("BT /F1 12 Tf 72 760 Td 16 TL " + " ".join(f"({line}) '" for line in lines) + " ET").encode())
+    page[NameObject("/Contents")] = writer._add_object(content)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return SimpleUploadedFile("menu.pdf", buffer.getvalue(), content_type="application/pdf")
+
+
+def scanned_pdf(pages=2):
+    buffer = BytesIO()
+    images = [Image.new("RGB", (1600, 2200), (255, 255 - 40 * page, 255)) for page in range(pages)]
+    images[0].save(buffer, "PDF", save_all=True, append_images=images[1:])
+    return SimpleUploadedFile("scan.pdf", buffer.getvalue(), content_type="application/pdf")
+
+
+class MenuArtifactTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.today = timezone.localdate()
+
+    def _run_worker(self):
+        call_command("run_image_jobs", "--once", stdout=StringIO())
+
+    def test_text_pdf_is_extracted(self):
+        menu = MonthlyMenu.objects.create(month=self.today.month, year=self.today.year, file=text_pdf("Monday lunch: Paneer butter masala", "Monday dinner: Dal tadka"))
+        # Built by the worker, not in the upload request
+        self.assertEqual(ImageJob.objects.get().source, menu.file.name)
+        menu.refresh_from_db()
+        self.assertEqual(menu.extracted_text, "")
+        self._run_worker()
+        menu.refresh_from_db()
+        self.assertIn("Paneer butter masala", menu.extracted_text)
+        self.assertIn("Dal tadka", menu.extracted_text)
+        self.assertEqual((menu.page_count, menu.previews), (1, []))
+
+        html = self.client.get(reverse("menu")).content.decode()
+        self.assertIn("Paneer butter masala", html)
+        self.assertIn("Download Original (1 page)", html)
+        data = self.client.get(reverse("api_current_menu")).json()
+        self.assertIn("Dal tadka", data["extracted_text"])
+        self.assertEqual(list(data)[:5], ["id", "month", "year", "previews", "extracted_text"])
+
+    def test_scanned_pdf_gets_page_previews(self):
+        menu = MonthlyMenu.objects.create(month=self.today.month, year=self.today.year, file=scanned_pdf())
+        self._run_worker()
+        menu.refresh_from_db()
+        self.assertEqual(menu.page_count, 2)
+        self.assertEqual([(p["width"], p["height"]) for p in menu.previews], [(1280, 1760), (1280, 1760)])
+        with default_storage.open(menu.previews[0]["name"]) as handle:
+            self.assertEqual(Image.open(handle).format, "JPEG")
+
+        html = self.client.get(reverse("menu")).content.decode()
+        self.assertIn(f'src="{default_storage.url(menu.previews[0]["name"])}"', html)
+        previews = self.client.get(reverse("api_current_menu")).json()["previews"]
+        self.assertEqual(len(previews), 2)
+        self.assertTrue(previews[1]["url"].endswith(menu.previews[1]["name"]))
+
+        old = [p["name"] for p in menu.previews]
+        menu.file = scanned_pdf(pages=1)
+        menu.save()
+        self._run_worker()
+        menu.refresh_from_db()
+        self.assertEqual(menu.page_count, 1)
+        self.assertFalse(default_storage.exists(old[1]))
+
+    def test_menu_image_is_the_fallback_preview(self):
+        menu = MonthlyMenu.objects.create(month=self.today.month, year=self.today.year, file=text_pdf("Thali"), image=image_upload("menu.png", (2000, 1000)))
+        self._run_worker()
+        menu.refresh_from_db()
+        self.assertEqual([(p["width"], p["height"]) for p in menu.previews], [(1280, 640)])
+        self.assertIn("Thali", menu.extracted_text)
+
+    def test_command_rebuilds_and_reports_unreadable(self):
+        name = default_storage.save("menus/broken.pdf", ContentFile(b"%PDF-1.4 truncated"))
+        MonthlyMenu.objects.bulk_create([MonthlyMenu(month=1, year=2026, file=name)])
+        out = StringIO()
+        with self.assertLogs("messmetapp.menu_artifacts", "WARNING"), self.assertLogs("pypdf", "WARNING") as pypdf_logs:
+            call_command("build_menu_artifacts", stdout=out)
+        self.assertIn("EOF marker not found", "\n".join(pypdf_logs.output))
+        self.assertIn("Built artifacts for 0 menu(s); 1 had unreadable uploads.", out.getvalue())
+        call_command("build_menu_artifacts", stdout=out)
+        self.assertIn("Built artifacts for 0 menu(s); 0 had unreadable uploads.", out.getvalue())
+
+    def test_unreadable_upload_fails_its_job(self):
+        MonthlyMenu.objects.create(month=1, year=2026, file=ContentFile(b"%PDF-1.4 truncated", name="broken.pdf"))
+        with self.assertLogs("messmetapp.menu_artifacts", "WARNING"), self.assertLogs("pypdf", "WARNING"):
+            self._run_worker()
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.error), (ImageJob.STATUS_FAILED, "Missing or unreadable file"))
+
+
+class MenuIndexTests(TestCase):
+    MENU_TEXT = "\n".join([
+        "Tanya's Kitchen - October",
+        "Breakfast: Poha, Tea",
+        "Monday",
+        "Lunch: Rajma, Rice + Salad",
+        "Dinner -",
+        "Dal tadka, Roti",
+        "Tue - Lunch: Chole; Bhature | Dinner: Paneer",
+        "03/10/2025: Lunch: Biryani, Raita",
+        "32: Lunch: Nothing",
+    ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parser_handles_weekdays_dates_and_defaults(self):
+        parsed = parse_menu_text(self.MENU_TEXT, 2025, 10)
+        self.assertEqual(parsed[(date(2025, 10, 6), "lunch")], ["Rajma", "Rice", "Salad"])
+        self.assertEqual(parsed[(date(2025, 10, 13), "dinner")], ["Dal tadka", "Roti"])
+        self.assertEqual(parsed[(date(2025, 10, 7), "dinner")], ["Paneer"])
+        self.assertEqual(parsed[(date(2025, 10, 3), "lunch")], ["Biryani", "Raita"])
+        self.assertEqual(parsed[(date(2025, 10, 31), "breakfast")], ["Poha", "Tea"])
+        self.assertNotIn((date(2025, 10, 1), "lunch"), parsed)
+
+    def test_menu_text_is_indexed_and_staff_entries_survive(self):
+        menu = MonthlyMenu.objects.create(month=10, year=2025, text=self.MENU_TEXT)
+        self.assertEqual(MenuItem.objects.filter(date="2025-10-06").count(), 3)
+        staff = User.objects.create_user(username="admin", password="pass12345", is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(reverse("dashboard"), {"action": "save_menu_item", "date": "2025-10-06", "meal_type": "lunch", "dishes": "Kadhi, Rice"})
+
+        menu.text = self.MENU_TEXT.replace("Rajma", "Aloo")
+        menu.save()
+        self.assertEqual(MenuItem.objects.get(date="2025-10-06", meal_type="lunch").dishes, ["Kadhi", "Rice"])
+        self.assertEqual(MenuItem.objects.get(date="2025-10-13", meal_type="lunch").dishes, ["Aloo", "Rice", "Salad"])
+
+        self.client.post(reverse("dashboard"), {"action": "save_menu_item", "date": "2025-10-06", "meal_type": "lunch", "dishes": ""})
+        self.assertFalse(MenuItem.objects.filter(date="2025-10-06", meal_type="lunch").exists())
+
+    def test_today_and_week_apis_are_cached(self):
+        today = timezone.localdate()
+        MenuItem.objects.create(date=today, meal_type="dinner", dishes=["Khichdi"])
+        data = self.client.get(reverse("api_menu_today")).json()
+        self.assertEqual(data, {"date": today.isoformat(), "meals": {"breakfast": [], "lunch": [], "dinner": ["Khichdi"]}})
+        with self.assertNumQueries(0):
+            self.client.get(reverse("api_menu_today"))
+
+        MenuItem.objects.create(date=today + timedelta(days=2), meal_type="lunch", dishes=["Pulao"])
+        week = self.client.get(reverse("api_menu_week")).json()
+        self.assertEqual((week["start"], len(week["days"])), (today.isoformat(), 7))
+        self.assertEqual(week["days"][2]["meals"]["lunch"], ["Pulao"])
+        later = self.client.get(reverse("api_menu_week"), {"start": (today + timedelta(days=2)).isoformat()}).json()
+        self.assertEqual(later["days"][0]["meals"]["lunch"], ["Pulao"])
+        self.assertEqual(self.client.get(reverse("api_menu_week"), {"start": "soon"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_menu_week"), {"start": "9999-12-30"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_menu_week"), {"start": "0001-01-01"}).status_code, 400)
+
+        self.assertIn("Khichdi", self.client.get(reverse("home")).content.decode())
+
+    def test_indexing_a_menu_refreshes_the_cached_home_page(self):
+        today = timezone.localdate()
+        self.assertNotIn("Today's Menu", self.client.get(reverse("home")).content.decode())
+        MonthlyMenu.objects.create(month=today.month, year=today.year, text="Lunch: Rajma, Rice")
+        self.assertIn("Rajma, Rice", self.client.get(reverse("home")).content.decode())
+
+    @override_settings(MENU_INDEX_CACHE_TIMEOUT=0)
+    def test_edits_from_another_worker_show_without_invalidation(self):
+        # A write in another process can't bump this process's generation
+        today = timezone.localdate()
+        item = MenuItem.objects.create(date=today, meal_type="lunch", dishes=["Rajma"])
+        self.assertEqual(self.client.get(reverse("api_menu_today")).json()["meals"]["lunch"], ["Rajma"])
+        MenuItem.objects.filter(pk=item.pk).update(dishes=["Chole"])
+        self.assertEqual(self.client.get(reverse("api_menu_today")).json()["meals"]["lunch"], ["Chole"])
+
+
+def full_table_scans(queryset):
+    """
+    Tables the database plans to read in full for ``queryset``, from its
+    EXPLAIN output. Only SQLite and MySQL plans are understood.
+    """
+    if connection.vendor == "sqlite":
+        # SEARCH seeks an index; SCAN reads a whole table or a whole index
+        return [line.strip() for line in queryset.explain().splitlines() if re.search(r"\bSCAN \w+", line)]
+    if connection.vendor == "mysql":
+        scans = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get("access_type") == "ALL":
+                    scans.append(node.get("table_name"))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(queryset.explain(format="json")))
+        return scans
+    raise unittest.SkipTest(f"EXPLAIN checks don't support {connection.vendor}")
+
+
+class HotQueryPlanTests(TestCase):
+    """The querysets behind the busiest pages must be served from indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="student", password="pass12345")
+        cls.today = timezone.localdate()
+
+    def assertNoFullScans(self, queryset):
+        self.assertEqual(full_table_scans(queryset), [], queryset.explain())
+
+    def test_active_subscription_lookup(self):
+        self.assertNoFullScans(
+            UserSubscription.objects.filter(user_id=self.user.pk, active=True).select_related("plan").order_by("-created_at")[:1]
+        )
+
+    def test_expiry_sweep(self):
+        self.assertNoFullScans(UserSubscription.objects.filter(active=True, end_date__lt=self.today).values_list("pk", "user_id"))
+
+    def test_pending_payments(self):
+        self.assertNoFullScans(
+            PaymentProof.objects.filter(status=PaymentProof.STATUS_PENDING).select_related("user", "subscription_plan").order_by("-submitted_at")[:10]
+        )
+
+    def test_attendance_for_day(self):
+        self.assertNoFullScans(Attendance.objects.filter(date=self.today).values_list("user_id", "meal_type"))
+
+    def test_meal_feedback_filters(self):
+        week_ago = self.today - timedelta(days=7)
+        # Unordered, as in the summary aggregate and the rollup refresh
+        self.assertNoFullScans(MealFeedback.objects.filter(meal_date__gte=week_ago, meal_type="lunch", rating__lte=2).order_by())
+        self.assertNoFullScans(MealFeedback.objects.filter(meal_date=self.today, meal_type="lunch").order_by())
+
+    def test_live_popup_notices(self):
+        self.assertNoFullScans(PopupNotice.objects.filter(is_active=True, end_datetime__gte=timezone.now()))
+
+
+class ConcurrentMarkAttendanceTests(TransactionTestCase):
+    def test_simultaneous_marks_yield_one_201(self):
+        cache.clear()
+        plan = SubscriptionPlan.objects.create(title="Lunch Only", price=1200, included_meals=["lunch"])
+        user = User.objects.create_user(username="student", password="pass12345")
+        today = timezone.localdate()
+        UserSubscription.objects.create(user=user, plan=plan, start_date=today, end_date=today, active=True)
+
+        attempts = 6
+        barrier = threading.Barrier(attempts)
+        statuses = []
+
+        clients = []
+        for _ in range(attempts):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def mark(client):
+            try:
+                barrier.wait(timeout=10)
+                response = client.post(reverse("api_mark_attendance"), {"meal_type": "lunch"}, content_type="application/json")
+                statuses.append((response.status_code, response.json()))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=mark, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        codes = sorted(code for code, _body in statuses)
+        self.assertEqual(codes, [201] + [409] * (attempts - 1))
+        self.assertEqual([body for code, body in statuses if code == 409], [{"detail": "Already marked"}] * (attempts - 1))
+        self.assertEqual(Attendance.objects.filter(user=user, date=today).count(), 1)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('menu/', views.menu_view, name='menu'),
     path('attendance/', views.attendance_view, name='attendance'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/section/<slug:section>/', views.dashboard_section, name='dashboard_section'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register_view, name='register'),
@@ -23,6 +24,8 @@ urlpatterns = [
     path('api/attendance/mark/', views.api_mark_attendance, name='api_mark_attendance'),
     path('api/attendance/', views.api_attendance_list, name='api_attendance_list'),
     path('api/menu/current/', views.api_current_menu, name='api_current_menu'),
+    path('api/menu/today/', views.api_menu_today, name='api_menu_today'),
+    path('api/menu/week/', views.api_menu_week, name='api_menu_week'),
     path('api/payments/', views.api_payment_proofs, name='api_payment_proofs'),
     path('api/payments/config/', views.api_payment_config, name='api_payment_config'),
     path('api/feedback/', views.api_feedback, name='api_feedback'),
@@ -43,7 +46,13 @@ urlpatterns = [
     # Admin APIs
     path('api/admin/mark-attendance/', views.admin_mark_attendance, name='admin_mark_attendance'),
     path('api/admin/mark-attendance', views.admin_mark_attendance, name='admin_mark_attendance_no_slash'),
+    path('api/admin/mark-attendance/batch/', views.admin_mark_attendance_batch, name='admin_mark_attendance_batch'),
+    path('api/admin/roster/', views.api_admin_roster, name='api_admin_roster'),
     path('api/student-details/<int:user_id>/', views.student_details, name='student_details'),
+    # Background exports
+    path('api/exports/', views.api_export_jobs, name='api_export_jobs'),
+    path('api/exports/<int:job_id>/', views.api_export_job_status, name='api_export_job_status'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     # User Management APIs
     path('api/user-details/<int:user_id>/', views.user_details, name='user_details'),
     path('api/admin/user/', views.admin_user_crud, name='admin_user_crud'),
@@ -51,6 +60,7 @@ urlpatterns = [
     path('meal-feedback/', views.meal_feedback_view, name='meal_feedback'),
     path('api/meal-feedback/', views.api_meal_feedback, name='api_meal_feedback'),
     path('api/meal-feedback-list/', views.api_meal_feedback_list, name='api_meal_feedback_list'),
+    path('api/meal-feedback-trends/', views.api_meal_feedback_trends, name='api_meal_feedback_trends'),
 ]
 
 
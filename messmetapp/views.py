@@ -1,17 +1,33 @@
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Max, Q
 from django.utils import timezone
 import csv
 from datetime import timedelta, datetime
-from .models import SubscriptionPlan, User, UserSubscription, Attendance, MonthlyMenu, PaymentProof, MealFeedback, VisitorPayment, VisitorFeedback, PopupNotice, StaffImage, OwnerImage
-from .meal_feedback_views import meal_feedback_view, api_meal_feedback, api_meal_feedback_list
-from .forms import RegisterForm, ProfileForm, MonthlyMenuForm, CarouselImageForm, MealFeedbackForm, VisitorPaymentForm, VisitorFeedbackForm
+from .models import SubscriptionPlan, User, UserSubscription, Attendance, MonthlyMenu, PaymentProof, MealFeedback, VisitorPayment, VisitorFeedback, PopupNotice, StaffImage, OwnerImage, ExportJob
+from .media import serve_media
+from .meal_feedback_views import meal_feedback_view, api_meal_feedback, api_meal_feedback_list, api_meal_feedback_trends
+from .roster import roster_page, ROSTER_PAGE_SIZE
+from .stats import get_daily_stats, new_users_in_month
+from .dashboard_sections import SECTIONS as DASHBOARD_SECTIONS, render_section
+from .page_cache import cache_public_page
+from .notices import get_active_notices_for_user
+from .attendance_bits import month_calendar
+from .attendance_marking import ATTENDANCE_BATCH_LIMIT, mark_attendance_batch
+from .entitlements import Entitlements
+from .menu_index import MENU_WEEK_MAX_OFFSET, menu_for_day, menu_for_week, save_menu_item
+from .pagination import AttendanceCursorPagination
+from .exports import (
+    ATTENDANCE_HEADER, USERS_HEADER, MEAL_FEEDBACK_HEADER, EXPORTS, attendance_export_filters,
+    attendance_export_rows, users_export_rows, meal_feedback_export_rows, streaming_csv_response,
+)
+from .forms import RegisterForm, ProfileForm, MonthlyMenuForm, MenuItemForm, CarouselImageForm, MealFeedbackForm, VisitorPaymentForm, VisitorFeedbackForm
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
@@ -29,43 +45,7 @@ from django.http import HttpResponse
 import csv
 
 
-def get_active_notices_for_user(user):
-    """
-    Get all currently active popup notices for a given user
-    based on datetime and target audience
-    """
-    now = timezone.now()
-    
-    # Get notices that are active and within the datetime range
-    notices = PopupNotice.objects.filter(
-        is_active=True,
-        start_datetime__lte=now,
-        end_datetime__gte=now
-    )
-    
-    # Filter based on target audience
-    if user.is_authenticated:
-        # Check if user has active subscription
-        has_active_sub = UserSubscription.objects.filter(user=user, active=True).exists()
-        
-        # Filter notices based on target audience
-        filtered_notices = []
-        for notice in notices:
-            if notice.target_audience == PopupNotice.TARGET_ALL_USERS:
-                filtered_notices.append(notice)
-            elif notice.target_audience == PopupNotice.TARGET_HOSTELLERS and user.hostel_status == User.HOSTEL_STATUS_HOSTELLER:
-                filtered_notices.append(notice)
-            elif notice.target_audience == PopupNotice.TARGET_NON_HOSTELLERS and user.hostel_status == User.HOSTEL_STATUS_NON_HOSTELLER:
-                filtered_notices.append(notice)
-            elif notice.target_audience == PopupNotice.TARGET_ACTIVE_SUBSCRIBERS and has_active_sub:
-                filtered_notices.append(notice)
-        
-        return filtered_notices
-    else:
-        # For anonymous users, only show "all users" notices
-        return notices.filter(target_audience=PopupNotice.TARGET_ALL_USERS)
-
-
+@cache_public_page('home')
 def home(request):
     plans = SubscriptionPlan.objects.filter(is_active=True)
     from .models import CarouselImage, FoodImage
@@ -75,13 +55,9 @@ def home(request):
     # Get attendance data for authenticated users
     attendance_data = None
     if request.user.is_authenticated:
-        # Get user's active subscription
-        active_sub = UserSubscription.objects.filter(user=request.user, active=True).order_by('-created_at').first()
-        
-        # Get allowed meals from subscription
-        allowed_meals = []
-        if active_sub:
-            allowed_meals = active_sub.plan.included_meals
+        # Get user's active subscription and the meals it allows
+        active_sub = request.entitlements.subscription
+        allowed_meals = active_sub.plan.included_meals if active_sub else []
         
         # Get today's attendance for this user
         today = timezone.localdate()
@@ -95,7 +71,7 @@ def home(request):
         }
     
     # Get active popup notices for the current user
-    active_notices = get_active_notices_for_user(request.user)
+    active_notices = get_active_notices_for_user(request.user, request.entitlements)
     
     # Serialize notices to JSON format
     import json
@@ -114,6 +90,7 @@ def home(request):
     
     return render(request, 'home.html', {
         "plans": plans, 
+        "todays_menu": menu_for_day(timezone.localdate())["meals"],
         "carousel_images": carousel_images,
         "food_images": food_images,
         "attendance_data": attendance_data,
@@ -145,6 +122,7 @@ def visitor_feedback_api(request):
     return JsonResponse({"success": False, "errors": form.errors}, status=400)
 
 
+@cache_public_page('about')
 def about_view(request):
     staff_members = StaffImage.objects.filter(is_active=True).order_by('-order', '-created_at')
     owners = OwnerImage.objects.filter(is_active=True).order_by('-created_at')
@@ -156,6 +134,7 @@ def about_view(request):
 
 
 
+@cache_public_page('menu')
 def menu_view(request):
     """Display the current monthly menu"""
     today = timezone.localdate()
@@ -169,13 +148,9 @@ def attendance_view(request):
     # Redirect admin users to dashboard
     if request.user.is_staff:
         return redirect('dashboard')
-    # Get user's active subscription
-    active_sub = UserSubscription.objects.filter(user=request.user, active=True).order_by('-created_at').first()
-    
-    # Get allowed meals from subscription
-    allowed_meals = []
-    if active_sub:
-        allowed_meals = active_sub.plan.included_meals
+    # Get user's active subscription and the meals it allows
+    active_sub = request.entitlements.subscription
+    allowed_meals = active_sub.plan.included_meals if active_sub else []
     
     # Get today's attendance for this user
     today = timezone.localdate()
@@ -195,6 +170,7 @@ def attendance_view(request):
         'allowed_meals': allowed_meals,
         'marked_meals': marked_meals,
         'recent_attendance': recent_attendance,
+        'attendance_calendar': month_calendar(request.user, today),
         'today': today,
         'current_time': current_time,
     })
@@ -226,6 +202,19 @@ def dashboard(request):
                     messages.success(request, f"Menu for {month:02d}/{year} uploaded successfully!")
             else:
                 messages.error(request, "Please correct the errors in the menu form.")
+
+        # Handle a staff entry in the per-day menu
+        elif action == "save_menu_item":
+            item_form = MenuItemForm(request.POST)
+            if item_form.is_valid():
+                day = item_form.cleaned_data['date']
+                meal_type = item_form.cleaned_data['meal_type']
+                if save_menu_item(day, meal_type, item_form.cleaned_data['dishes']):
+                    messages.success(request, f"Menu for {meal_type} on {day:%d %b} saved.")
+                else:
+                    messages.info(request, f"Menu for {meal_type} on {day:%d %b} cleared.")
+            else:
+                messages.error(request, "Please correct the errors in the menu entry form.")
         
         # Handle plan creation
         elif action == "add_plan":
@@ -361,8 +350,11 @@ def dashboard(request):
                         proof.save()
                         start = timezone.localdate()
                         end = proof.subscription_plan.compute_end_date(start)
-                        # Deactivate any existing active subscriptions for this user before creating a new one
-                        UserSubscription.objects.filter(user=proof.user, active=True).update(active=False)
+                        # Deactivate any existing active subscriptions for this user before creating a new one;
+                        # saved one by one so the signals keep the subscriber count right
+                        for old_sub in UserSubscription.objects.filter(user=proof.user, active=True):
+                            old_sub.active = False
+                            old_sub.save(update_fields=['active'])
                         UserSubscription.objects.create(user=proof.user, plan=proof.subscription_plan, start_date=start, end_date=end, active=True)
                         messages.success(request, "Payment approved and subscription activated.")
                     elif action == "reject_payment" and proof.status != "rejected":
@@ -384,129 +376,62 @@ def dashboard(request):
         return redirect('dashboard')
     
     # Get all data for the unified admin dashboard
+    # Counters come from the DailyStats rollup (kept current by signals)
     today_date = timezone.localdate()
+    daily = get_daily_stats(today_date)
     stats = {
         # Exclude staff/admin from user-facing counts
-        "users": User.objects.filter(is_staff=False).count(),
+        "users": daily.users,
         # Count users with at least one active subscription (distinct users)
-        "active_subs": UserSubscription.objects.filter(active=True, user__is_staff=False).values('user').distinct().count(),
-        "pending_payments": PaymentProof.objects.filter(status="pending").count(),
+        "active_subs": daily.active_subscribers,
+        "pending_payments": daily.pending_payments,
         # Count distinct users who attended today, not total meal records
-        "today_attendance": Attendance.objects.filter(date=today_date, user__is_staff=False).values('user').distinct().count(),
+        "today_attendance": daily.attendees,
     }
     
-    # Get pending payments
-    pending_payments = PaymentProof.objects.filter(status="pending").order_by("-submitted_at")[:10]
-    # Visitor payments filter
-    visitor_period = request.GET.get("visitor_period", "")
-    visitor_payments = VisitorPayment.objects.all().order_by("-created_at")
-    if visitor_period == "today":
-        visitor_payments = visitor_payments.filter(created_at__date=timezone.localdate())
-    elif visitor_period == "week":
-        start_week = timezone.now() - timedelta(days=7)
-        visitor_payments = visitor_payments.filter(created_at__gte=start_week)
-    elif visitor_period == "month":
-        start_month = timezone.now() - timedelta(days=30)
-        visitor_payments = visitor_payments.filter(created_at__gte=start_month)
-    
-    # Get all subscription plans
-    plans = SubscriptionPlan.objects.all().order_by('-is_active', 'title')
-    
-    # Get current menu
-    today = timezone.localdate()
-    current_menu = MonthlyMenu.objects.filter(month=today.month, year=today.year).first()
-    
-    # Get payment config
-    from .models import PaymentConfig
-    paycfg = PaymentConfig.objects.first()
-    
-    # Get feedbacks
-    from .models import Feedback
-    recent_feedbacks = Feedback.objects.all().order_by('-created_at')[:5]
-    # Visitor feedbacks (latest 10)
-    visitor_feedbacks = VisitorFeedback.objects.all().order_by('-created_at')[:10]
-    
-    # Get carousel images
-    from .models import CarouselImage
-    carousel_images = CarouselImage.objects.filter(is_active=True).order_by('order', '-created_at')
-    
-    # Get food gallery images
-    from .models import FoodImage
-    food_images = FoodImage.objects.filter(is_active=True).order_by('order', '-created_at')
-    
-    # Initialize forms
-    menu_form = MonthlyMenuForm()
-    carousel_form = CarouselImageForm()
+    # Only the overview is rendered here; every other section is fetched
+    # from dashboard_section when it is opened (see dashboard_sections.py)
+    plans_count = SubscriptionPlan.objects.count()
+    from .models import Feedback, CarouselImage
+    recent_feedbacks = Feedback.objects.select_related('user').order_by('-created_at')[:5]
+    carousel_count = CarouselImage.objects.filter(is_active=True).count()
     
     # Get current time in Kolkata timezone
     import pytz
     kolkata_tz = pytz.timezone('Asia/Kolkata')
     current_time = timezone.now().astimezone(kolkata_tz)
     
-    # LMS Data - Get all users with their attendance info
-    all_users_qs = User.objects.filter(is_staff=False)
+    # LMS Data - the roster tables are loaded page by page from api_admin_roster,
+    # so only the counts are computed here
     # Optional hostel_status filter
     hostel_status = request.GET.get("hostel_status")
     if hostel_status == "all":
         hostel_status = ""
     if hostel_status in [User.HOSTEL_STATUS_HOSTELLER, User.HOSTEL_STATUS_NON_HOSTELLER]:
-        all_users_qs = all_users_qs.filter(hostel_status=hostel_status)
-
-    all_users = all_users_qs.annotate(
-        # Count distinct dates attended, not total meal records
-        total_attendance_count=Count('attendances__date', distinct=True),
-        last_attendance=Max('attendances__marked_at')
-    ).order_by('username')
-    
-    # Add today's attendance status for each user
-    today = timezone.localdate()
-    for user in all_users:
-        user.today_attendance = Attendance.objects.filter(
-            user=user, 
-            date=today
-        ).first()
-        user.active_subscriptions = UserSubscription.objects.filter(user=user, active=True)
+        total_users = User.objects.filter(is_staff=False, hostel_status=hostel_status).count()
+    else:
+        total_users = daily.users
     
     # Calculate attendance statistics
-    # Count distinct users who attended today, not total meal records
-    today_attendance_count = Attendance.objects.filter(date=today, user__is_staff=False).values('user').distinct().count()
-    total_users = all_users.count()
+    today_attendance_count = daily.attendees
     absent_today_count = total_users - today_attendance_count
     attendance_rate = round((today_attendance_count / total_users * 100) if total_users > 0 else 0, 1)
     
     # User Management Statistics (distinct users with active subs, exclude staff)
-    active_subscriptions_count = (
-        UserSubscription.objects.filter(active=True, user__is_staff=False)
-        .values('user').distinct().count()
-    )
-    no_subscriptions_count = User.objects.filter(is_staff=False).exclude(
-        subscriptions__active=True
-    ).count()
+    active_subscriptions_count = daily.active_subscribers
+    no_subscriptions_count = daily.users - daily.active_subscribers
     
     # New users this month
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    new_users_count = User.objects.filter(
-        date_joined__month=current_month,
-        date_joined__year=current_year
-    ).count()
+    new_users_count = new_users_in_month(today_date.year, today_date.month)
     
     return render(request, 'admin_dashboard.html', {
         "stats": stats,
-        "pending_payments": pending_payments,
-        "plans": plans,
-        "current_menu": current_menu,
-        "paycfg": paycfg,
+        "plans_count": plans_count,
         "recent_feedbacks": recent_feedbacks,
-        "visitor_feedbacks": visitor_feedbacks,
-        "menu_form": menu_form,
-        "carousel_images": carousel_images,
-        "carousel_form": carousel_form,
-        "food_images": food_images,
+        "carousel_count": carousel_count,
         "current_time": current_time,
-        "visitor_payments": visitor_payments,
         # LMS Data
-        "all_users": all_users,
+        "total_users": total_users,
         "selected_hostel_status": hostel_status or "",
         "today_attendance_count": today_attendance_count,
         "absent_today_count": absent_today_count,
@@ -518,7 +443,17 @@ def dashboard(request):
     })
 
 
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(["GET"])
+def dashboard_section(request, section):
+    """Render a single dashboard section as an HTML fragment"""
+    if section not in DASHBOARD_SECTIONS:
+        raise Http404("Unknown dashboard section")
+    return HttpResponse(render_section(request, section))
+
+
 @require_http_methods(["GET", "POST"])
+@cache_public_page('plans')
 def plans_list(request):
     # Redirect admin users to dashboard
     if request.user.is_staff:
@@ -558,13 +493,7 @@ def plans_list(request):
     else:
         plans = SubscriptionPlan.objects.filter(is_active=True).order_by('title')
     # Determine user's current active subscription plan, if any
-    active_sub = None
-    if request.user.is_authenticated and not request.user.is_staff:
-        active_sub = (
-            UserSubscription.objects.filter(user=request.user, active=True)
-            .order_by('-created_at')
-            .first()
-        )
+    active_sub = request.entitlements.subscription
     
     return render(request, 'plans.html', {"plans": plans, "active_sub": active_sub})
 
@@ -642,36 +571,30 @@ def api_plans(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def api_my_subscription(request):
-    sub = (
-        UserSubscription.objects.filter(user=request.user, active=True)
-        .order_by("-created_at")
-        .first()
-    )
+    sub = request.entitlements.subscription
     if not sub:
         return Response({"detail": "No active subscription"}, status=404)
     return Response(UserSubscriptionSerializer(sub).data)
 
 
-def _user_allowed_meals(user):
-    sub = (
-        UserSubscription.objects.filter(user=user, active=True)
-        .order_by("-created_at")
-        .first()
-    )
-    return set(sub.plan.included_meals) if sub else set()
-
-
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def api_mark_attendance(request):
+    """
+    Mark one of today's meals for the current user.
+
+    Entitlements come from the cache, and the row is written with a single
+    INSERT whose unique constraint decides races: exactly one of several
+    concurrent marks gets 201, the rest get 409.
+    """
     meal = request.data.get("meal_type")
     today = timezone.localdate()
-    allowed = _user_allowed_meals(request.user)
-    if meal not in allowed:
+    if not request.entitlements.allows(meal):
         return Response({"detail": "Meal not allowed for your plan"}, status=403)
-    # prevent duplicates by unique constraint
-    att, created = Attendance.objects.get_or_create(user=request.user, date=today, meal_type=meal)
-    if not created:
+    try:
+        with transaction.atomic():
+            att = Attendance.objects.create(user=request.user, date=today, meal_type=meal)
+    except IntegrityError:
         return Response({"detail": "Already marked"}, status=409)
     return Response(AttendanceSerializer(att).data, status=201)
 
@@ -679,8 +602,18 @@ def api_mark_attendance(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def api_attendance_list(request):
-    qs = Attendance.objects.filter(user=request.user).order_by("-date", "-marked_at")
-    return Response(AttendanceSerializer(qs, many=True).data)
+    """
+    The current user's attendance, newest first. Pages of
+    ``{results, next_cursor, has_next}`` with ``?cursor=`` or ``?limit=``;
+    without either, the full history as a bare list, as before paging.
+    """
+    paginator = AttendanceCursorPagination()
+    params = request.query_params
+    if paginator.cursor_query_param not in params and paginator.page_size_query_param not in params:
+        qs = Attendance.objects.filter(user=request.user).order_by(*paginator.ordering)
+        return Response(AttendanceSerializer(qs, many=True).data)
+    page = paginator.paginate_queryset(Attendance.objects.filter(user=request.user), request)
+    return paginator.get_paginated_response(AttendanceSerializer(page, many=True).data)
 
 
 @api_view(["GET"])
@@ -693,6 +626,33 @@ def api_current_menu(request):
     return Response(MonthlyMenuSerializer(menu).data)
 
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def api_menu_today(request):
+    """Today's dishes per meal from the per-day menu index"""
+    return Response(menu_for_day(timezone.localdate()))
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def api_menu_week(request):
+    """
+    Seven days of the per-day menu from ``?start=YYYY-MM-DD`` (default
+    today). ``start`` must be within MENU_WEEK_MAX_OFFSET days of today,
+    which also bounds how many weeks end up cached.
+    """
+    today = timezone.localdate()
+    start = today
+    if request.GET.get("start"):
+        try:
+            start = datetime.strptime(request.GET["start"], "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"success": False, "message": "start must be a date in YYYY-MM-DD format"}, status=400)
+    if abs((start - today).days) > MENU_WEEK_MAX_OFFSET:
+        return Response({"success": False, "message": f"start must be within {MENU_WEEK_MAX_OFFSET} days of today"}, status=400)
+    return Response(menu_for_week(start))
+
+
 @api_view(["POST", "GET"])
 @permission_classes([IsAuthenticated])
 def api_payment_proofs(request):
@@ -733,7 +693,7 @@ def api_active_notices(request):
     """
     Get all currently active popup notices for the requesting user
     """
-    notices = get_active_notices_for_user(request.user)
+    notices = get_active_notices_for_user(request.user, request.entitlements)
     
     notices_data = []
     for notice in notices:
@@ -1026,12 +986,13 @@ def staff_required(view_func):
 @staff_required
 @require_http_methods(["GET", "POST"])
 def lms_dashboard(request):
+    daily = get_daily_stats()
     stats = {
-        "users": User.objects.count(),
-        "active_subs": UserSubscription.objects.filter(active=True).count(),
-        "pending_payments": request.user.reviewed_payments.none().model.objects.filter(status="pending").count(),
+        "users": daily.users,
+        "active_subs": daily.active_subscribers,
+        "pending_payments": daily.pending_payments,
         # Count distinct users who attended today, not total meal records
-        "today_attendance": Attendance.objects.filter(date=timezone.localdate()).values('user').distinct().count(),
+        "today_attendance": daily.attendees,
     }
     pending = PaymentProofSerializer(
         PaymentProofSerializer.Meta.model.objects.filter(status="pending").order_by("-submitted_at")[:10],
@@ -1098,8 +1059,11 @@ def lms_payments(request):
                 proof.save()
                 start = tz.localdate()
                 end = proof.subscription_plan.compute_end_date(start)
-                # Deactivate existing active subscriptions before creating a new one
-                UserSubscription.objects.filter(user=proof.user, active=True).update(active=False)
+                # Deactivate existing active subscriptions before creating a new one;
+                # saved one by one so the signals keep the subscriber count right
+                for old_sub in UserSubscription.objects.filter(user=proof.user, active=True):
+                    old_sub.active = False
+                    old_sub.save(update_fields=['active'])
                 UserSubscription.objects.create(user=proof.user, plan=proof.subscription_plan, start_date=start, end_date=end, active=True)
                 messages.success(request, "Payment approved and subscription activated.")
         elif action == "reject":
@@ -1117,43 +1081,26 @@ def lms_payments(request):
 @staff_required
 @login_required
 def lms_export_attendance_csv(request):
-    """Export all attendance records to CSV with comprehensive data"""
+    """
+    Stream attendance records as CSV, newest first.
+
+    Optional filters: date_from, date_to (YYYY-MM-DD), meal_type and
+    hostel_status; pass gzip=1 for a compressed download.
+    """
     if not request.user.is_staff:
         return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
-    
+
     try:
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="attendance_export.csv"'
-        
-        writer = csv.writer(response)
-        # Enhanced headers with more useful information
-        writer.writerow([
-            "User ID", "Username", "Full Name", "Email", "Date", 
-            "Meal Type", "Marked At", "Weekday"
-        ])
-        
-        # Get attendance records with user information
-        attendances = Attendance.objects.select_related("user").order_by('-date', '-marked_at')
-        
-        for attendance in attendances:
-            # Get weekday name
-            weekday = attendance.date.strftime('%A')
-            
-            writer.writerow([
-                attendance.user.id,
-                attendance.user.username,
-                attendance.user.full_name or 'Not provided',
-                attendance.user.email or 'Not provided',
-                attendance.date.strftime('%Y-%m-%d'),
-                attendance.meal_type,
-                attendance.marked_at.strftime('%Y-%m-%d %H:%M:%S'),
-                weekday
-            ])
-        
-        return response
-        
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Export failed: {str(e)}'}, status=500)
+        filters = attendance_export_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    return streaming_csv_response(
+        'attendance_export.csv',
+        ATTENDANCE_HEADER,
+        attendance_export_rows(filters),
+        compress=request.GET.get('gzip') == '1',
+    )
 
 
 @login_required
@@ -1176,8 +1123,8 @@ def admin_mark_attendance(request):
             user = User.objects.get(id=user_id, is_staff=False)
             
             # Check if user has an active subscription
-            active_sub = UserSubscription.objects.filter(user=user, active=True).first()
-            if not active_sub:
+            entitlements = Entitlements(user)
+            if not entitlements.has_subscription:
                 return JsonResponse({'success': False, 'message': 'User has no active subscription'})
             
             # Check if attendance already marked today
@@ -1187,8 +1134,7 @@ def admin_mark_attendance(request):
                 return JsonResponse({'success': False, 'message': 'Attendance already marked for today'})
             
             # Mark attendance for all meals in the subscription
-            allowed_meals = active_sub.plan.included_meals
-            for meal in allowed_meals:
+            for meal in entitlements.meals:
                 Attendance.objects.create(
                     user=user,
                     meal_type=meal,  # Use meal_type field
@@ -1209,6 +1155,130 @@ def admin_mark_attendance(request):
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 
+@login_required
+@require_http_methods(["POST"])
+def admin_mark_attendance_batch(request):
+    """
+    Mark attendance for many users in one request.
+
+    JSON body: user_ids (list), optional meals (defaults to each user's
+    plan meals) and optional date (YYYY-MM-DD, defaults to today).
+    Responds with a result per user id.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+
+    import json
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'message': 'Expected a JSON object'}, status=400)
+
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        return JsonResponse({'success': False, 'message': 'user_ids must be a non-empty list'}, status=400)
+    if len(user_ids) > ATTENDANCE_BATCH_LIMIT:
+        return JsonResponse({'success': False, 'message': f'At most {ATTENDANCE_BATCH_LIMIT} users per batch'}, status=400)
+    try:
+        user_ids = [int(user_id) for user_id in user_ids]
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'user_ids must be integers'}, status=400)
+
+    meals = data.get('meals') or None
+    valid_meals = dict(Attendance.MEAL_CHOICES)
+    if meals is not None and (
+        not isinstance(meals, list)
+        or any(not isinstance(meal, str) or meal not in valid_meals for meal in meals)
+    ):
+        return JsonResponse({'success': False, 'message': 'Invalid meals'}, status=400)
+
+    today = timezone.localdate()
+    day = today
+    if data.get('date'):
+        try:
+            day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Invalid date, expected YYYY-MM-DD'}, status=400)
+        if day > today:
+            return JsonResponse({'success': False, 'message': 'Cannot mark attendance for a future date'}, status=400)
+
+    results = mark_attendance_batch(user_ids, day, meals)
+    return JsonResponse({
+        'success': True,
+        'date': day.isoformat(),
+        'marked_count': sum(len(result['marked']) for result in results.values()),
+        'results': {str(user_id): result for user_id, result in results.items()},
+    })
+
+
+@login_required
+def api_admin_roster(request):
+    """
+    Keyset-paginated student roster for the dashboard tables.
+
+    Query params: hostel_status, q (prefix match on username, full name or
+    mobile number), sort (username, full_name, date_joined; prefix with
+    "-" for descending), cursor (from the previous page) and limit.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+    
+    search = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor') or None
+    try:
+        users, next_cursor = roster_page(
+            hostel_status=request.GET.get('hostel_status') or None,
+            search=search,
+            sort=request.GET.get('sort', 'username'),
+            cursor=cursor,
+            limit=request.GET.get('limit', ROSTER_PAGE_SIZE),
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    results = []
+    for user in users:
+        sub = user.active_subscription
+        results.append({
+            'id': user.id,
+            'username': user.username,
+            'full_name': user.full_name or '',
+            'email': user.email,
+            'mobile_no': user.mobile_no or '',
+            'hostel_status': user.hostel_status,
+            'profile_image': user.profile_image.url if user.profile_image else None,
+            'is_active': user.is_active,
+            'date_joined': user.date_joined.isoformat(),
+            'last_login': user.last_login.isoformat() if user.last_login else None,
+            'total_attendance_count': user.total_attendance_count,
+            'last_attendance': user.last_attendance.isoformat() if user.last_attendance else None,
+            'today_meals': user.today_meals,
+            'today_attendance': {
+                'meal_type': user.today_attendance.meal_type,
+                'marked_at': user.today_attendance.marked_at.isoformat(),
+            } if user.today_attendance else None,
+            'active_subscription': {
+                'id': sub.id,
+                'plan': {
+                    'id': sub.plan.id,
+                    'title': sub.plan.title,
+                    'price': float(sub.plan.price),
+                    'billing_period': sub.plan.billing_period,
+                    'included_meals': sub.plan.included_meals,
+                },
+            } if sub else None,
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'results': results,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None,
+    })
+
+
 @login_required
 def student_details(request, user_id):
     """Get detailed student information and attendance history"""
@@ -1285,7 +1355,11 @@ def student_details(request, user_id):
         return JsonResponse({
             'success': True,
             'student': student_data,
-            'attendance_history': attendance_data
+            'attendance_history': attendance_data,
+            'attendance_calendar': {
+                'month': today.strftime('%Y-%m'),
+                'weeks': month_calendar(user, today),
+            },
         })
         
     except Exception as e:
@@ -1498,98 +1572,89 @@ def admin_user_crud(request):
 
 @login_required
 def export_users_csv(request):
-    """Export all users to CSV with comprehensive data"""
+    """Stream all users as CSV with attendance and subscription stats"""
     if not request.user.is_staff:
         return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
-    
-    try:
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
-        
-        writer = csv.writer(response)
-        # Enhanced headers with more useful information
-        writer.writerow([
-            'ID', 'Username', 'Email', 'Full Name', 'Mobile Number', 
-            'Is Active', 'Is Staff', 'Date Joined', 'Last Login', 
-            'Total Attendance', 'Last Attendance Date', 'Active Subscriptions'
-        ])
-        
-        # Get users with attendance data and subscription info
-        users = User.objects.annotate(
-            # Count distinct dates attended, not total meal records
-            total_attendance_count=Count('attendances__date', distinct=True),
-            last_attendance_date=Max('attendances__date')
-        ).prefetch_related('subscriptions').order_by('username')
-        
-        for user in users:
-            # Get active subscriptions count
-            active_subs = user.subscriptions.filter(active=True).count()
-            
-            # Format last attendance date
-            last_attendance = user.last_attendance_date.strftime('%Y-%m-%d') if user.last_attendance_date else 'Never'
-            
-            writer.writerow([
-                user.id,
-                user.username,
-                user.email or 'Not provided',
-                user.full_name or 'Not provided',
-                user.mobile_no or 'Not provided',
-                'Yes' if user.is_active else 'No',
-                'Yes' if user.is_staff else 'No',
-                user.date_joined.strftime('%Y-%m-%d %H:%M:%S'),
-                user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else 'Never',
-                user.total_attendance_count,
-                last_attendance,
-                active_subs
-            ])
-        
-        return response
-        
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Export failed: {str(e)}'}, status=500)
+
+    return streaming_csv_response('users_export.csv', USERS_HEADER, users_export_rows())
 
 
 @login_required
 def export_meal_feedback_csv(request):
-    """Export all meal feedback records to CSV with comprehensive data"""
+    """Stream all meal feedback records as CSV"""
     if not request.user.is_staff:
         return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
-    
+
+    return streaming_csv_response('meal_feedback_export.csv', MEAL_FEEDBACK_HEADER, meal_feedback_export_rows())
+
+
+def _export_job_data(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': reverse('export_job_download', args=[job.id]) if job.status == ExportJob.STATUS_DONE else None,
+    }
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def api_export_jobs(request):
+    """
+    Queue a background export (POST {kind, params}) or list recent jobs.
+    Jobs are built by the run_export_jobs management command.
+    """
+    if not request.user.is_staff:
+        return Response({'success': False, 'message': 'Permission denied'}, status=403)
+
+    if request.method == "GET":
+        return Response([_export_job_data(job) for job in ExportJob.objects.all()[:20]])
+
+    kind = request.data.get('kind')
+    params = request.data.get('params') or {}
+    if kind not in EXPORTS:
+        return Response({'success': False, 'message': 'Unknown export kind'}, status=400)
+    if not isinstance(params, dict):
+        return Response({'success': False, 'message': 'params must be an object'}, status=400)
+    if kind == ExportJob.KIND_ATTENDANCE:
+        try:
+            attendance_export_filters(params)
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=400)
+
+    job = ExportJob.objects.create(kind=kind, params=params, requested_by=request.user)
+    return Response(_export_job_data(job), status=201)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def api_export_job_status(request, job_id):
+    """Progress of a background export, with its download URL once done"""
+    if not request.user.is_staff:
+        return Response({'success': False, 'message': 'Permission denied'}, status=403)
     try:
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="meal_feedback_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID', 'User ID', 'Username', 'Full Name', 'Meal Type', 'Meal Date',
-            'Overall Rating', 'Taste Rating', 'Quantity Rating', 'Hygiene Rating',
-            'Comments', 'Is Anonymous', 'Created At', 'Updated At'
-        ])
-        
-        feedbacks = MealFeedback.objects.select_related('user').order_by('-created_at')
-        
-        for feedback in feedbacks:
-            writer.writerow([
-                feedback.id,
-                feedback.user.id,
-                feedback.user.username if not feedback.is_anonymous else 'Anonymous',
-                feedback.user.full_name if not feedback.is_anonymous else 'Anonymous',
-                feedback.get_meal_type_display(),
-                feedback.meal_date.strftime('%Y-%m-%d'),
-                feedback.rating,
-                feedback.taste_rating or 'N/A',
-                feedback.quantity_rating or 'N/A',
-                feedback.hygiene_rating or 'N/A',
-                feedback.comments or 'No comments',
-                'Yes' if feedback.is_anonymous else 'No',
-                feedback.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                feedback.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        return response
-        
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Export failed: {str(e)}'}, status=500)
+        job = ExportJob.objects.get(id=job_id)
+    except ExportJob.DoesNotExist:
+        return Response({'success': False, 'message': 'Export not found'}, status=404)
+    return Response(_export_job_data(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    """Download the file of a finished export job"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Access denied'}, status=403)
+    job = ExportJob.objects.filter(id=job_id, status=ExportJob.STATUS_DONE).first()
+    if job is None or not job.file:
+        raise Http404("Export not available")
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=EXPORTS[job.kind]['filename'])
 
 
 def robots_txt(request):
@@ -1608,6 +1673,7 @@ Disallow: /attendance/
 Disallow: /logout/
 Disallow: /plans/*/buy/
 Disallow: /admin/export/
+Disallow: /exports/
 
 # Allow sitemap
 Allow: /sitemap.xml